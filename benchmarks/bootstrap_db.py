@@ -0,0 +1,112 @@
+"""
+Times /bootstrap-db writing a guild's sweat roles to the database.
+
+Compares replacing each member's rows in its own transaction against the
+batched upsert_user_sweat_roles used by the command, against an empty database and a
+fully populated one. Run with `python -m benchmarks.bootstrap_db [members ...]`
+(defaults to 1k and 20k members).
+"""
+
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+
+os.environ.setdefault("DB_CONNECTION_STRING", "sqlite:///:memory:")
+
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from magic512bot.cogs.constants import SWEAT_ROLES
+from magic512bot.cogs.role_request import BOOTSTRAP_BATCH_SIZE
+from magic512bot.models import register_models
+from magic512bot.models.base import Base
+from magic512bot.models.user import User, UserSweatRole
+from magic512bot.services.role_request import upsert_user_sweat_roles
+
+type Snapshot = list[tuple[int, str, list[str]]]
+
+
+def make_snapshot(members: int) -> Snapshot:
+    rng = random.Random(512)
+    roles = sorted(SWEAT_ROLES)
+    # Most members hold no sweat roles, a few hold many
+    return [
+        (
+            member_id,
+            f"Member {member_id}",
+            rng.sample(roles, min(len(roles), int(rng.expovariate(1.5)))),
+        )
+        for member_id in range(members)
+    ]
+
+
+def set_member_roles(
+    session: Session, user_id: int, user_name: str, role_names: list[str]
+) -> None:
+    session.merge(User(id=user_id, user_name=user_name))
+    # The user row must exist before its roles reference it
+    session.flush()
+    session.execute(delete(UserSweatRole).where(UserSweatRole.user_id == user_id))
+    rows = [{"user_id": user_id, "role_name": name} for name in set(role_names)]
+    if rows:
+        session.execute(insert(UserSweatRole), rows)
+
+
+def per_member(session_factory: sessionmaker[Session], snapshot: Snapshot) -> int:
+    rows = 0
+    for user_id, user_name, role_names in snapshot:
+        with session_factory.begin() as session:
+            set_member_roles(session, user_id, user_name, role_names)
+        rows += 1 + len(role_names)
+    return rows
+
+
+def batched(session_factory: sessionmaker[Session], snapshot: Snapshot) -> int:
+    rows = 0
+    for batch in itertools.batched(snapshot, BOOTSTRAP_BATCH_SIZE, strict=False):
+        with session_factory.begin() as session:
+            rows += upsert_user_sweat_roles(session, batch)
+    return rows
+
+
+def time_strategy(
+    snapshot: Snapshot,
+    strategy: Callable[[sessionmaker[Session], Snapshot], int],
+) -> tuple[float, float, int]:
+    register_models()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine)
+
+        start = time.perf_counter()
+        rows = strategy(session_factory, snapshot)
+        empty = time.perf_counter() - start
+
+        # Re-running against existing rows exercises the update path
+        start = time.perf_counter()
+        strategy(session_factory, snapshot)
+        populated = time.perf_counter() - start
+        engine.dispose()
+    return empty, populated, rows
+
+
+def main(sizes: list[int]) -> None:
+    strategies = {"per member": per_member, "batched upsert": batched}
+    print(f"{'members':>8} {'strategy':<15} {'empty db':>10} {'re-sync':>10} {'rows/s':>9}")
+    for members in sizes:
+        snapshot = make_snapshot(members)
+        for name, strategy in strategies.items():
+            empty, populated, rows = time_strategy(snapshot, strategy)
+            print(
+                f"{members:>8} {name:<15} {empty:>9.2f}s {populated:>9.2f}s "
+                f"{rows / empty:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1_000, 20_000])
@@ -0,0 +1,110 @@
+"""
+Times /bulk-return for large tagged orders.
+
+Compares loading and deleting ORM objects one by one against a single
+DELETE ... RETURNING statement, which bulk_return_cardloans uses on backends
+other than SQLite, and the SELECT SUM + DELETE it uses on SQLite. Run with
+`python -m benchmarks.bulk_return [rows ...]`.
+"""
+
+import datetime
+import os
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+
+os.environ.setdefault("DB_CONNECTION_STRING", "sqlite:///:memory:")
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from magic512bot.models.card import Card
+from magic512bot.models.cardloan import CardLoan
+from magic512bot.services.card_lender import bulk_return_cardloans, get_card_ids
+
+LENDER, BORROWER, TAG = 1, 2, "cube"
+# Other orders for the same pair, which must be left alone
+OTHER_TAG_ROWS = 2_000
+
+
+def populate(session: Session, rows: int) -> None:
+    now = datetime.datetime.now()
+    card_ids = get_card_ids(
+        session, [f"Card {i}" for i in range(rows + OTHER_TAG_ROWS)]
+    )
+    session.execute(
+        insert(CardLoan),
+        [
+            {
+                "card_id": card_ids[f"Card {i}"],
+                "lender": LENDER,
+                "borrower": BORROWER,
+                "borrower_name": "Borrower",
+                "quantity": 1 + i % 4,
+                "created_at": now,
+                "order_tag": TAG if i < rows else "other",
+            }
+            for i in range(rows + OTHER_TAG_ROWS)
+        ],
+    )
+    session.commit()
+
+
+def orm_delete(session: Session) -> int:
+    loans = session.scalars(
+        select(CardLoan).where(
+            CardLoan.lender == LENDER,
+            CardLoan.borrower == BORROWER,
+            CardLoan.order_tag == TAG,
+        )
+    ).all()
+    for loan in loans:
+        session.delete(loan)
+    session.flush()
+    return sum(loan.quantity for loan in loans)
+
+
+def returning_delete(session: Session) -> int:
+    dialect = session.get_bind().dialect
+    dialect.name = "postgresql"
+    try:
+        return bulk_return_cardloans(session, LENDER, BORROWER, TAG)
+    finally:
+        dialect.name = "sqlite"
+
+
+def sum_delete(session: Session) -> int:
+    return bulk_return_cardloans(session, LENDER, BORROWER, TAG)
+
+
+def time_strategy(rows: int, strategy: Callable[[Session], int]) -> tuple[float, int]:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Card.__table__.create(engine)
+        CardLoan.__table__.create(engine)
+        with Session(engine) as session:
+            populate(session, rows)
+            start = time.perf_counter()
+            returned = strategy(session)
+            session.commit()
+            elapsed = time.perf_counter() - start
+        engine.dispose()
+    return elapsed * 1000, returned
+
+
+def main(sizes: list[int]) -> None:
+    strategies = {
+        "orm delete": orm_delete,
+        "delete returning": returning_delete,
+        "sum + delete": sum_delete,
+    }
+    print(f"{'rows':>7} {'strategy':<18} {'time':>10} {'cards':>7}")
+    for rows in sizes:
+        for name, strategy in strategies.items():
+            elapsed_ms, returned = time_strategy(rows, strategy)
+            print(f"{rows:>7} {name:<18} {elapsed_ms:>8.1f}ms {returned:>7}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [75, 540, 5_000, 50_000])
@@ -0,0 +1,117 @@
+"""
+Times "did you mean" suggestions for misspelled card names.
+
+Compares the catalog's trigram index against a linear
+difflib.get_close_matches scan over every name, reporting per-lookup latency
+and how often the intended card is among the top 3 suggestions. Uses the
+built card catalog when there is one, otherwise ~30k generated names. Run
+with `python -m benchmarks.card_suggestions [queries]` (defaults to 200).
+"""
+
+import difflib
+import math
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from collections import Counter
+from collections.abc import Callable
+from pydoc_data.topics import topics as pydoc_topics
+
+os.environ.setdefault("DB_CONNECTION_STRING", "sqlite:///:memory:")
+
+from magic512bot.card_catalog import CardCatalog, load_card_catalog
+
+GENERATED_NAMES = 30_000
+# A linear scan takes hundreds of milliseconds per lookup, so it gets fewer
+LINEAR_QUERIES = 50
+
+
+def generated_catalog(size: int) -> CardCatalog:
+    """
+    Generates card-like names from the English words in Python's bundled
+    documentation, picking common words more often, as in real card names.
+    """
+    words = Counter(
+        word.capitalize()
+        for text in pydoc_topics.values()
+        for word in re.findall(r"\b[a-z]{3,}\b", text)
+    )
+    vocabulary = list(words)
+    weights = [math.sqrt(count) for count in words.values()]
+    rng = random.Random(512)
+    names: set[str] = set()
+    while len(names) < size:
+        first, second, third = rng.choices(vocabulary, weights, k=3)
+        names.add(
+            rng.choice(
+                (
+                    f"{first} {second}",
+                    f"{first} of the {second}",
+                    f"{first}, {second} {third}",
+                    f"{first} {second} {third}",
+                )
+            )
+        )
+    return CardCatalog.from_names(names)
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """Applies one typo: a dropped, doubled, swapped or replaced letter."""
+    i = rng.randrange(1, len(name) - 1)
+    match rng.randrange(4):
+        case 0:
+            return name[:i] + name[i + 1 :]
+        case 1:
+            return name[:i] + name[i] + name[i:]
+        case 2:
+            return name[: i - 1] + name[i] + name[i - 1] + name[i + 1 :]
+        case _:
+            return name[:i] + rng.choice("aeiourstln") + name[i + 1 :]
+
+
+def run(
+    label: str, suggest: Callable[[str], list[str]], queries: list[tuple[str, str]]
+) -> None:
+    timings = []
+    hits = 0
+    for typo, expected in queries:
+        start = time.perf_counter()
+        suggestions = suggest(typo)
+        timings.append(time.perf_counter() - start)
+        hits += expected in suggestions
+    timings.sort()
+    print(
+        f"{label}: {len(queries)} lookups, "
+        f"mean {statistics.fmean(timings) * 1000:.3f}ms, "
+        f"p99 {timings[int(len(timings) * 0.99)] * 1000:.3f}ms, "
+        f"top-3 hit rate {hits / len(queries):.0%}"
+    )
+
+
+def main(query_count: int) -> None:
+    catalog = load_card_catalog() or generated_catalog(GENERATED_NAMES)
+    canonical_names = sorted(set(catalog.names.values()))
+    rng = random.Random(512)
+    queries = [
+        (misspell(name, rng), name)
+        for name in rng.sample(canonical_names, query_count)
+        if len(name) > 3  # noqa: PLR2004
+    ]
+    print(f"{len(catalog)} indexed names")
+
+    start = time.perf_counter()
+    catalog.suggestion_index  # noqa: B018
+    print(f"trigram index built in {(time.perf_counter() - start) * 1000:.0f}ms")
+    run("trigram index", catalog.suggest, queries)
+
+    def linear_scan(typo: str) -> list[str]:
+        return difflib.get_close_matches(typo, canonical_names, n=3)
+
+    run("difflib linear scan", linear_scan, queries[:LINEAR_QUERIES])
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
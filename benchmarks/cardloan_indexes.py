@@ -0,0 +1,126 @@
+"""
+Times the card loan query patterns with and without the card_loans indexes.
+
+Run with `python -m benchmarks.cardloan_indexes [rows ...]`
+(defaults to 10k, 100k and 1M loan rows).
+"""
+
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DB_CONNECTION_STRING", "sqlite:///:memory:")
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import Session
+
+from magic512bot.models.card import Card
+from magic512bot.models.cardloan import CardLoan
+from magic512bot.services.card_lender import (
+    get_card_ids,
+    get_cardloans,
+    get_loan_totals,
+)
+
+LENDERS = 50
+BORROWERS = 200
+TAGS = ["", "otters-standard", "rc-modern", "cube", "legacy-league"]
+CARDS = [f"Card {i}" for i in range(5000)]
+REPEATS = 200
+INSERT_BATCH = 10_000
+
+
+def populate(session: Session, rows: int) -> list[int]:
+    """Adds `rows` random loans, returning the ids of the cards loaned."""
+    rng = random.Random(512)
+    start = datetime.datetime(2024, 1, 1)
+    card_ids = list(get_card_ids(session, CARDS).values())
+    batch = []
+    for i in range(rows):
+        batch.append(
+            {
+                "card_id": rng.choice(card_ids),
+                "lender": rng.randrange(LENDERS),
+                "borrower": rng.randrange(BORROWERS),
+                "borrower_name": "Borrower",
+                "quantity": rng.randint(1, 4),
+                "created_at": start + datetime.timedelta(minutes=i),
+                "order_tag": rng.choice(TAGS),
+            }
+        )
+        if len(batch) == INSERT_BATCH:
+            session.execute(insert(CardLoan), batch)
+            batch.clear()
+    if batch:
+        session.execute(insert(CardLoan), batch)
+    return card_ids
+
+
+def return_lookup(session: Session, lender: int, borrower: int, card_id: int) -> None:
+    # The per-card FIFO lookup that return_cardloans performs
+    session.execute(
+        CardLoan.__table__.select()
+        .where(
+            CardLoan.lender == lender,
+            CardLoan.borrower == borrower,
+            CardLoan.card_id == card_id,
+        )
+        .order_by(CardLoan.created_at)
+    ).all()
+
+
+def time_queries(session: Session, card_ids: list[int]) -> dict[str, float]:
+    rng = random.Random(1)
+    queries = {
+        "get_cardloans": lambda: get_cardloans(
+            session, rng.randrange(LENDERS), rng.randrange(BORROWERS), rng.choice(TAGS)
+        ),
+        "return lookup": lambda: return_lookup(
+            session,
+            rng.randrange(LENDERS),
+            rng.randrange(BORROWERS),
+            rng.choice(card_ids),
+        ),
+        "get_loan_totals": lambda: get_loan_totals(session, rng.randrange(LENDERS)),
+    }
+    timings = {}
+    for name, query in queries.items():
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            query()
+            session.expunge_all()
+        timings[name] = (time.perf_counter() - start) / REPEATS * 1000
+    return timings
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'rows':>9} {'query':<20} {'no index':>10} {'indexed':>10}")
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{tmp}/bench.db")
+            Card.__table__.create(engine)
+            CardLoan.__table__.create(engine)
+            with Session(engine) as session:
+                for index in CardLoan.__table__.indexes:
+                    session.execute(text(f"DROP INDEX {index.name}"))
+                card_ids = populate(session, rows)
+                session.commit()
+
+                before = time_queries(session, card_ids)
+                for index in CardLoan.__table__.indexes:
+                    index.create(session.connection())
+                session.execute(text("ANALYZE"))
+                after = time_queries(session, card_ids)
+
+            for name in before:
+                print(
+                    f"{rows:>9} {name:<20} {before[name]:>8.2f}ms {after[name]:>8.2f}ms"
+                )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,141 @@
+"""
+Times /loan for large card lists.
+
+Compares adding ORM objects with session.add_all, as insert_cardloans used
+to, against a single multi-row INSERT ... VALUES statement and the
+executemany INSERT insert_cardloans now issues (sent as multi-row
+"insertmanyvalues" pages on PostgreSQL), and the same list merged into
+existing loans. Each list is entirely new cards, loaned after 2,000 other
+loans. Run with `python -m benchmarks.insert_cardloans [cards ...]`
+(defaults to 500 and 5,000 cards).
+"""
+
+import datetime
+import os
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+
+os.environ.setdefault("DB_CONNECTION_STRING", "sqlite:///:memory:")
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from magic512bot.models.card import Card
+from magic512bot.models.cardloan import CardLoan
+from magic512bot.services.card_lender import (
+    get_card_ids,
+    insert_cardloans,
+    parse_cardlist,
+)
+
+LENDER, BORROWER, TAG = 1, 2, "cube"
+OTHER_LOANS = 2_000
+# SQLite's limit on bind parameters in one statement
+MAX_PARAMETERS = 32_766
+
+
+def orm_insert(session: Session, card_list: list[str]) -> int:
+    loans = parse_cardlist(card_list)
+    card_ids = get_card_ids(session, loans)
+    session.add_all(
+        [
+            CardLoan(
+                created_at=datetime.datetime.now(),
+                card_id=card_ids[card_name],
+                quantity=quantity,
+                lender=LENDER,
+                borrower=BORROWER,
+                borrower_name="Borrower",
+                order_tag=TAG,
+            )
+            for card_name, quantity in loans.items()
+        ]
+    )
+    session.flush()
+    return sum(loans.values())
+
+
+def values_insert(session: Session, card_list: list[str]) -> int:
+    loans = parse_cardlist(card_list)
+    card_ids = get_card_ids(session, loans)
+    now = datetime.datetime.now()
+    rows = [
+        {
+            "created_at": now,
+            "card_id": card_ids[card_name],
+            "quantity": quantity,
+            "lender": LENDER,
+            "borrower": BORROWER,
+            "borrower_name": "Borrower",
+            "order_tag": TAG,
+        }
+        for card_name, quantity in loans.items()
+    ]
+    # One statement per chunk, as VALUES can't exceed the parameter limit
+    chunk = MAX_PARAMETERS // len(rows[0])
+    for start in range(0, len(rows), chunk):
+        session.execute(insert(CardLoan.__table__).values(rows[start : start + chunk]))
+    return sum(loans.values())
+
+
+def executemany_insert(session: Session, card_list: list[str]) -> int:
+    return insert_cardloans(session, card_list, LENDER, BORROWER, "Borrower", TAG)
+
+
+def merging_insert(session: Session, card_list: list[str]) -> int:
+    # Half the list is already on loan, so half the cards are merged
+    insert_cardloans(
+        session, card_list[::2], LENDER, BORROWER, "Borrower", TAG, merge=True
+    )
+    start = time.perf_counter()
+    count = insert_cardloans(
+        session, card_list, LENDER, BORROWER, "Borrower", TAG, merge=True
+    )
+    session.info["start"] = start
+    return count
+
+
+def time_strategy(
+    cards: int, strategy: Callable[[Session, list[str]], int]
+) -> tuple[float, int]:
+    card_list = [f"{1 + i % 4} Card {i}" for i in range(cards)]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Card.__table__.create(engine)
+        CardLoan.__table__.create(engine)
+        with Session(engine) as session:
+            insert_cardloans(
+                session,
+                [f"1 Other Card {i}" for i in range(OTHER_LOANS)],
+                LENDER,
+                BORROWER,
+                "Borrower",
+                "other",
+            )
+            session.commit()
+            start = time.perf_counter()
+            loaned = strategy(session, card_list)
+            session.commit()
+            elapsed = time.perf_counter() - session.info.get("start", start)
+        engine.dispose()
+    return elapsed * 1000, loaned
+
+
+def main(sizes: list[int]) -> None:
+    strategies = {
+        "orm add_all": orm_insert,
+        "insert values": values_insert,
+        "executemany": executemany_insert,
+        "merge half": merging_insert,
+    }
+    print(f"{'cards':>7} {'strategy':<15} {'time':>10} {'loaned':>7}")
+    for cards in sizes:
+        for name, strategy in strategies.items():
+            elapsed_ms, loaned = time_strategy(cards, strategy)
+            print(f"{cards:>7} {name:<15} {elapsed_ms:>8.1f}ms {loaned:>7}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [500, 5_000])
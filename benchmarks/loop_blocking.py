@@ -0,0 +1,69 @@
+"""
+Measures how long the event loop is blocked while handlers talk to the database.
+
+Simulates a burst of interactions, each doing one slow database round-trip,
+first the old way (session work inline on the loop) and then through
+`Database.run`. Run with `python -m benchmarks.loop_blocking`.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DB_CONNECTION_STRING", "sqlite:///:memory:")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from magic512bot.database import Database
+from magic512bot.metrics import Histogram, monitor_event_loop
+from magic512bot.models import register_models
+from magic512bot.models.base import Base
+from magic512bot.services.nomination import get_all_nominations
+
+ROUND_TRIP_SECONDS = 0.05  # a slow Postgres round-trip
+INTERACTIONS = 40
+
+
+def slow_query(session: Session) -> int:
+    time.sleep(ROUND_TRIP_SECONDS)
+    return len(get_all_nominations(session))
+
+
+async def run_scenario(name: str, handler) -> Histogram:
+    lag = Histogram(f"{name}_loop_lag_seconds", "")
+    monitor = asyncio.create_task(monitor_event_loop(lag, interval=0.01))
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(INTERACTIONS)))
+    elapsed = time.perf_counter() - start
+    monitor.cancel()
+    print(f"{lag.summary()} total={elapsed:.2f}s")
+    return lag
+
+
+async def main() -> None:
+    register_models()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+        db = Database(session_factory)
+
+        async def inline_handler() -> None:
+            with session_factory.begin() as session:
+                slow_query(session)
+            await asyncio.sleep(0)
+
+        async def executor_handler() -> None:
+            await db.run(slow_query)
+
+        await run_scenario("inline", inline_handler)
+        await run_scenario("executor", executor_handler)
+        await db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
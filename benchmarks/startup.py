@@ -0,0 +1,97 @@
+"""
+Times bot startup up to the point commands are ready to sync.
+
+Each run is a fresh interpreter, so imports are as cold as on a real restart.
+A run imports the bot module, then loads the cogs serially or concurrently and
+reports per-cog import and setup time. The "eager" runs import table2ascii up
+front, as the card lender services used to. Run with
+`python -m benchmarks.startup [runs]` (defaults to 5 runs per mode).
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("DB_CONNECTION_STRING", "sqlite:///:memory:")
+
+MODES = {
+    "serial, eager table2ascii": ["--serial", "--eager"],
+    "serial": ["--serial"],
+    "concurrent": [],
+}
+
+
+async def load(concurrent: bool, eager: bool) -> dict[str, object]:
+    start = time.perf_counter()
+    if eager:
+        import table2ascii  # noqa: F401
+
+    import discord
+
+    from magic512bot.database import create_database
+    from magic512bot.main import Magic512Bot
+
+    imported = time.perf_counter()
+    bot = Magic512Bot(command_prefix="!", intents=discord.Intents.none())
+    bot.db = create_database()
+    await bot.load_cogs(concurrent=concurrent)
+    loaded = time.perf_counter()
+
+    result = {
+        "import_bot": imported - start,
+        "load_cogs": loaded - imported,
+        "table2ascii_loaded": "table2ascii" in sys.modules,
+        "cogs": {
+            module: [timing.import_seconds, timing.setup_seconds]
+            for module, timing in bot.cog_timings.items()
+        },
+    }
+    await bot.close()
+    return result
+
+
+def run_once(flags: list[str]) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", *flags],
+        capture_output=True,
+        check=True,
+        text=True,
+        env={**os.environ, "LOG_FILE": os.devnull},
+    ).stderr
+    # The bot logs to stdout, so the result is written to stderr
+    return json.loads(output.splitlines()[-1])
+
+
+def main(runs: int) -> None:
+    for mode, flags in MODES.items():
+        results = [run_once(flags) for _ in range(runs)]
+        import_bot = statistics.median(r["import_bot"] for r in results)
+        load_cogs = statistics.median(r["load_cogs"] for r in results)
+        print(
+            f"{mode}: import bot {import_bot * 1000:.0f}ms, "
+            f"load cogs {load_cogs * 1000:.0f}ms, "
+            f"total {(import_bot + load_cogs) * 1000:.0f}ms "
+            f"(table2ascii loaded: {results[0]['table2ascii_loaded']})"
+        )
+        for module in results[0]["cogs"]:
+            import_ms = statistics.median(r["cogs"][module][0] for r in results)
+            setup_ms = statistics.median(r["cogs"][module][1] for r in results)
+            print(
+                f"  {module}: import {import_ms * 1000:.1f}ms, "
+                f"setup {setup_ms * 1000:.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        import asyncio
+
+        result = asyncio.run(
+            load(concurrent="--serial" not in sys.argv, eager="--eager" in sys.argv)
+        )
+        print(json.dumps(result), file=sys.stderr)
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
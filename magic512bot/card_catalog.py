@@ -0,0 +1,249 @@
+"""
+Offline catalog of Magic card names, used to validate and canonicalize the
+card names in loan lists without a network call.
+
+The catalog is a pickled dict from normalized name to canonical name, built
+from a Scryfall "Oracle Cards" bulk-data file with
+`python -m magic512bot.card_catalog [oracle-cards.json]` (downloading the
+latest file when none is given). The Docker image builds it at build time.
+"""
+
+import functools
+import heapq
+import json
+import pickle
+import re
+import sys
+import unicodedata
+from collections import Counter
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from magic512bot.config import CARD_CATALOG_PATH, LOGGER
+
+SCRYFALL_BULK_DATA_URL = "https://api.scryfall.com/bulk-data/oracle-cards"
+# Bumped whenever the pickled layout or normalization changes
+CATALOG_VERSION = 2
+
+# Layouts whose cards are named by both halves ("Fire // Ice"). Other
+# multi-face cards are named by their front face, as in MTGO decklists.
+SPLIT_LAYOUTS = frozenset({"split", "aftermath"})
+# Scryfall objects that aren't cards anyone would lend
+EXCLUDED_LAYOUTS = frozenset(
+    {"art_series", "double_faced_token", "emblem", "token", "vanguard"}
+)
+
+# A name one typo away from a misspelling shares all but at most three of its
+# trigrams, so any four of them find it, and six find most names two typos
+# away. Rarer trigrams are scanned first, common ones only within the budget.
+MIN_SCANNED_TRIGRAMS = 6
+SCANNED_POSTINGS_BUDGET = 1000
+# Names sharing the most scanned trigrams that are compared in full, and the
+# least similarity (Dice coefficient of their trigrams) worth suggesting
+SUGGESTION_CANDIDATES = 12
+MIN_SUGGESTION_SIMILARITY = 0.4
+
+# Punctuation other than face separators and hyphens is dropped, so
+# "Jace, Vryn's Prodigy" and "jace vryns prodigy" are the same card; hyphens
+# and underscores separate words like whitespace does.
+_PUNCTUATION = re.compile(r"[^\w\s/\-\u2010-\u2015]")
+_WORD_BREAK = re.compile(r"[\s_\-\u2010-\u2015]+")
+_FACE_SEPARATOR = re.compile(r"\s*//?\s*")
+
+
+def normalize_card_name(name: str) -> str:
+    """
+    Folds a card name to the key it's indexed under: accents and punctuation
+    stripped, case-folded, whitespace collapsed and face separators written
+    " // ".
+    """
+    if not name.isascii():
+        decomposed = unicodedata.normalize("NFKD", name)
+        name = "".join(char for char in decomposed if not unicodedata.combining(char))
+    name = _PUNCTUATION.sub("", name.casefold())
+    name = _WORD_BREAK.sub(" ", name).strip()
+    return _FACE_SEPARATOR.sub(" // ", name) if "/" in name else name
+
+
+def trigrams(key: str) -> set[str]:
+    """The 3-character substrings of a normalized name, padded at the ends."""
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Finds the names closest to a misspelling without comparing it against
+    every name: an inverted index from trigram to the names containing it
+    narrows the search to the names sharing the most trigrams with it.
+    """
+
+    def __init__(self, keys: Iterable[str]) -> None:
+        self.keys = list(keys)
+        postings: dict[str, list[int]] = {}
+        for key_id, key in enumerate(self.keys):
+            for trigram in trigrams(key):
+                postings.setdefault(trigram, []).append(key_id)
+        self.postings = postings
+
+    def closest(self, key: str, limit: int) -> list[str]:
+        """Returns up to `limit` indexed keys most similar to `key`."""
+        query = trigrams(key)
+        query_postings = sorted(
+            (
+                postings
+                for trigram in query
+                if (postings := self.postings.get(trigram))
+            ),
+            key=len,
+        )
+        shared: Counter[int] = Counter()
+        scanned = 0
+        for i, postings in enumerate(query_postings):
+            if (
+                i >= MIN_SCANNED_TRIGRAMS
+                and scanned + len(postings) > SCANNED_POSTINGS_BUDGET
+            ):
+                break
+            # Counter.update counts in C
+            shared.update(postings)
+            scanned += len(postings)
+
+        # Rank by the Dice coefficient over all trigrams, which is much
+        # cheaper than an edit distance. Sorting the ids is faster than
+        # Counter.most_common's heap.
+        ranked = []
+        best = sorted(shared, key=shared.__getitem__, reverse=True)
+        for key_id in best[:SUGGESTION_CANDIDATES]:
+            candidate = trigrams(self.keys[key_id])
+            dice = 2 * len(query & candidate) / (len(query) + len(candidate))
+            if dice >= MIN_SUGGESTION_SIMILARITY:
+                ranked.append((dice, self.keys[key_id]))
+        return [candidate for _, candidate in heapq.nlargest(limit, ranked)]
+
+
+class CardCatalog:
+    """Canonical card names keyed by `normalize_card_name`."""
+
+    def __init__(self, names: dict[str, str]) -> None:
+        self.names = names
+
+    @classmethod
+    def from_names(cls, names: Iterable[str]) -> "CardCatalog":
+        return cls({normalize_card_name(name): name for name in names})
+
+    @classmethod
+    def from_scryfall(cls, cards: Iterable[dict[str, Any]]) -> "CardCatalog":
+        """
+        Indexes Scryfall card objects under their full name and each face's
+        name, so "Delver of Secrets" and "Delver of Secrets // Insectile
+        Aberration" both find "Delver of Secrets".
+        """
+        names: dict[str, str] = {}
+        face_names: dict[str, str] = {}
+        for card in cards:
+            if card.get("layout") in EXCLUDED_LAYOUTS:
+                continue
+            faces = [face["name"] for face in card.get("card_faces", [])]
+            canonical = (
+                card["name"]
+                if not faces or card.get("layout") in SPLIT_LAYOUTS
+                else faces[0]
+            )
+            names[normalize_card_name(card["name"])] = canonical
+            for face in faces:
+                face_names.setdefault(normalize_card_name(face), canonical)
+        # A face never shadows a card with the same full name
+        return cls(face_names | names)
+
+    def canonical_name(self, name: str) -> str | None:
+        """Returns the catalog's spelling of `name`, or None if it's unknown."""
+        return self.names.get(normalize_card_name(name))
+
+    def suggest(self, name: str, limit: int = 3) -> list[str]:
+        """Returns up to `limit` canonical names that `name` may be a typo of."""
+        suggestions: list[str] = []
+        # Faces and full names of one card share a canonical name, so ask
+        # for extra matches to make up for duplicates
+        for key in self.suggestion_index.closest(normalize_card_name(name), limit * 2):
+            if (canonical := self.names[key]) not in suggestions:
+                suggestions.append(canonical)
+        return suggestions[:limit]
+
+    @functools.cached_property
+    def suggestion_index(self) -> TrigramIndex:
+        return TrigramIndex(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as file:
+            pickle.dump(
+                {"version": CATALOG_VERSION, "names": self.names},
+                file,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "CardCatalog":
+        # Only ever loads the file written by save() at build time
+        with Path(path).open("rb") as file:
+            data = pickle.load(file)
+        if data.get("version") != CATALOG_VERSION:
+            raise ValueError(
+                f"Card catalog {path} is version {data.get('version')}, "
+                f"expected {CATALOG_VERSION}; rebuild it"
+            )
+        return cls(data["names"])
+
+
+@functools.cache
+def load_card_catalog(path: str = CARD_CATALOG_PATH) -> CardCatalog | None:
+    """
+    Loads the card catalog once. Returns None, so card names aren't
+    validated, when the catalog hasn't been built or can't be read.
+    """
+    try:
+        catalog = CardCatalog.load(path)
+    except FileNotFoundError:
+        LOGGER.warning("No card catalog at %s; card names won't be validated", path)
+        return None
+    except (OSError, ValueError, pickle.UnpicklingError) as e:
+        LOGGER.error("Failed to load card catalog %s: %s", path, e)
+        return None
+    LOGGER.info("Loaded %s card names from %s", len(catalog), path)
+    return catalog
+
+
+def download_oracle_cards() -> list[dict[str, Any]]:
+    """Downloads the latest Scryfall Oracle Cards bulk-data file."""
+    # Only needed to build the catalog, never by the bot
+    import requests
+
+    headers = {"User-Agent": "magic512bot/0.1", "Accept": "application/json"}
+    bulk_data = requests.get(SCRYFALL_BULK_DATA_URL, headers=headers, timeout=30)
+    bulk_data.raise_for_status()
+    response = requests.get(
+        bulk_data.json()["download_uri"], headers=headers, timeout=300
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def main(argv: list[str]) -> None:
+    if argv:
+        with open(argv[0], encoding="utf-8") as file:
+            cards = json.load(file)
+    else:
+        cards = download_oracle_cards()
+    catalog = CardCatalog.from_scryfall(cards)
+    catalog.save(CARD_CATALOG_PATH)
+    print(f"Wrote {len(catalog)} card names to {CARD_CATALOG_PATH}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,29 +1,116 @@
-import traceback
+import asyncio
+import io
+from typing import TYPE_CHECKING
 
 import discord
 from discord import app_commands
 from discord.ext import commands
-from sqlalchemy.orm import Session, sessionmaker
 
+from magic512bot.card_catalog import load_card_catalog
 from magic512bot.cogs.constants import Roles
 from magic512bot.config import LOGGER
-from magic512bot.errors import CardListInputError, CardNotFoundError
-from magic512bot.main import Magic512Bot
+from magic512bot.database import AsyncDatabase, Database
+from magic512bot.decklist import read_decklist
+from magic512bot.errors import CardListInputError, CardNotFoundError, DecklistError
+from magic512bot.interactions import deferred, record_ack, send_public
 from magic512bot.services.card_lender import (
-    bulk_get_cardloans,
     bulk_return_cardloans,
     format_bulk_loanlist_output,
     format_loanlist_output,
     get_cardloans,
+    get_loan_totals,
     insert_cardloans,
     return_cardloans,
 )
 
+if TYPE_CHECKING:
+    # Annotations only, so importing a cog doesn't import the bot module
+    from magic512bot.main import Magic512Bot
+
+# Discord rejects messages longer than this
+MAX_MESSAGE_LENGTH = 2000
+
+
+async def send_error(interaction: discord.Interaction, error: Exception) -> None:
+    """
+    Reports a card list error to the user, attaching the full report as a file
+    if it's too long for one message (e.g. a decklist full of typos).
+    """
+    message = str(error)
+    if len(message) <= MAX_MESSAGE_LENGTH:
+        await interaction.followup.send(message, ephemeral=True)
+        return
+    summary = message.split("\n", 1)[0]
+    report = discord.File(
+        io.BytesIO(message.replace("```", "").encode()), filename="errors.txt"
+    )
+    await interaction.followup.send(
+        f"{summary}\n\nThe full list is attached.", file=report, ephemeral=True
+    )
+
+
+async def loan_cards(
+    db: Database | AsyncDatabase,
+    interaction: discord.Interaction,
+    card_list: list[str],
+    borrower: discord.Member,
+    tag: str,
+) -> None:
+    """Records a loan from a typed or attached card list and reports it."""
+    try:
+        cards_loaned = await db.run(
+            insert_cardloans,
+            card_list=card_list,
+            lender=interaction.user.id,
+            borrower=borrower.id,
+            borrower_name=borrower.display_name,
+            tag=tag,
+        )
+    except CardListInputError as e:
+        await send_error(interaction, e)
+        return
+
+    message = f"{interaction.user.mention} \
+        loaned **{cards_loaned}** cards to \
+        {borrower.mention}"
+    await send_public(
+        interaction, message, allowed_mentions=discord.AllowedMentions.none()
+    )
+
+
+async def return_cards(
+    db: Database | AsyncDatabase,
+    interaction: discord.Interaction,
+    card_list: list[str],
+    borrower: discord.Member,
+    tag: str,
+) -> None:
+    """Records a return from a typed or attached card list and reports it."""
+    try:
+        cards_returned = await db.run(
+            return_cardloans,
+            card_list=card_list,
+            lender=interaction.user.id,
+            borrower=borrower.id,
+            tag=tag,
+        )
+    except (CardListInputError, CardNotFoundError) as e:
+        await send_error(interaction, e)
+        return
+
+    message = f"{borrower.mention} returned **{cards_returned}** \
+        cards to {interaction.user.mention}"
+    await send_public(
+        interaction, message, allowed_mentions=discord.AllowedMentions.none()
+    )
+
 
 class InsertCardLoansModal(discord.ui.Modal, title="LoanList"):
     loanlist: discord.ui.TextInput
 
-    def __init__(self, db: sessionmaker[Session], borrower: discord.Member, tag: str):
+    def __init__(
+        self, db: Database | AsyncDatabase, borrower: discord.Member, tag: str
+    ):
         super().__init__()
         self.loanlist = discord.ui.TextInput(
             label="LoanList",
@@ -37,40 +124,22 @@ class InsertCardLoansModal(discord.ui.Modal, title="LoanList"):
         self.borrower = borrower
         self.tag = tag
 
+    @deferred(name="loan:submit")
     async def on_submit(self, interaction: discord.Interaction):
-        with self.db.begin() as session:
-            cards_loaned = insert_cardloans(
-                session=session,
-                card_list=self.loanlist.value.split("\n"),
-                lender=interaction.user.id,
-                borrower=self.borrower.id,
-                borrower_name=self.borrower.display_name,
-                tag=self.tag,
-            )
-            message = f"{interaction.user.mention} \
-                loaned **{cards_loaned}** cards to \
-                {self.borrower.mention}"
-            await interaction.response.send_message(
-                message, allowed_mentions=discord.AllowedMentions.none()
-            )
-
-    async def on_error(  # type: ignore[override]
-        self, interaction: discord.Interaction, error: Exception, /
-    ) -> None:
-        if isinstance(error, CardListInputError):
-            await interaction.response.send_message(str(error), ephemeral=True)
-        else:
-            LOGGER.info(traceback.format_exc())
-            await interaction.response.send_message(
-                "Oops! Something went wrong.", ephemeral=True
-            )
+        await loan_cards(
+            self.db,
+            interaction,
+            self.loanlist.value.split("\n"),
+            self.borrower,
+            self.tag,
+        )
 
 
 class ReturnCardLoansModal(discord.ui.Modal, title="LoanList"):
     loanlist: discord.ui.TextInput
 
     def __init__(
-        self, db: sessionmaker[Session], borrower: discord.Member, tag: str = ""
+        self, db: Database | AsyncDatabase, borrower: discord.Member, tag: str = ""
     ):
         super().__init__()
         self.loanlist = discord.ui.TextInput(
@@ -85,48 +154,35 @@ class ReturnCardLoansModal(discord.ui.Modal, title="LoanList"):
         self.borrower = borrower
         self.tag = tag
 
+    @deferred(name="return:submit")
     async def on_submit(self, interaction: discord.Interaction):
-        with self.db.begin() as session:
-            try:
-                cards_returned = return_cardloans(
-                    session=session,
-                    card_list=self.loanlist.value.split("\n"),
-                    lender=interaction.user.id,
-                    borrower=self.borrower.id,
-                    tag=self.tag,
-                )
-                message = f"{self.borrower.mention} returned **{cards_returned}** \
-                    cards to {interaction.user.mention}"
-                await interaction.response.send_message(
-                    message, allowed_mentions=discord.AllowedMentions.none()
-                )
-            except CardNotFoundError as e:
-                await interaction.response.send_message(str(e), ephemeral=True)
-
-    async def on_error(  # type: ignore[override]
-        self, interaction: discord.Interaction, error: Exception, /
-    ) -> None:
-        if isinstance(error, CardListInputError):
-            await interaction.response.send_message(str(error), ephemeral=True)
-        elif isinstance(error, CardNotFoundError):
-            await interaction.response.send_message(str(error), ephemeral=True)
-        else:
-            LOGGER.info(traceback.format_exc())
-            await interaction.response.send_message(
-                "Oops! Something went wrong.", ephemeral=True
-            )
+        await return_cards(
+            self.db,
+            interaction,
+            self.loanlist.value.split("\n"),
+            self.borrower,
+            self.tag,
+        )
 
 
 class CardLender(commands.Cog):
-    def __init__(self, bot: Magic512Bot):
+    def __init__(self, bot: "Magic512Bot"):
         self.bot: Magic512Bot = bot
         LOGGER.info("CardLender Cog Initialized")
 
+    async def cog_load(self) -> None:
+        # Read the card catalog and index it for suggestions now, rather than
+        # on the first loan or typo
+        catalog = await asyncio.to_thread(load_card_catalog)
+        if catalog is not None:
+            await asyncio.to_thread(getattr, catalog, "suggestion_index")
+
     @app_commands.command(name="loan", description="Loan a card")
     @app_commands.checks.has_role(Roles.TEAM.role_id)
     @app_commands.describe(
         borrower="Team member you wish to lend cards to",
         tag="Order tag for bulk returning cards",
+        decklist="Decklist file (.txt or .dek) to loan instead of typing a list",
     )
     @app_commands.rename(borrower="to")
     async def loan_handler(
@@ -134,16 +190,22 @@ class CardLender(commands.Cog):
         interaction: discord.Interaction,
         borrower: discord.Member,
         tag: str | None = "",
+        decklist: discord.Attachment | None = None,
     ):
         tag = tag if tag is not None else ""
+        if decklist is not None:
+            await self.loan_decklist(interaction, borrower, tag, decklist)
+            return
         loan_modal = InsertCardLoansModal(self.bot.db, borrower, tag)
         await interaction.response.send_modal(loan_modal)
+        record_ack(interaction)
 
     @app_commands.command(name="return", description="Return a card")
     @app_commands.checks.has_role(Roles.TEAM.role_id)
     @app_commands.describe(
         borrower="@mention member that is returning the loaned cards",
         tag="Return cards with a given order tag",
+        decklist="Decklist file (.txt or .dek) to return instead of typing a list",
     )
     @app_commands.rename(borrower="from")
     async def return_cards_handler(
@@ -151,10 +213,48 @@ class CardLender(commands.Cog):
         interaction: discord.Interaction,
         borrower: discord.Member,
         tag: str | None = "",
+        decklist: discord.Attachment | None = None,
     ):
         tag = tag if tag is not None else ""
+        if decklist is not None:
+            await self.return_decklist(interaction, borrower, tag, decklist)
+            return
         return_modal = ReturnCardLoansModal(self.bot.db, borrower, tag)
         await interaction.response.send_modal(return_modal)
+        record_ack(interaction)
+
+    # Decklists skip the modal, and its 1000 character limit, so the command
+    # itself is deferred while the file downloads
+
+    @deferred()
+    async def loan_decklist(
+        self,
+        interaction: discord.Interaction,
+        borrower: discord.Member,
+        tag: str,
+        decklist: discord.Attachment,
+    ):
+        try:
+            card_list = await read_decklist(decklist)
+        except DecklistError as e:
+            await send_error(interaction, e)
+            return
+        await loan_cards(self.bot.db, interaction, card_list, borrower, tag)
+
+    @deferred()
+    async def return_decklist(
+        self,
+        interaction: discord.Interaction,
+        borrower: discord.Member,
+        tag: str,
+        decklist: discord.Attachment,
+    ):
+        try:
+            card_list = await read_decklist(decklist)
+        except DecklistError as e:
+            await send_error(interaction, e)
+            return
+        await return_cards(self.bot.db, interaction, card_list, borrower, tag)
 
     @app_commands.command(name="bulk-return", description="Return many cards")
     @app_commands.checks.has_role(Roles.TEAM.role_id)
@@ -163,25 +263,26 @@ class CardLender(commands.Cog):
         tag="Return cards with a given order tag",
     )
     @app_commands.rename(borrower="from")
+    @deferred()
     async def bulk_return_cards_handler(
         self,
         interaction: discord.Interaction,
         borrower: discord.Member,
         tag: str | None = "",
     ):
-        with self.bot.db.begin() as session:
-            returned_count = bulk_return_cardloans(
-                session=session,
-                lender=interaction.user.id,
-                borrower=borrower.id,
-                tag=tag if tag is not None else "",
-            )
-            message = f"{borrower.mention} returned **{returned_count}** \
-                cards to {interaction.user.mention}."
-            await interaction.response.send_message(
-                message,
-                allowed_mentions=discord.AllowedMentions.none(),
-            )
+        returned_count = await self.bot.db.run(
+            bulk_return_cardloans,
+            lender=interaction.user.id,
+            borrower=borrower.id,
+            tag=tag if tag is not None else "",
+        )
+        message = f"{borrower.mention} returned **{returned_count}** \
+            cards to {interaction.user.mention}."
+        await send_public(
+            interaction,
+            message,
+            allowed_mentions=discord.AllowedMentions.none(),
+        )
 
     @app_commands.command(
         name="list-loans", description="Check loans from given borrower"
@@ -192,39 +293,39 @@ class CardLender(commands.Cog):
         tag="Query for cards with given order tag",
     )
     @app_commands.rename(borrower="to")
+    @deferred()
     async def list_loans_handler(
         self,
         interaction: discord.Interaction,
         borrower: discord.Member,
         tag: str | None = "",
     ):
-        with self.bot.db.begin() as session:
-            results = get_cardloans(
-                session=session,
-                lender=interaction.user.id,
-                borrower=borrower.id,
-                tag=tag if tag is not None else "",
-            )
-            card_sum = sum(card.quantity for card in results)
-            response = (
-                f"{interaction.user.mention} has loaned"
-                + f"**{card_sum}** card(s) to {borrower.mention}\n\n"
-            )
-            response += "```\n" + format_loanlist_output(results) + "```"
-            await interaction.response.send_message(
-                response, allowed_mentions=discord.AllowedMentions.none()
-            )
+        results = await self.bot.db.run(
+            get_cardloans,
+            lender=interaction.user.id,
+            borrower=borrower.id,
+            tag=tag if tag is not None else "",
+        )
+        card_sum = sum(card.quantity for card in results)
+        response = (
+            f"{interaction.user.mention} has loaned"
+            + f"**{card_sum}** card(s) to {borrower.mention}\n\n"
+        )
+        response += "```\n" + format_loanlist_output(results) + "```"
+        await send_public(
+            interaction, response, allowed_mentions=discord.AllowedMentions.none()
+        )
 
     @app_commands.command(
         name="list-all-loans", description="Check loans from all borrowers"
     )
     @app_commands.checks.has_role(Roles.TEAM.role_id)
+    @deferred()
     async def list_all_loans_handler(self, interaction: discord.Interaction):
-        with self.bot.db.begin() as session:
-            results = bulk_get_cardloans(session=session, lender=interaction.user.id)
-            response = "```\n" + format_bulk_loanlist_output(results) + "```"
-            await interaction.response.send_message(response)
+        loan_totals = await self.bot.db.run(get_loan_totals, lender=interaction.user.id)
+        response = "```\n" + format_bulk_loanlist_output(loan_totals) + "```"
+        await send_public(interaction, response)
 
 
-async def setup(bot: Magic512Bot) -> None:
+async def setup(bot: "Magic512Bot") -> None:
     await bot.add_cog(CardLender(bot))  # type: ignore
@@ -1,11 +1,14 @@
 from datetime import date, datetime, time, timedelta
+from typing import TYPE_CHECKING
 
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
+from sqlalchemy.orm import Session
 
 from magic512bot.config import LOGGER, TIMEZONE
-from magic512bot.main import Magic512Bot
+from magic512bot.interactions import deferred
+from magic512bot.models.nomination import Nomination as NominationModel
 from magic512bot.services.nomination import (
     MAX_NOMINATION_LENGTH,
     add_nomination,
@@ -24,6 +27,10 @@ from magic512bot.services.task_run import (
 
 from .constants import Channels, Roles, Weekday
 
+if TYPE_CHECKING:
+    # Annotations only, so importing a cog doesn't import the bot module
+    from magic512bot.main import Magic512Bot
+
 # Define the timezone at the top of the file
 MAX_USER_NOMINATIONS = 2
 MORNING_HOUR = time(hour=9, minute=0, tzinfo=TIMEZONE)
@@ -55,8 +62,10 @@ def is_poll_creation_period_active() -> bool:
     current_time = now.time()
 
     LOGGER.debug(
-        f"Checking poll creation period: day={current_day}, time={current_time}, "
-        f"morning_hour={MORNING_HOUR}"
+        "Checking poll creation period: day=%s, time=%s, morning_hour=%s",
+        current_day,
+        current_time,
+        MORNING_HOUR,
     )
 
     # Sunday after 9 AM
@@ -77,7 +86,7 @@ def is_poll_creation_period_active() -> bool:
 
 
 class Nomination(commands.Cog):
-    def __init__(self, bot: Magic512Bot):
+    def __init__(self, bot: "Magic512Bot"):
         self.bot: Magic512Bot = bot
         LOGGER.info("Nominations Cog Initialized")
         # Start the daily check
@@ -91,7 +100,7 @@ class Nomination(commands.Cog):
             await self.check_missed_tasks()
             LOGGER.info("Nomination Cog: Finished checking for missed tasks")
         except Exception as e:
-            LOGGER.error(f"Error checking missed tasks: {e!s}")
+            LOGGER.error("Error checking missed tasks: %s", e)
 
     async def cog_unload(self) -> None:
         """Cancel the daily check when the cog is unloaded."""
@@ -99,28 +108,28 @@ class Nomination(commands.Cog):
 
     @app_commands.command(name="nominate", description="Nominate a format to play next")
     @app_commands.describe(format="The format you want to nominate")
+    @deferred()
     async def nominate(self, interaction: discord.Interaction, format: str) -> None:
         """Nominate a format to play next."""
         # Explicitly cast interaction.user to Member
         if not isinstance(interaction.user, discord.Member):
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "Failed to fetch your member information!", ephemeral=True
             )
             return
 
         # Check if this is a nomination week
-        with self.bot.db.begin() as session:
-            if not should_run_nominations_this_week(session):
-                await interaction.response.send_message(
-                    "Nominations are not open this week. "
-                    "Nominations are open every other week.",
-                    ephemeral=True,
-                )
-                return
+        if not await self.bot.db.run(should_run_nominations_this_week):
+            await interaction.followup.send(
+                "Nominations are not open this week. "
+                "Nominations are open every other week.",
+                ephemeral=True,
+            )
+            return
 
         # Check if nominations are currently open
         if not is_nomination_period_active():
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "Nominations are currently closed. "
                 "Nominations are open from Thursday 9:00 AM to Sunday 9:00 AM.",
                 ephemeral=True,
@@ -128,65 +137,62 @@ class Nomination(commands.Cog):
             return
 
         if len(format) > MAX_NOMINATION_LENGTH:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "Format is too long. Please keep it under 55 characters.",
                 ephemeral=True,
             )
             return
 
         # Check if user already has 2 nominations
-        with self.bot.db.begin() as session:
-            if (
-                len(get_user_nominations(session, interaction.user.id))
-                >= MAX_USER_NOMINATIONS
-            ):
-                await interaction.response.send_message(
-                    "You have already used your maximum of 2 nominations this week.",
-                    ephemeral=True,
-                )
-                return
+        user_nominations = await self.bot.db.run(
+            get_user_nominations, interaction.user.id
+        )
+        if len(user_nominations) >= MAX_USER_NOMINATIONS:
+            await interaction.followup.send(
+                "You have already used your maximum of 2 nominations this week.",
+                ephemeral=True,
+            )
+            return
 
-        with self.bot.db.begin() as session:
-            try:
-                add_nomination(
-                    session=session, user_id=interaction.user.id, format=format
-                )
-                # Send a message to the user
-                await interaction.response.send_message(
-                    f"✅ Your nomination for **{format}** has been recorded!",
-                    ephemeral=True,
-                )
+        try:
+            await self.bot.db.run(
+                add_nomination, user_id=interaction.user.id, format=format
+            )
+            # Send a message to the user
+            await interaction.followup.send(
+                f"✅ Your nomination for **{format}** has been recorded!",
+                ephemeral=True,
+            )
 
-                # Also send a message to the wc-wednesday channel
-                channel = self.bot.get_channel(Channels.WC_WEDNESDAY_CHANNEL_ID)
-                if channel and isinstance(channel, discord.TextChannel):
-                    await channel.send(
-                        f"🎲 **{interaction.user.display_name}** has nominated "
-                        f"**{format}**!"
-                    )
-                else:
-                    LOGGER.error(
-                        f"Could not find text channel with ID "
-                        f"{Channels.WC_WEDNESDAY_CHANNEL_ID}"
-                    )
-            except ValueError as e:
-                await interaction.response.send_message(
-                    f"❌ {e!s}",
-                    ephemeral=True,
+            # Also send a message to the wc-wednesday channel
+            channel = self.bot.get_channel(Channels.WC_WEDNESDAY_CHANNEL_ID)
+            if channel and isinstance(channel, discord.TextChannel):
+                await channel.send(
+                    f"🎲 **{interaction.user.display_name}** has nominated "
+                    f"**{format}**!"
                 )
-            except Exception as e:
-                LOGGER.error(f"Error in nominate command: {e!s}")
-                await interaction.response.send_message(
-                    "❌ Error recording nomination. Try again later.",
-                    ephemeral=True,
+            else:
+                LOGGER.error(
+                    "Could not find text channel with ID %s",
+                    Channels.WC_WEDNESDAY_CHANNEL_ID,
                 )
+        except ValueError as e:
+            await interaction.followup.send(
+                f"❌ {e!s}",
+                ephemeral=True,
+            )
+        except Exception as e:
+            LOGGER.error("Error in nominate command: %s", e)
+            await interaction.followup.send(
+                "❌ Error recording nomination. Try again later.",
+                ephemeral=True,
+            )
 
     async def have_sent_nominations_open_message(self) -> bool:
         """Check if we have sent the nominations open message for the current week."""
-        with self.bot.db.begin() as session:
-            last_nominations_open = get_last_nomination_open_date(session)
+        last_nominations_open = await self.bot.db.run(get_last_nomination_open_date)
 
-        LOGGER.debug(f"Last nominations open date: {last_nominations_open}")
+        LOGGER.debug("Last nominations open date: %s", last_nominations_open)
 
         if not last_nominations_open:
             return False
@@ -199,8 +205,8 @@ class Nomination(commands.Cog):
         days_since_wednesday = (today.weekday() - 2) % 7
         this_wednesday = today - timedelta(days=days_since_wednesday)
 
-        LOGGER.debug(f"This Wednesday's date: {this_wednesday}")
-        LOGGER.debug(f"Checking if {last_nominations_open} >= {this_wednesday}")
+        LOGGER.debug("This Wednesday's date: %s", this_wednesday)
+        LOGGER.debug("Checking if %s >= %s", last_nominations_open, this_wednesday)
 
         # Check if the last run was this week (on or after Wednesday)
         return last_nominations_open >= this_wednesday
@@ -212,22 +218,21 @@ class Nomination(commands.Cog):
         Returns:
             bool: True if a poll has been created for this week, False otherwise.
         """
-        with self.bot.db.begin() as session:
-            # Get the active poll ID and last poll creation date
-            last_poll_creation = get_poll_last_run_date(session)
+        # Get the last poll creation date
+        last_poll_creation = await self.bot.db.run(get_poll_last_run_date)
 
-            # If there's no last poll creation date, we haven't created a poll
-            if last_poll_creation is None:
-                return False
+        # If there's no last poll creation date, we haven't created a poll
+        if last_poll_creation is None:
+            return False
 
-            # Calculate this week's Wednesday (the start of our week)
-            today = datetime.now(TIMEZONE).date()
-            # Wednesday is 2 in weekday()
-            days_since_wednesday = (today.weekday() - 2) % 7
-            this_wednesday = today - timedelta(days=days_since_wednesday)
+        # Calculate this week's Wednesday (the start of our week)
+        today = datetime.now(TIMEZONE).date()
+        # Wednesday is 2 in weekday()
+        days_since_wednesday = (today.weekday() - 2) % 7
+        this_wednesday = today - timedelta(days=days_since_wednesday)
 
-            # Check if the last poll creation was this week (on or after Wednesday)
-            return last_poll_creation >= this_wednesday
+        # Check if the last poll creation was this week (on or after Wednesday)
+        return last_poll_creation >= this_wednesday
 
     async def check_missed_tasks(self) -> None:
         """
@@ -239,27 +244,28 @@ class Nomination(commands.Cog):
         """
         now = datetime.now(TIMEZONE)
         LOGGER.info(
-            f"Checking missed tasks at {now}\n"
-            f"    (weekday: {now.weekday()}, hour: {now.hour})"
+            "Checking missed tasks at %s\n (weekday: %s, hour: %s)",
+            now,
+            now.weekday(),
+            now.hour,
         )
 
-        with self.bot.db.begin() as session:
-            # Check if this is a nomination week
-            if not should_run_nominations_this_week(session):
-                LOGGER.info("This is not a nomination week, skipping nomination tasks")
-                return
+        # Check if this is a nomination week
+        if not await self.bot.db.run(should_run_nominations_this_week):
+            LOGGER.info("This is not a nomination week, skipping nomination tasks")
+            return
 
-            # Check for missed nomination opening (Thursday 9:00 AM - Sunday 9:00 AM)
-            if (
-                is_nomination_period_active()
-                and not await self.have_sent_nominations_open_message()
-            ):
-                LOGGER.info("Running missed nominations open task")
-                await self.send_nominations_open_message()
+        # Check for missed nomination opening (Thursday 9:00 AM - Sunday 9:00 AM)
+        if (
+            is_nomination_period_active()
+            and not await self.have_sent_nominations_open_message()
+        ):
+            LOGGER.info("Running missed nominations open task")
+            await self.send_nominations_open_message()
 
-            if is_poll_creation_period_active() and not await self.have_created_poll():
-                LOGGER.info("Running missed poll creation task")
-                await self.create_poll()
+        if is_poll_creation_period_active() and not await self.have_created_poll():
+            LOGGER.info("Running missed poll creation task")
+            await self.create_poll()
 
     @tasks.loop(time=MORNING_HOUR)
     async def daily_check(self) -> None:
@@ -267,27 +273,25 @@ class Nomination(commands.Cog):
         now = datetime.now(TIMEZONE)
         today = now.date()
 
-        with self.bot.db.begin() as session:
-            # Check if this is a nomination week
-            if not should_run_nominations_this_week(session):
-                LOGGER.info("This is not a nomination week, skipping nomination tasks")
-                return
+        # Check if this is a nomination week
+        if not await self.bot.db.run(should_run_nominations_this_week):
+            LOGGER.info("This is not a nomination week, skipping nomination tasks")
+            return
 
-            # Thursday - Open nominations, if we haven't run it today
-            if (
-                now.weekday() == Weekday.THURSDAY.value
-                and not await self.have_sent_nominations_open_message()
-            ):
-                await self.send_nominations_open_message()
-                LOGGER.info(f"Ran Nominations Open Task on {today} during Daily Check")
-
-            # Sunday - Create poll, if we haven't run it today
-            elif (
-                now.weekday() == Weekday.SUNDAY.value
-                and not await self.have_created_poll()
-            ):
-                await self.create_poll()
-                LOGGER.info(f"Ran Poll Creation Task on {today} during Daily Check")
+        # Thursday - Open nominations, if we haven't run it today
+        if (
+            now.weekday() == Weekday.THURSDAY.value
+            and not await self.have_sent_nominations_open_message()
+        ):
+            await self.send_nominations_open_message()
+            LOGGER.info("Ran Nominations Open Task on %s during Daily Check", today)
+
+        # Sunday - Create poll, if we haven't run it today
+        elif (
+            now.weekday() == Weekday.SUNDAY.value and not await self.have_created_poll()
+        ):
+            await self.create_poll()
+            LOGGER.info("Ran Poll Creation Task on %s during Daily Check", today)
 
     async def send_nominations_open_message(self) -> None:
         """Send a message to open nominations."""
@@ -295,7 +299,7 @@ class Nomination(commands.Cog):
         channel = self.bot.get_channel(Channels.WC_WEDNESDAY_CHANNEL_ID)
         if not channel or not isinstance(channel, discord.TextChannel):
             LOGGER.error(
-                f"Could not find channel with ID {Channels.WC_WEDNESDAY_CHANNEL_ID}"
+                "Could not find channel with ID %s", Channels.WC_WEDNESDAY_CHANNEL_ID
             )
             return
 
@@ -317,13 +321,11 @@ class Nomination(commands.Cog):
 
             # Only update last run date if message was sent successfully
             LOGGER.debug("Updating last run date in database...")
-            with self.bot.db.begin() as session:
-                LOGGER.debug(f"Using session: {session}")
-                set_nomination(session)
-                LOGGER.debug("Last run date updated in database")
+            await self.bot.db.run(set_nomination)
+            LOGGER.debug("Last run date updated in database")
 
         except Exception as e:
-            LOGGER.error(f"Error sending nominations open message: {e}")
+            LOGGER.error("Error sending nominations open message: %s", e)
             raise
 
     def get_next_wednesday(self) -> date:
@@ -341,63 +343,57 @@ class Nomination(commands.Cog):
         channel = self.bot.get_channel(Channels.WC_WEDNESDAY_CHANNEL_ID)
         if not channel or not isinstance(channel, discord.TextChannel):
             LOGGER.error(
-                f"Could not find channel with ID {Channels.WC_WEDNESDAY_CHANNEL_ID}"
+                "Could not find channel with ID %s", Channels.WC_WEDNESDAY_CHANNEL_ID
             )
             return
 
         try:
-            with self.bot.db.begin() as session:
-                LOGGER.info("Fetching nominations from database...")
-                nominations = get_all_nominations(session)
-                unique_formats = set(nom.format.title() for nom in nominations)
+            LOGGER.info("Fetching nominations from database...")
+            nominations = await self.bot.db.run(get_all_nominations)
+            unique_formats = set(nom.format.title() for nom in nominations)
+            LOGGER.info(
+                "Found %s unique formats: %s", len(unique_formats), unique_formats
+            )
+
+            if not unique_formats:
                 LOGGER.info(
-                    f"Found {len(unique_formats)} unique formats: {unique_formats}"
+                    "No nominations were submitted this week skipping poll creation"
                 )
+                await channel.send("No nominations were submitted this week :(")
+                return
 
-                if not unique_formats:
-                    LOGGER.info(
-                        "No nominations were submitted this week skipping poll creation"
-                    )
-                    await channel.send("No nominations were submitted this week :(")
-                    return
-
-                # Use the helper method
-                next_wednesday = self.get_next_wednesday()
-                formatted_date = next_wednesday.strftime("%B %d, %Y")
-                poll_title = f"WC Wednesday Format Voting for {formatted_date}"
-
-                # Create the poll
-                poll = discord.Poll(
-                    question=poll_title,
-                    duration=timedelta(hours=12),
-                    multiple=True,
-                )
+            # Use the helper method
+            next_wednesday = self.get_next_wednesday()
+            formatted_date = next_wednesday.strftime("%B %d, %Y")
+            poll_title = f"WC Wednesday Format Voting for {formatted_date}"
 
-                for format_name in unique_formats:
-                    poll.add_answer(text=f"{format_name}")
+            # Create the poll
+            poll = discord.Poll(
+                question=poll_title,
+                duration=timedelta(hours=12),
+                multiple=True,
+            )
 
-                # Send the poll
-                LOGGER.debug("Sending poll message...")
-                poll_message = await channel.send(
-                    content="# 🗳️ Format Voting 🗳️\n\nVote for next week's format!",
-                    poll=poll,
-                )
-                LOGGER.debug(f"Poll message sent with ID: {poll_message.id}")
+            for format_name in unique_formats:
+                poll.add_answer(text=f"{format_name}")
 
-                # Store the poll ID and clear nominations
-                LOGGER.debug("Clearing nominations...")
-                clear_all_nominations(session)
-                LOGGER.info(f"Created poll with {len(unique_formats)} format options")
+            # Send the poll
+            LOGGER.debug("Sending poll message...")
+            poll_message = await channel.send(
+                content="# 🗳️ Format Voting 🗳️\n\nVote for next week's format!",
+                poll=poll,
+            )
+            LOGGER.debug("Poll message sent with ID: %s", poll_message.id)
 
-                LOGGER.debug(f"Setting poll with message ID {poll_message.id}")
-                LOGGER.debug(f"Using session: {session}")
-                set_poll(session, poll_message.id)
-                LOGGER.debug("Poll set in database")
+            # Store the poll ID and clear nominations
+            LOGGER.debug("Clearing nominations, setting poll %s", poll_message.id)
+            await self.bot.db.run(_record_poll, poll_message.id)
+            LOGGER.info("Created poll with %s format options", len(unique_formats))
 
             LOGGER.info("Successfully created poll")
 
         except Exception as e:
-            LOGGER.error(f"Error creating poll: {e}", exc_info=True)
+            LOGGER.error("Error creating poll: %s", e, exc_info=True)
             raise
 
     def in_poll_checking_window(self) -> bool:
@@ -431,10 +427,11 @@ class Nomination(commands.Cog):
     )
     @app_commands.checks.has_role(Roles.MOD.role_id)
     @app_commands.guild_only()
+    @deferred()
     async def debug_nominations(self, interaction: discord.Interaction) -> None:
         """Show debug information about nominations and polls."""
         if not interaction.guild or not isinstance(interaction.user, discord.Member):
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "This command can only be used in a server!", ephemeral=True
             )
             return
@@ -463,75 +460,76 @@ class Nomination(commands.Cog):
             )
 
             # Get all nominations and dates
-            with self.bot.db.begin() as session:
-                nominations = get_all_nominations(session)
-                active_poll_id = get_active_poll_id(session)
-                last_poll_date = get_poll_last_run_date(session)
-                last_nomination_date = get_last_nomination_open_date(session)
-
-                # Add nominations section
-                if nominations:
-                    nominations_text = ""
-                    for nom in nominations:
-                        if not hasattr(nom, "user_id") or not hasattr(nom, "format"):
-                            continue
-                        user = interaction.guild.get_member(nom.user_id)
-                        user_name = (
-                            user.display_name
-                            if user
-                            else f"Unknown (ID: {nom.user_id})"
-                        )
-                        nominations_text += f"{user_name}: {nom.format}\n"
-
-                    if nominations_text:
-                        embed.add_field(
-                            name=f"Nominations ({len(nominations)})",
-                            value=f"```\n{nominations_text}```",
-                            inline=False,
-                        )
-                    else:
-                        embed.add_field(
-                            name="Nominations",
-                            value="```\nNo valid nominations in database```",
-                            inline=False,
-                        )
+            (
+                nominations,
+                active_poll_id,
+                last_poll_date,
+                last_nomination_date,
+            ) = await self.bot.db.run(_load_debug_state)
+
+            # Add nominations section
+            if nominations:
+                nominations_text = ""
+                for nom in nominations:
+                    if not hasattr(nom, "user_id") or not hasattr(nom, "format"):
+                        continue
+                    user = interaction.guild.get_member(nom.user_id)
+                    user_name = (
+                        user.display_name
+                        if user
+                        else f"Unknown (ID: {nom.user_id})"
+                    )
+                    nominations_text += f"{user_name}: {nom.format}\n"
+
+                if nominations_text:
+                    embed.add_field(
+                        name=f"Nominations ({len(nominations)})",
+                        value=f"```\n{nominations_text}```",
+                        inline=False,
+                    )
                 else:
                     embed.add_field(
                         name="Nominations",
-                        value="```\nNo nominations in database```",
+                        value="```\nNo valid nominations in database```",
                         inline=False,
                     )
-
-                # Add task dates section
-                dates_text = (
-                    f"Last Poll Creation: "
-                    f"{
-                        last_poll_date.strftime('%Y-%m-%d')
-                        if last_poll_date
-                        else 'Never'
-                    }\n"
-                    f"Last Nominations Open: "
-                    f"{
-                        last_nomination_date.strftime('%Y-%m-%d')
-                        if last_nomination_date
-                        else 'Never'
-                    }"
-                )
+            else:
                 embed.add_field(
-                    name="Task Dates",
-                    value=f"```\n{dates_text}```",
+                    name="Nominations",
+                    value="```\nNo nominations in database```",
                     inline=False,
                 )
 
-                # Add active poll section
-                poll_status = (
-                    f"Active Poll ID: {active_poll_id}"
-                    if active_poll_id
-                    else "No active poll"
-                )
-                embed.add_field(
-                    name="Poll Status", value=f"```\n{poll_status}```", inline=False
-                )
+            # Add task dates section
+            dates_text = (
+                f"Last Poll Creation: "
+                f"{
+                    last_poll_date.strftime('%Y-%m-%d')
+                    if last_poll_date
+                    else 'Never'
+                }\n"
+                f"Last Nominations Open: "
+                f"{
+                    last_nomination_date.strftime('%Y-%m-%d')
+                    if last_nomination_date
+                    else 'Never'
+                }"
+            )
+            embed.add_field(
+                name="Task Dates",
+                value=f"```\n{dates_text}```",
+                inline=False,
+            )
+
+            # Add active poll section
+            poll_status = (
+                f"Active Poll ID: {active_poll_id}"
+                if active_poll_id
+                else "No active poll"
+            )
+            embed.add_field(
+                name="Poll Status", value=f"```\n{poll_status}```", inline=False
+            )
 
             # Add task status section
             nominations_open = await self.have_sent_nominations_open_message()
@@ -548,16 +546,33 @@ class Nomination(commands.Cog):
                 inline=False,
             )
 
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await interaction.followup.send(embed=embed, ephemeral=True)
 
         except Exception as e:
-            LOGGER.error(f"Error in debug-nominations command: {e}", exc_info=True)
-            await interaction.response.send_message(
+            LOGGER.error("Error in debug-nominations command: %s", e, exc_info=True)
+            await interaction.followup.send(
                 "❌ Error retrieving debug information. Check logs for details.",
                 ephemeral=True,
             )
 
 
-async def setup(bot: Magic512Bot) -> None:
+def _record_poll(session: Session, poll_id: int) -> None:
+    """Clears this cycle's nominations and stores the poll that replaced them."""
+    clear_all_nominations(session)
+    set_poll(session, poll_id)
+
+
+def _load_debug_state(
+    session: Session,
+) -> tuple[list[NominationModel], int | None, date | None, date | None]:
+    return (
+        get_all_nominations(session),
+        get_active_poll_id(session),
+        get_poll_last_run_date(session),
+        get_last_nomination_open_date(session),
+    )
+
+
+async def setup(bot: "Magic512Bot") -> None:
     """Load the Nomination cog."""
     await bot.add_cog(Nomination(bot))
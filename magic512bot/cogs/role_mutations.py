@@ -0,0 +1,104 @@
+import asyncio
+from dataclasses import dataclass
+
+import discord
+
+from .constants import (
+    MILESTONE_ROLES,
+    OMNI_SWEAT_THRESHOLD,
+    SWEAT_KNIGHT_THRESHOLD,
+    SWEAT_LORD_THRESHOLD,
+    SWEAT_ROLES,
+    Role,
+    Roles,
+)
+
+
+@dataclass
+class RolePlan:
+    """The complete role list a member should end up with."""
+
+    roles: list[discord.Role]
+    # Milestone role the plan newly grants, if any
+    milestone: Role | None
+
+
+def milestone_for(sweat_role_count: int) -> Role | None:
+    if sweat_role_count >= OMNI_SWEAT_THRESHOLD:
+        return Roles.OMNI_SWEAT
+    if sweat_role_count >= SWEAT_LORD_THRESHOLD:
+        return Roles.SWEAT_LORD
+    if sweat_role_count >= SWEAT_KNIGHT_THRESHOLD:
+        return Roles.SWEAT_KNIGHT
+    return None
+
+
+def plan_role_grant(
+    member: discord.Member, guild: discord.Guild, role: discord.Role
+) -> RolePlan:
+    """
+    Plans granting `role` to `member`, along with the sweat milestone their new
+    sweat role count earns, replacing any lower milestone.
+    """
+    # @everyone can't be assigned, so it's left out of the list
+    roles = {r.id: r for r in member.roles if not r.is_default()}
+    roles[role.id] = role
+
+    sweat_role_count = sum(1 for r in roles.values() if r.name in SWEAT_ROLES)
+    milestone = milestone_for(sweat_role_count)
+    if milestone is None or milestone.name in {r.name for r in roles.values()}:
+        return RolePlan(list(roles.values()), None)
+    if not (milestone_role := guild.get_role(milestone.role_id)):
+        return RolePlan(list(roles.values()), None)
+
+    roles = {id_: r for id_, r in roles.items() if r.name not in MILESTONE_ROLES}
+    roles[milestone_role.id] = milestone_role
+    return RolePlan(list(roles.values()), milestone)
+
+
+class RoleMutationQueue:
+    """
+    Applies role plans with one `member.edit(roles=...)` call each, one at a
+    time per guild.
+
+    Member edits in a guild share a Discord rate-limit bucket, so queueing
+    them per guild keeps concurrent approvals from bursting into 429s, while
+    discord.py still waits out any limit that is hit. Each plan is computed
+    once the guild's queue reaches it, from the member's roles at that time.
+
+    `member.edit` doesn't update the cached member, and the gateway event
+    that does may arrive after the next queued grant is planned, so grants
+    queued behind another for the same member are planned from the member
+    the previous edit returned.
+    """
+
+    def __init__(self) -> None:
+        self._locks: dict[int, asyncio.Lock] = {}
+        # (guild id, member id) -> grants queued or running for the member
+        self._queued: dict[tuple[int, int], int] = {}
+        # (guild id, member id) -> member returned by their last edit, kept
+        # while more grants for them are queued
+        self._edited: dict[tuple[int, int], discord.Member] = {}
+
+    async def grant(
+        self, member: discord.Member, role: discord.Role, reason: str | None = None
+    ) -> Role | None:
+        """Grants `role` and any milestone it earns. Returns the milestone."""
+        key = (member.guild.id, member.id)
+        lock = self._locks.setdefault(member.guild.id, asyncio.Lock())
+        self._queued[key] = self._queued.get(key, 0) + 1
+        try:
+            async with lock:
+                current = self._edited.get(key, member)
+                plan = plan_role_grant(current, member.guild, role)
+                if edited := await member.edit(roles=plan.roles, reason=reason):
+                    self._edited[key] = edited
+        finally:
+            self._queued[key] -= 1
+            if not self._queued[key]:
+                del self._queued[key]
+                self._edited.pop(key, None)
+        return plan.milestone
+
+
+ROLE_MUTATIONS = RoleMutationQueue()
@@ -1,92 +1,145 @@
+import itertools
+import re
+import time
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, cast
+
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 from magic512bot.config import LOGGER
-from magic512bot.main import Magic512Bot
+from magic512bot.database import AsyncDatabase, Database
+from magic512bot.interactions import deferred, send_public
+from magic512bot.metrics import (
+    LEADERBOARD_CACHE_HITS,
+    LEADERBOARD_CACHE_MISSES,
+    ROLE_MIRROR_CHANGES,
+    ROLE_MIRROR_WRITES,
+)
+from magic512bot.models.role_request import APPROVED, DENIED, PENDING
+from magic512bot.services.role_request import (
+    create_role_request,
+    get_role_request,
+    get_sweat_role_holders,
+    get_top_sweat_users,
+    reopen_role_request,
+    resolve_role_request,
+    upsert_user_sweat_roles,
+)
 
 from .constants import (
     ALLOWED_ROLE_REQUESTS,
-    MILESTONE_ROLES,
-    OMNI_SWEAT_THRESHOLD,
-    SWEAT_KNIGHT_THRESHOLD,
-    SWEAT_LORD_THRESHOLD,
     SWEAT_ROLES,
     Channels,
     Role,
     Roles,
 )
+from .role_mutations import ROLE_MUTATIONS
+
+if TYPE_CHECKING:
+    # Annotations only, so importing a cog doesn't import the bot module
+    from magic512bot.main import Magic512Bot
+
+APPROVE = "approve"
+DENY = "deny"
+
+# Members written per upsert batch by /bootstrap-db, and how many batches to
+# sync between progress messages
+BOOTSTRAP_BATCH_SIZE = 1000
+BOOTSTRAP_PROGRESS_EVERY = 5
+# How often member role changes are written to the database
+ROLE_MIRROR_FLUSH_SECONDS = 10
+
+
+class RoleRequestButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"role-request:(?P<action>approve|deny):(?P<request_id>[0-9]+)",
+):
+    """
+    Approve/Deny button for a stored role request.
+
+    The action and request id live in the custom_id, and the request itself is
+    loaded from the database when the button is clicked, so buttons keep
+    working across restarts without holding a view in memory per request.
+    """
+
+    def __init__(self, action: str, request_id: int, disabled: bool = False) -> None:
+        super().__init__(
+            discord.ui.Button(
+                label=action.capitalize(),
+                style=discord.ButtonStyle.green
+                if action == APPROVE
+                else discord.ButtonStyle.red,
+                custom_id=f"role-request:{action}:{request_id}",
+                disabled=disabled,
+            )
+        )
+        self.action = action
+        self.request_id = request_id
 
+    @classmethod
+    async def from_custom_id(
+        cls,
+        interaction: discord.Interaction,
+        item: discord.ui.Item,
+        match: re.Match[str],
+        /,
+    ) -> "RoleRequestButton":
+        return cls(match["action"], int(match["request_id"]))
+
+    @deferred(thinking=False, name="role-request:button")
+    async def callback(self, interaction: discord.Interaction) -> None:
+        bot = cast("Magic512Bot", interaction.client)
+        if self.action == APPROVE:
+            await self.approve(bot, interaction)
+        else:
+            await self.deny(bot, interaction)
 
-class RoleRequestView(discord.ui.View):
-    def __init__(self, user_id: int, role_id: int, reason: str):
-        super().__init__(timeout=None)
-        self.user_id = user_id
-        self.role_id = role_id
-        self.reason = reason
-
-    @discord.ui.button(label="Approve", style=discord.ButtonStyle.green)
     async def approve(
-        self, interaction: discord.Interaction, button: discord.ui.Button
+        self, bot: "Magic512Bot", interaction: discord.Interaction
     ) -> None:
         # Get the role and member
         if not (guild := interaction.guild):
             LOGGER.error(
-                f"Guild not found for interaction from user {interaction.user.id}"
+                "Guild not found for interaction from user %s", interaction.user.id
             )
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "Unable to find guild information!", ephemeral=True
             )
             return
 
-        LOGGER.info(
-            f"Processing role approval - Role ID: {self.role_id}, "
-            f"User ID: {self.user_id}, Guild ID: {guild.id}"
-        )
-
-        if not (requested_role := guild.get_role(self.role_id)):
-            LOGGER.error(
-                f"Role not found - Role ID: {self.role_id}, Guild ID: {guild.id}"
-            )
-            await interaction.response.send_message(
-                "Unable to find role information!", ephemeral=True
-            )
+        if not (target := await self._load_approval_target(bot, interaction, guild)):
             return
+        requested_role, member = target
 
-        if not (member := guild.get_member(self.user_id)):
-            LOGGER.error(
-                f"Member not found - User ID: {self.user_id}, Guild ID: {guild.id}"
-            )
-            await interaction.response.send_message(
-                "Unable to find member information!", ephemeral=True
+        # Claim the request, so a second moderator clicking at the same time
+        # doesn't apply it twice
+        if not await bot.db.run(
+            resolve_role_request, self.request_id, APPROVED, interaction.user.id
+        ):
+            await interaction.followup.send(
+                "This role request has already been handled.", ephemeral=True
             )
             return
 
-        LOGGER.info(
-            f"Found role and member - Role: {requested_role.name}, "
-            f"Member: {member.display_name}"
-        )
-
+        role_added = False
         try:
-            if member.get_role(self.role_id):
-                LOGGER.warning(
-                    f"User already has role - User: {member.display_name}, "
-                    f"Role: {requested_role.name}"
-                )
-                await interaction.response.send_message(
-                    "User already has this role!", ephemeral=True
-                )
-                return
-
-            # Add Sweat Role to member, and db
+            # Add the requested role, and any milestone it earns, in one edit
             LOGGER.info(
-                f"Adding role {requested_role.name} to member {member.display_name}"
+                "Adding role %s to member %s", requested_role.name, member.display_name
             )
-            await member.add_roles(requested_role)
+            milestone = await ROLE_MUTATIONS.grant(
+                member,
+                requested_role,
+                reason=f"Role request approved by {interaction.user.display_name}",
+            )
+            role_added = True
 
             LOGGER.info(
-                f"Successfully added role {requested_role.name} to \
-                    {member.display_name}"
+                "Successfully added role %s to %s",
+                requested_role.name,
+                member.display_name,
             )
 
             # DM the user
@@ -95,88 +148,159 @@ class RoleRequestView(discord.ui.View):
                     f"Your request for the role {requested_role.name} "
                     + "has been approved! 🎉"
                 )
-                LOGGER.info(f"Sent DM to user {member.display_name}")
+                LOGGER.info("Sent DM to user %s", member.display_name)
             except discord.HTTPException:
                 LOGGER.warning(
-                    f"Could not send DM to user \
-                        {member.display_name} - DMs may be disabled"
+                    "Could not send DM to user %s - DMs may be disabled",
+                    member.display_name,
                 )
 
             # Send confirmation
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 f"✅ {interaction.user.mention} Approved role"
                 + f" {requested_role.name} for {member.mention}",
                 allowed_mentions=discord.AllowedMentions.none(),
             )
 
-            LOGGER.info(f"Processing milestone roles for user {member.display_name}")
-            role_for_message = await _process_user_milestone_roles(member, guild)
-            if role_for_message is None:
-                role_for_message = Role.from_id(requested_role.id)
+            role_for_message = milestone or Role.from_id(requested_role.id)
 
             # Send Congratulations Message
-            if not (general_channel := guild.get_channel(Channels.GENERAL_CHANNEL_ID)):
-                await interaction.response.send_message(
-                    "Unable to find general channel!", ephemeral=True
-                )
-                return
-
+            general_channel = guild.get_channel(Channels.GENERAL_CHANNEL_ID)
             if not isinstance(general_channel, discord.TextChannel):
-                await interaction.response.send_message(
+                await interaction.followup.send(
                     "Unable to find general channel!", ephemeral=True
                 )
-                return
-            if role_for_message is not None:
+            elif role_for_message is not None:
                 await self.send_congratulations_message(
                     member, general_channel, role_for_message
                 )
 
             # Disable the button
-            self.disable_buttons()
             if message := interaction.message:
-                await message.edit(view=self)
+                await message.edit(
+                    view=RoleRequestView(self.request_id, disabled=True)
+                )
                 LOGGER.info("Disabled approval buttons")
 
         except discord.HTTPException as e:
             LOGGER.error(
-                f"Discord HTTP error while adding role - "
-                f"Role: {requested_role.name}, "
-                f"Member: {member.display_name}, "
-                f"Error: {e!s}"
+                "Discord HTTP error while adding role - "
+                "Role: %s, Member: %s, Error: %s",
+                requested_role.name,
+                member.display_name,
+                e,
             )
-            await interaction.response.send_message(
+            if not role_added:
+                await bot.db.run(reopen_role_request, self.request_id)
+            await interaction.followup.send(
                 "❌ Failed to add role. Please check bot permissions.",
                 ephemeral=True,
             )
         except Exception as e:
             LOGGER.error(
-                f"Unexpected error while adding role - "
-                f"Role: {requested_role.name}, "
-                f"Member: {member.display_name}, "
-                f"Error: {e!s}",
+                "Unexpected error while adding role - "
+                "Role: %s, Member: %s, Error: %s",
+                requested_role.name,
+                member.display_name,
+                e,
                 exc_info=True,
             )
-            await interaction.response.send_message(
+            if not role_added:
+                await bot.db.run(reopen_role_request, self.request_id)
+            await interaction.followup.send(
                 "❌ An unexpected error occurred. Please check the logs.",
                 ephemeral=True,
             )
 
-    @discord.ui.button(label="Deny", style=discord.ButtonStyle.red)
+    async def _load_approval_target(
+        self,
+        bot: "Magic512Bot",
+        interaction: discord.Interaction,
+        guild: discord.Guild,
+    ) -> tuple[discord.Role, discord.Member] | None:
+        """
+        Loads the pending request and resolves its role and member, replying
+        to the moderator and returning None if it can't be approved.
+        """
+        request = await bot.db.run(get_role_request, self.request_id)
+        if request is None or request.status != PENDING:
+            await interaction.followup.send(
+                "This role request has already been handled.", ephemeral=True
+            )
+            return None
+
+        LOGGER.info(
+            "Processing role approval - Request ID: %s, "
+            "Role ID: %s, User ID: %s, Guild ID: %s",
+            self.request_id,
+            request.role_id,
+            request.user_id,
+            guild.id,
+        )
+
+        if not (requested_role := guild.get_role(request.role_id)):
+            LOGGER.error(
+                "Role not found - Role ID: %s, Guild ID: %s", request.role_id, guild.id
+            )
+            await interaction.followup.send(
+                "Unable to find role information!", ephemeral=True
+            )
+            return None
+
+        if not (member := guild.get_member(request.user_id)):
+            LOGGER.error(
+                "Member not found - User ID: %s, Guild ID: %s",
+                request.user_id,
+                guild.id,
+            )
+            await interaction.followup.send(
+                "Unable to find member information!", ephemeral=True
+            )
+            return None
+
+        LOGGER.info(
+            "Found role and member - Role: %s, Member: %s",
+            requested_role.name,
+            member.display_name,
+        )
+
+        if member.get_role(request.role_id):
+            LOGGER.warning(
+                "User already has role - User: %s, Role: %s",
+                member.display_name,
+                requested_role.name,
+            )
+            await interaction.followup.send(
+                "User already has this role!", ephemeral=True
+            )
+            return None
+
+        return requested_role, member
+
     async def deny(
-        self, interaction: discord.Interaction, button: discord.ui.Button
+        self, bot: "Magic512Bot", interaction: discord.Interaction
     ) -> None:
         # Get the role and member
         if not (guild := interaction.guild):
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "Unable to find guild information!", ephemeral=True
             )
             return
 
-        requested_role = guild.get_role(self.role_id)
-        member = guild.get_member(self.user_id)
+        request = await bot.db.run(
+            resolve_role_request, self.request_id, DENIED, interaction.user.id
+        )
+        if request is None:
+            await interaction.followup.send(
+                "This role request has already been handled.", ephemeral=True
+            )
+            return
+
+        requested_role = guild.get_role(request.role_id)
+        member = guild.get_member(request.user_id)
         if requested_role and member:
             # Send confirmation
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 f"{interaction.user.mention} Denied role {requested_role.name}"
                 + f" for {member.mention}",
                 allowed_mentions=discord.AllowedMentions.none(),
@@ -189,7 +313,8 @@ class RoleRequestView(discord.ui.View):
             except discord.HTTPException:
                 pass  # User might have DMs disabled
 
-        self.disable_buttons()
+        if message := interaction.message:
+            await message.edit(view=RoleRequestView(self.request_id, disabled=True))
 
     async def send_congratulations_message(
         self, member: discord.Member, channel: discord.TextChannel, role: Role
@@ -199,34 +324,216 @@ class RoleRequestView(discord.ui.View):
         else:
             await channel.send(role.message.format(user=member.mention))
 
-    def disable_buttons(self) -> None:
-        for item in self.children:
-            if isinstance(item, discord.ui.Button):
-                item.disabled = True
+
+class RoleRequestView(discord.ui.View):
+    """Approve/Deny buttons for the role request with id `request_id`."""
+
+    def __init__(self, request_id: int, disabled: bool = False) -> None:
+        super().__init__(timeout=None)
+        self.add_item(RoleRequestButton(APPROVE, request_id, disabled=disabled))
+        self.add_item(RoleRequestButton(DENY, request_id, disabled=disabled))
+        # Clicks are routed by custom_id to RoleRequestButton, which is
+        # registered once in setup(), so this view never needs to be kept in
+        # the client's view store.
+        self.stop()
+
+
+class SweatLeaderboard:
+    """
+    A guild's members grouped by how many sweat roles they hold.
+
+    Built once from the member cache and then kept current from member
+    events, so reading it costs O(output) instead of O(members * roles).
+    Members without sweat roles aren't tracked.
+
+    The rendered leaderboard text is cached until a tracked member's sweat
+    role count or display name changes.
+    """
+
+    def __init__(self) -> None:
+        # member id -> sweat role count
+        self.counts: dict[int, int] = {}
+        # sweat role count -> member id -> display name
+        self.names_by_count: dict[int, dict[int, str]] = {}
+        self._rendered: str | None = None
+
+    @classmethod
+    def from_members(cls, members: Iterable[discord.Member]) -> "SweatLeaderboard":
+        leaderboard = cls()
+        for member in members:
+            leaderboard.update(member)
+        return leaderboard
+
+    def update(self, member: discord.Member) -> None:
+        """Re-files `member` under their current sweat role count."""
+        count = 0 if member.bot else _sweat_role_count(member)
+        old_count = self.counts.get(member.id, 0)
+        if count == old_count and (
+            count == 0
+            or self.names_by_count[count][member.id] == member.display_name
+        ):
+            return
+
+        self.remove(member)
+        if count:
+            self.counts[member.id] = count
+            self.names_by_count.setdefault(count, {})[member.id] = member.display_name
+            self._rendered = None
+
+    def remove(self, member: discord.Member) -> None:
+        if (count := self.counts.pop(member.id, None)) is None:
+            return
+        bucket = self.names_by_count[count]
+        del bucket[member.id]
+        if not bucket:
+            del self.names_by_count[count]
+        self._rendered = None
+
+    def ranked(self) -> list[tuple[int, list[str]]]:
+        """Returns (count, sorted display names) pairs, highest count first."""
+        return [
+            (count, sorted(self.names_by_count[count].values()))
+            for count in sorted(self.names_by_count, reverse=True)
+        ]
+
+    def render(self) -> str:
+        """Returns the leaderboard embed text, re-rendering only if it changed."""
+        if self._rendered is not None:
+            LEADERBOARD_CACHE_HITS.inc()
+            return self._rendered
+
+        LEADERBOARD_CACHE_MISSES.inc()
+        leaderboard_text = []
+        for count, names in self.ranked():
+            display_names = ", ".join(f"**{name}**" for name in names)
+            role_text = "role" if count == 1 else "roles"
+            leaderboard_text.append(f"**{count} {role_text}**: {display_names}")
+
+        if leaderboard_text:
+            self._rendered = "\n".join(leaderboard_text)
+        else:
+            self._rendered = "No sweat roles found! 💨"
+        return self._rendered
+
+
+class SweatRoleMirror:
+    """
+    Write-behind buffer mirroring members' sweat roles into the database.
+
+    Member events only record each member's latest state; `flush` writes
+    everything recorded since the last flush in batched upserts, so a burst
+    of changes (e.g. a mod assigning roles to many members, or one member
+    several times) costs a few statements instead of one write per event.
+    """
+
+    def __init__(self, db: Database | AsyncDatabase) -> None:
+        self.db = db
+        # member id -> (member id, display name, sweat role names)
+        self.pending: dict[int, tuple[int, str, list[str]]] = {}
+
+    def record(self, member: discord.Member, role_names: list[str]) -> None:
+        self.pending[member.id] = (member.id, member.display_name, role_names)
+        ROLE_MIRROR_CHANGES.inc()
+
+    async def flush(self) -> int:
+        """Writes pending changes. Returns the number of rows written."""
+        if not self.pending:
+            return 0
+        batch, self.pending = self.pending, {}
+        rows = 0
+        try:
+            for chunk in itertools.batched(
+                batch.values(), BOOTSTRAP_BATCH_SIZE, strict=False
+            ):
+                rows += await self.db.run(upsert_user_sweat_roles, chunk)
+        except Exception:
+            # Keep the changes for the next flush, unless newer ones came in
+            for member_id, state in batch.items():
+                self.pending.setdefault(member_id, state)
+            raise
+        ROLE_MIRROR_WRITES.inc(len(batch))
+        return rows
 
 
 class RoleRequest(commands.Cog):
-    def __init__(self, bot: Magic512Bot):
+    def __init__(self, bot: "Magic512Bot"):
         self.bot = bot
+        # guild id -> leaderboard, built on ready or on first /leaderboard
+        self.leaderboards: dict[int, SweatLeaderboard] = {}
+        self.role_mirror = SweatRoleMirror(bot.db)
         LOGGER.info("RoleRequest Cog Initialized")
 
+    async def cog_load(self) -> None:
+        self.flush_role_mirror.start()
+
+    async def cog_unload(self) -> None:
+        """Stops the mirror and writes anything still pending."""
+        self.flush_role_mirror.cancel()
+        await self.role_mirror.flush()
+
+    @tasks.loop(seconds=ROLE_MIRROR_FLUSH_SECONDS)
+    async def flush_role_mirror(self) -> None:
+        try:
+            if rows := await self.role_mirror.flush():
+                LOGGER.info("Mirrored sweat roles (%s rows)", rows)
+        except Exception as e:
+            LOGGER.error("Error mirroring sweat roles: %s", e)
+
+    def get_leaderboard(self, guild: discord.Guild) -> SweatLeaderboard:
+        if (leaderboard := self.leaderboards.get(guild.id)) is None:
+            leaderboard = SweatLeaderboard.from_members(guild.members)
+            self.leaderboards[guild.id] = leaderboard
+        return leaderboard
+
+    @commands.Cog.listener()
+    async def on_ready(self) -> None:
+        """Builds the leaderboards from the member cache."""
+        # on_ready fires again after a reconnect, when member events may have
+        # been missed, so always rebuild rather than keep the old index
+        for guild in self.bot.guilds:
+            self.leaderboards[guild.id] = SweatLeaderboard.from_members(guild.members)
+        LOGGER.info("Built sweat leaderboards for %s guild(s)", len(self.bot.guilds))
+
+    @commands.Cog.listener()
+    async def on_member_update(
+        self, before: discord.Member, after: discord.Member
+    ) -> None:
+        if (leaderboard := self.leaderboards.get(after.guild.id)) is not None:
+            leaderboard.update(after)
+
+        if after.bot:
+            return
+        role_names = _sweat_role_names(after)
+        if role_names != _sweat_role_names(before) or (
+            role_names and before.display_name != after.display_name
+        ):
+            self.role_mirror.record(after, role_names)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member) -> None:
+        if (leaderboard := self.leaderboards.get(member.guild.id)) is not None:
+            leaderboard.remove(member)
+        if not member.bot and _sweat_role_names(member):
+            self.role_mirror.record(member, [])
+
     @app_commands.command(name="monarch-assign")
     @app_commands.describe(to="the team member who will receive Monarch")
     @app_commands.checks.has_role(Roles.THE_MONARCH.role_id)
     @app_commands.guild_only()
+    @deferred()
     async def give_monarch(
         self, interaction: discord.Interaction, to: discord.Member
     ) -> None:
         # Ensure we're in a guild
         if not interaction.guild:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "This command can only be used in a server!", ephemeral=True
             )
             return
 
         # Explicitly cast interaction.user to Member
         if not isinstance(interaction.user, discord.Member):
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "Failed to fetch your member information!", ephemeral=True
             )
             return
@@ -234,14 +541,14 @@ class RoleRequest(commands.Cog):
         # Fetch the role by name
         role = discord.utils.get(interaction.guild.roles, name=Roles.THE_MONARCH)
         if not role:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 f"Could not find the {Roles.THE_MONARCH} role!", ephemeral=True
             )
             return
 
         user = interaction.user
         if role not in user.roles:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "You do not have the Monarch role to be able to assign it",
                 ephemeral=True,
             )
@@ -256,7 +563,7 @@ class RoleRequest(commands.Cog):
             role, reason=f"Monarch transfer initiated by {user.display_name}"
         )
 
-        await interaction.response.send_message(
+        await interaction.followup.send(
             f"Successfully transferred {role.mention} role from you to {to.mention}",
             ephemeral=True,
         )
@@ -264,8 +571,8 @@ class RoleRequest(commands.Cog):
         if channel := interaction.guild.get_channel(Channels.TEAM_GENERAL_CHANNEL_ID):
             if not isinstance(channel, discord.TextChannel):
                 LOGGER.error(
-                    f"Could not find text channel with ID "
-                    f"{Channels.TEAM_GENERAL_CHANNEL_ID}"
+                    "Could not find text channel with ID %s",
+                    Channels.TEAM_GENERAL_CHANNEL_ID,
                 )
                 return
             await channel.send(
@@ -294,39 +601,44 @@ class RoleRequest(commands.Cog):
     @app_commands.rename(role_name="role")
     @app_commands.autocomplete(role_name=role_autocomplete)
     @app_commands.guild_only()
+    @deferred()
     async def request_role(
-        self, interaction: discord.Interaction, role_name: str, reason: str
+        self,
+        interaction: discord.Interaction,
+        role_name: str,
+        # Stored with the request and shown in an embed field, capped at 1024
+        reason: app_commands.Range[str, 1, 1024],
     ) -> None:
         if not (guild := interaction.guild):
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "Unable to obtain guild object where request made", ephemeral=True
             )
             return
 
         # Explicitly cast interaction.user to Member
         if not isinstance(interaction.user, discord.Member):
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "Failed to fetch your member information!", ephemeral=True
             )
             return
 
         # Check if role has "Sweat" in the name
         if role_name not in ALLOWED_ROLE_REQUESTS:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "❌ You can only request Sweat and Competitive Roles",
                 ephemeral=True,
             )
             return
 
         if not (role := discord.utils.get(guild.roles, name=role_name)):
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "Unable to find role requested.",
                 ephemeral=True,
             )
             return
 
         if role in interaction.user.roles:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "You already have this role.", ephemeral=True
             )
             return
@@ -351,16 +663,20 @@ class RoleRequest(commands.Cog):
         if not role_request_channel or not isinstance(
             role_request_channel, discord.TextChannel
         ):
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "❌ Could not find moderator channel. Please contact an administrator.",
                 ephemeral=True,
             )
             return
 
-        # Create view with approve button
-        view = RoleRequestView(
-            user_id=interaction.user.id, role_id=role.id, reason=reason
+        request_id = await self.bot.db.run(
+            create_role_request,
+            guild_id=guild.id,
+            user_id=interaction.user.id,
+            role_id=role.id,
+            reason=reason,
         )
+        view = RoleRequestView(request_id)
 
         LOGGER.info("Sending RoleRequestView to role_request_channel")
         # Send to moderator channel
@@ -368,7 +684,7 @@ class RoleRequest(commands.Cog):
 
         LOGGER.info("Successfully Sent RoleRequestView to role_request_channel")
         # Confirm to user
-        await interaction.response.send_message(
+        await interaction.followup.send(
             "✅ Your role request has been submitted! Moderators will review it soon.",
             ephemeral=True,
         )
@@ -376,115 +692,125 @@ class RoleRequest(commands.Cog):
     @app_commands.command(name="bootstrap-db")
     @app_commands.checks.has_role(Roles.MOD.role_id)
     @app_commands.guild_only()
+    @deferred()
     async def bootstrap_db(self, interaction: discord.Interaction) -> None:
         if not (guild := interaction.guild):
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "This command can only be used in a server!", ephemeral=True
             )
             return
 
-        await interaction.response.send_message(
+        await interaction.followup.send(
             "Starting role synchronization. This may take a while...", ephemeral=True
         )
 
-        for member in guild.members:
-            if member.bot:
-                continue
+        snapshot = [
+            (member.id, member.display_name, _sweat_role_names(member))
+            for member in guild.members
+            if not member.bot
+        ]
+        total = len(snapshot)
+        start = time.perf_counter()
+        synced = rows = 0
+        for batch_number, batch in enumerate(
+            itertools.batched(snapshot, BOOTSTRAP_BATCH_SIZE, strict=False), start=1
+        ):
+            rows += await self.bot.db.run(upsert_user_sweat_roles, batch)
+            synced += len(batch)
+            if batch_number % BOOTSTRAP_PROGRESS_EVERY == 0 and synced < total:
+                await interaction.followup.send(
+                    f"Synced {synced}/{total} members...", ephemeral=True
+                )
 
+        elapsed = time.perf_counter() - start
+        LOGGER.info(
+            "Bootstrapped %s members (%s rows) in %.2fs for guild %s",
+            synced,
+            rows,
+            elapsed,
+            guild.id,
+        )
         await interaction.followup.send(
-            "Role synchronization complete!", ephemeral=True
+            f"Role synchronization complete! Synced {synced} members, {rows} rows "
+            f"in {elapsed:.1f}s ({rows / max(elapsed, 1e-6):.0f} rows/s).",
+            ephemeral=True,
         )
 
     @app_commands.command(name="leaderboard")
     @app_commands.guild_only()
+    @deferred()
     async def sweat_leaderboard(self, interaction: discord.Interaction) -> None:
         if not interaction.guild:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "This command can only be used in a server!", ephemeral=True
             )
             return
 
-        # Get sweat role counts for all members
-        count_to_members: dict[int, list[discord.Member]] = {}
-        for member in interaction.guild.members:
-            if member.bot:
-                continue
-            sweat_count = len(
-                [role for role in member.roles if role.name in SWEAT_ROLES]
-            )
-            if sweat_count > 0:
-                if sweat_count not in count_to_members:
-                    count_to_members[sweat_count] = []
-                count_to_members[sweat_count].append(member)
-
         # Create embed
         embed = discord.Embed(
             title="💦 Sweat Role Leaderboard 🏆",
+            description=self.get_leaderboard(interaction.guild).render(),
             color=discord.Color.blue(),
             timestamp=discord.utils.utcnow(),
         )
 
-        # Add entries sorted by count in descending order
-        leaderboard_text = []
-        for count in sorted(count_to_members.keys(), reverse=True):
-            members = count_to_members[count]
-            display_names = ", ".join(
-                f"**{member.display_name}**"
-                for member in sorted(members, key=lambda m: m.display_name)
-            )
-            role_text = "role" if count == 1 else "roles"
-            leaderboard_text.append(f"**{count} {role_text}**: {display_names}")
+        await send_public(interaction, embed=embed)
 
-        if leaderboard_text:
-            embed.description = "\n".join(leaderboard_text)
+    async def sweat_role_autocomplete(
+        self,
+        interaction: discord.Interaction,
+        current: str,
+    ) -> list[app_commands.Choice[str]]:
+        return [
+            app_commands.Choice(name=role_name, value=role_name)
+            for role_name in sorted(SWEAT_ROLES)
+            if current.lower() in role_name.lower()
+        ]
+
+    @app_commands.command(name="sweat-stats")
+    @app_commands.describe(role="Show who holds this sweat role instead")
+    @app_commands.autocomplete(role=sweat_role_autocomplete)
+    @app_commands.guild_only()
+    @deferred()
+    async def sweat_stats(
+        self, interaction: discord.Interaction, role: str | None = None
+    ) -> None:
+        # Read from the mirrored user_sweat_roles table, so this works without
+        # the member cache (e.g. before on_ready, or with chunking disabled)
+        if role is None:
+            top_users = await self.bot.db.run(get_top_sweat_users)
+            title = "💦 Top Sweats"
+            lines = [
+                f"**{user_name}**: {count} {'role' if count == 1 else 'roles'}"
+                for _, user_name, count in top_users
+            ]
+        elif role in SWEAT_ROLES:
+            holders = await self.bot.db.run(get_sweat_role_holders, role)
+            title = f"💦 {role} ({len(holders)})"
+            lines = [f"**{user.user_name}**" for user in holders]
         else:
-            embed.description = "No sweat roles found! 💨"
+            await interaction.followup.send(
+                f"`{role}` isn't a sweat role.", ephemeral=True
+            )
+            return
 
-        await interaction.response.send_message(embed=embed)
+        embed = discord.Embed(
+            title=title,
+            description="\n".join(lines) or "No sweat roles found! 💨",
+            color=discord.Color.blue(),
+            timestamp=discord.utils.utcnow(),
+        )
+        await send_public(interaction, embed=embed)
 
 
-async def setup(bot: Magic512Bot) -> None:
+async def setup(bot: "Magic512Bot") -> None:
+    bot.add_dynamic_items(RoleRequestButton)
     await bot.add_cog(RoleRequest(bot))
 
 
-async def _clear_user_sweat_milestones(member: discord.Member) -> None:
-    for role in member.roles:
-        if role.name in MILESTONE_ROLES:
-            await member.remove_roles(role)
-
+def _sweat_role_count(member: discord.Member) -> int:
+    return sum(1 for role in member.roles if role.name in SWEAT_ROLES)
 
-async def _process_user_milestone_roles(
-    member: discord.Member, guild: discord.Guild
-) -> Role | None:
-    member_roles = set(role.name for role in member.roles)
-    sweat_role_count = len([role for role in member_roles if role in SWEAT_ROLES])
 
-    # Add Milestone Role, if necessary
-    role = None
-    if sweat_role_count >= OMNI_SWEAT_THRESHOLD:
-        if Roles.OMNI_SWEAT.name in member_roles:
-            return None
-        await _clear_user_sweat_milestones(member)
-        if omnisweat_role := guild.get_role(Roles.OMNI_SWEAT.role_id):
-            await member.add_roles(omnisweat_role)
-            role = Roles.OMNI_SWEAT
-
-    elif (
-        sweat_role_count >= SWEAT_LORD_THRESHOLD
-        and sweat_role_count < OMNI_SWEAT_THRESHOLD
-    ):
-        if Roles.SWEAT_LORD.name in member_roles:
-            return None
-        await _clear_user_sweat_milestones(member)
-        if sweat_lord_role := guild.get_role(Roles.SWEAT_LORD.role_id):
-            await member.add_roles(sweat_lord_role)
-            role = Roles.SWEAT_LORD
-
-    elif sweat_role_count >= SWEAT_KNIGHT_THRESHOLD:
-        if Roles.SWEAT_KNIGHT.name in member_roles:
-            return None
-        await _clear_user_sweat_milestones(member)
-        if sweat_knight_role := guild.get_role(Roles.SWEAT_KNIGHT.role_id):
-            await member.add_roles(sweat_knight_role)
-            role = Roles.SWEAT_KNIGHT
-    return role
+def _sweat_role_names(member: discord.Member) -> list[str]:
+    return sorted(role.name for role in member.roles if role.name in SWEAT_ROLES)
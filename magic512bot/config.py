@@ -1,16 +1,57 @@
+import atexit
+import copy
+import json
 import logging
 import os
+import queue
 import sys
-from typing import Final
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Final
 from zoneinfo import ZoneInfo
 
 from dotenv import load_dotenv
 
+from magic512bot.metrics import LOG_RECORDS_DROPPED
+
 load_dotenv()
 
 TEST_GUILD_ID = 1074039539280121936
+# Sync slash commands on startup even if they haven't changed since the last sync
+FORCE_COMMAND_SYNC = (os.getenv("FORCE_COMMAND_SYNC") or "false").lower() == "true"
+# Run cog setups concurrently on startup instead of one after another
+COG_LOAD_CONCURRENT = (os.getenv("COG_LOAD_CONCURRENT") or "true").lower() == "true"
 DB_CONNECTION_STRING = os.getenv("DB_CONNECTION_STRING") or ""
 BOT_TOKEN = os.getenv("BOT_TOKEN") or ""
+# Worker threads used to run blocking database calls off the event loop
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS") or 4)
+# "sync" runs SQLAlchemy on a thread pool, "async" uses asyncpg / aiosqlite
+DB_ENGINE_MODE = os.getenv("DB_ENGINE_MODE") or "sync"
+# Connection pool tuning (pool size / overflow are ignored for SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE") or 5)
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW") or 10)
+DB_POOL_PRE_PING = (os.getenv("DB_POOL_PRE_PING") or "true").lower() == "true"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE") or 1800)  # seconds, -1 disables
+# SQL statement logging: "" (off), "info" (statements) or "debug" (+ result rows)
+DB_ECHO = (os.getenv("DB_ECHO") or "").lower()
+# Statements slower than this are logged as warnings; 0 disables
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS") or 250)
+# Local Prometheus endpoint (http://METRICS_HOST:METRICS_PORT/metrics); 0 disables
+METRICS_HOST = os.getenv("METRICS_HOST") or "127.0.0.1"
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 9512)
+# Log file, rotated once it reaches LOG_MAX_BYTES, keeping LOG_BACKUP_COUNT old files
+LOG_FILE = os.getenv("LOG_FILE") or "bot.log"
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES") or 10 * 1024 * 1024)
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT") or 5)
+# Records waiting for the log writer thread; further records are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE") or 10_000)
+# "json" for one JSON object per line, "text" for the plain format
+LOG_FORMAT = (os.getenv("LOG_FORMAT") or "json").lower()
+# Card name catalog built by `python -m magic512bot.card_catalog`
+CARD_CATALOG_PATH = os.getenv("CARD_CATALOG_PATH") or os.path.join(
+    os.path.dirname(__file__), "data", "card_catalog.pickle"
+)
 TIMEZONE = ZoneInfo("America/Chicago")  # This handles CDT/CST automatically
 MODERATOR_CHANNEL_ID = 1074040269642661910
 
@@ -20,6 +61,69 @@ def is_running_tests() -> bool:
     return "pytest" in sys.modules
 
 
+# Fields identifying what the current task is handling (interaction_id,
+# command, guild_id), added to its log records. Tasks started from a handler
+# copy the context, and Database.run carries it onto its worker thread.
+LOG_CONTEXT: ContextVar[dict[str, Any] | None] = ContextVar("log_context", default=None)
+
+
+def bind_log_context(**fields: Any) -> None:
+    """Adds fields to the log context of the current task."""
+    LOG_CONTEXT.set({**(LOG_CONTEXT.get() or {}), **fields})
+
+
+class LogContextFilter(logging.Filter):
+    """Stores the log context on each record, before it leaves the logging task."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = LOG_CONTEXT.get() or {}
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including the log context."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, "context", {}),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler for a bounded queue that drops records when the queue is full,
+    counting them by level, instead of blocking or raising.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only records that pass the level check get here, so %-style
+        # arguments are only formatted for enabled levels. The message and
+        # traceback are rendered now, while the objects they refer to are
+        # still safe to read, and the listener's formatter adds the rest.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(record.levelname).inc()
+
+
 def setup_logger() -> logging.Logger:
     logger = logging.getLogger("magic512bot")
     # Set DEBUG level for tests, INFO for normal running
@@ -27,22 +131,45 @@ def setup_logger() -> logging.Logger:
 
     # Create handlers
     c_handler = logging.StreamHandler(sys.stdout)
-    f_handler = logging.FileHandler("bot.log")
+    f_handler = RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT
+    )
 
     # Console shows DEBUG for tests, INFO for normal running
     c_handler.setLevel(logging.DEBUG if is_running_tests() else logging.INFO)
     f_handler.setLevel(logging.DEBUG)  # File always logs DEBUG
 
     # Create formatters and add it to handlers
-    format = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    format = (
+        JsonFormatter()
+        if LOG_FORMAT == "json"
+        else logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    )
     c_handler.setFormatter(format)
     f_handler.setFormatter(format)
 
-    # Add handlers to the logger
-    logger.addHandler(c_handler)
-    logger.addHandler(f_handler)
+    # Log calls only put the record on a queue; a listener thread does the
+    # console and file I/O, so logging never blocks the event loop
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    listener = QueueListener(
+        log_queue, c_handler, f_handler, respect_handler_level=True
+    )
+    listener.start()
+    # Flush whatever is still queued on shutdown
+    atexit.register(listener.stop)
+
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(LogContextFilter())
+    logger.addHandler(queue_handler)
 
     return logger
 
 
 LOGGER: Final[logging.Logger] = setup_logger()
+
+
+def attach_log_queue(logger: logging.Logger) -> None:
+    """Sends another library's logger through the bot's log queue."""
+    for handler in LOGGER.handlers:
+        if handler not in logger.handlers:
+            logger.addHandler(handler)
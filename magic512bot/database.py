@@ -1,12 +1,360 @@
-from sqlalchemy import create_engine, inspect
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractAsyncContextManager, AbstractContextManager
+from typing import Any, Concatenate
 
-from magic512bot.config import DB_CONNECTION_STRING, LOGGER
+from sqlalchemy import (
+    Connection,
+    bindparam,
+    column,
+    create_engine,
+    event,
+    insert,
+    inspect,
+    make_url,
+    select,
+    table,
+    text,
+    update,
+)
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy_utils import JSONType  # type: ignore[import-untyped]
+
+from magic512bot.card_catalog import load_card_catalog, normalize_card_name
+from magic512bot.config import (
+    DB_CONNECTION_STRING,
+    DB_ECHO,
+    DB_ENGINE_MODE,
+    DB_EXECUTOR_WORKERS,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_SLOW_QUERY_MS,
+    LOGGER,
+    attach_log_queue,
+)
+from magic512bot.metrics import DB_CALL_SECONDS, add_db_time
 from magic512bot.models import register_models
 from magic512bot.models.base import Base
+from magic512bot.models.card import Card
+from magic512bot.models.user import UserSweatRole
+
+
+def engine_options(connection_string: str) -> dict[str, Any]:
+    """Builds create_engine keyword arguments from the DB_* settings."""
+    options: dict[str, Any] = {
+        # echo would add a blocking stdout handler; see configure_sql_logging
+        "echo": False,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    # SQLite uses a single-connection or per-file pool that doesn't take sizing
+    if make_url(connection_string).get_backend_name() != "sqlite":
+        options["pool_size"] = DB_POOL_SIZE
+        options["max_overflow"] = DB_MAX_OVERFLOW
+    return options
+
+
+def install_slow_query_log(
+    target: Engine, threshold_ms: float = DB_SLOW_QUERY_MS
+) -> None:
+    """
+    Logs statements taking at least `threshold_ms`, instead of echoing every
+    statement. Does nothing when the threshold is 0.
+    """
+    if threshold_ms <= 0:
+        return
+
+    @event.listens_for(target, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        context.query_started_at = time.perf_counter()
+
+    @event.listens_for(target, "after_cursor_execute")
+    def _log_if_slow(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - context.query_started_at) * 1000
+        if elapsed_ms >= threshold_ms:
+            LOGGER.warning("Slow query (%.0f ms): %s", elapsed_ms, statement)
+
+
+def configure_sql_logging(echo: str = DB_ECHO) -> None:
+    """
+    Logs SQL statements (DB_ECHO=info) or statements and result rows (debug)
+    through the bot's log queue.
+    """
+    if level := {"info": logging.INFO, "debug": logging.DEBUG}.get(echo):
+        sql_logger = logging.getLogger("sqlalchemy.engine")
+        sql_logger.setLevel(level)
+        attach_log_queue(sql_logger)
+
+
+configure_sql_logging()
+engine = create_engine(DB_CONNECTION_STRING, **engine_options(DB_CONNECTION_STRING))
+install_slow_query_log(engine)
+# Objects returned from Database.run are used after their session has closed,
+# so they must not be expired on commit.
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+
+# asyncio drivers used when DB_ENGINE_MODE=async, keyed by backend name
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+class Database:
+    """
+    Runs service functions against the database without blocking the event loop.
+
+    Each call to `run` executes in a bounded thread pool inside its own
+    transaction, so a slow round-trip only occupies a worker thread.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker[Session],
+        max_workers: int = DB_EXECUTOR_WORKERS,
+    ) -> None:
+        self.session_factory = session_factory
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="magic512bot-db"
+        )
+
+    def begin(self) -> AbstractContextManager[Session]:
+        """Opens a session and transaction on the calling thread."""
+        return self.session_factory.begin()
+
+    async def run[**P, T](
+        self,
+        func: Callable[Concatenate[Session, P], T],
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> T:
+        """
+        Calls `func(session, *args, **kwargs)` on a worker thread in a single
+        transaction, committing on success and rolling back on error.
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self._run_in_transaction, func, *args, **kwargs)
+        # Carry context variables (e.g. the log context) onto the worker thread
+        context = contextvars.copy_context()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self.executor, context.run, call)
+        finally:
+            # Includes time queued for a worker, which the command also waited on
+            add_db_time(time.perf_counter() - start)
+
+    def _run_in_transaction[**P, T](
+        self,
+        func: Callable[Concatenate[Session, P], T],
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> T:
+        start = time.perf_counter()
+        try:
+            with self.begin() as session:
+                return func(session, *args, **kwargs)
+        finally:
+            DB_CALL_SECONDS.observe(time.perf_counter() - start)
+
+    async def close(self) -> None:
+        # Waiting for in-flight queries blocks, so wait off the event loop
+        await asyncio.to_thread(self.executor.shutdown, wait=True)
+
+
+class AsyncDatabase:
+    """
+    Same interface as `Database`, backed by an `AsyncEngine`.
+
+    Service functions are run through `AsyncSession.run_sync`, so cogs and
+    services don't need to know which mode is configured.
+    """
+
+    def __init__(self, async_engine: AsyncEngine) -> None:
+        self.engine = async_engine
+        self.session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    def begin(self) -> AbstractAsyncContextManager[AsyncSession]:
+        return self.session_factory.begin()
 
-engine = create_engine(DB_CONNECTION_STRING, echo=True)  # type: ignore
-SessionLocal = sessionmaker(bind=engine)
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            async with self.begin() as session:
+                return await session.run_sync(func, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            DB_CALL_SECONDS.observe(elapsed)
+            add_db_time(elapsed)
+
+    async def close(self) -> None:
+        await self.engine.dispose()
+
+
+def to_async_url(connection_string: str) -> URL:
+    """Maps a sync connection string onto the matching asyncio driver."""
+    url = make_url(connection_string)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver configured for {backend} databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def create_database() -> Database | AsyncDatabase:
+    """Builds the database handle for the configured DB_ENGINE_MODE."""
+    if DB_ENGINE_MODE == "async":
+        async_engine = create_async_engine(
+            to_async_url(DB_CONNECTION_STRING), **engine_options(DB_CONNECTION_STRING)
+        )
+        install_slow_query_log(async_engine.sync_engine)
+        return AsyncDatabase(async_engine)
+    return Database(SessionLocal)
+
+
+def _create_missing_tables(connection: Connection) -> None:
+    inspector = inspect(connection)
+
+    # Get all table names from your models
+    model_tables = Base.metadata.tables.keys()
+    existing_tables = inspector.get_table_names()
+    LOGGER.info("Existing tables: %s", existing_tables)
+    LOGGER.info("Model tables: %s", model_tables)
+
+    # Check which tables need to be created
+    tables_to_create = set(model_tables) - set(existing_tables)
+
+    if tables_to_create:
+        LOGGER.info("🏗️ Creating missing tables: %s", tables_to_create)
+        Base.metadata.create_all(bind=connection)
+        LOGGER.info("✨ Tables created successfully!")
+    else:
+        LOGGER.info("👍 All tables already exist!")
+
+    # Before adding indexes, which cover the card_id column it adds
+    _migrate_card_names(connection)
+    _create_missing_indexes(connection)
+    _migrate_user_sweat_roles(connection)
+
+
+def _create_missing_indexes(connection: Connection) -> None:
+    """Adds indexes declared on models to tables created before they existed."""
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+
+    for model_table in Base.metadata.sorted_tables:
+        if model_table.name not in existing_tables:
+            continue
+        existing = {
+            index["name"] for index in inspector.get_indexes(model_table.name)
+        }
+        for index in model_table.indexes:
+            if index.name not in existing:
+                LOGGER.info(
+                    "🗂️ Creating missing index %s on %s", index.name, model_table.name
+                )
+                index.create(bind=connection)
+
+
+def _migrate_user_sweat_roles(connection: Connection) -> None:
+    """
+    Moves sweat roles from the old users.sweat_roles JSON column into
+    user_sweat_roles, then drops the column. Does nothing once migrated.
+    """
+    inspector = inspect(connection)
+    if "users" not in inspector.get_table_names():
+        return
+    if "sweat_roles" not in {col["name"] for col in inspector.get_columns("users")}:
+        return
+
+    legacy_users = table("users", column("id"), column("sweat_roles", JSONType))
+    rows: list[dict[str, object]] = []
+    for user_id, role_names in connection.execute(
+        select(legacy_users.c.id, legacy_users.c.sweat_roles)
+    ):
+        # The column held a JSON list of role names, or null
+        if isinstance(role_names, list):
+            rows.extend(
+                {"user_id": user_id, "role_name": role_name}
+                for role_name in set(role_names)
+            )
+    LOGGER.info("🚚 Migrating %s sweat roles to user_sweat_roles", len(rows))
+    if rows:
+        connection.execute(insert(UserSweatRole), rows)
+    connection.execute(text("ALTER TABLE users DROP COLUMN sweat_roles"))
+
+
+def _migrate_card_names(connection: Connection) -> None:
+    """
+    Moves card names from the old card_loans.card column into the cards
+    table, respelled as in the card catalog where it knows them, and points
+    each loan at its card by id, then drops the column. Does nothing once
+    migrated.
+    """
+    inspector = inspect(connection)
+    if "card_loans" not in inspector.get_table_names():
+        return
+    if "card" not in {col["name"] for col in inspector.get_columns("card_loans")}:
+        return
+
+    legacy_loans = table("card_loans", column("card"), column("card_id"))
+    catalog = load_card_catalog()
+    # legacy spelling -> normalized name of the card it's migrated to
+    card_keys: dict[str, str] = {}
+    cards: dict[str, str] = {}
+    legacy_names: list[str] = list(
+        connection.scalars(select(legacy_loans.c.card).distinct())
+    )
+    for name in legacy_names:
+        spelling = (catalog and catalog.canonical_name(name)) or " ".join(name.split())
+        card_keys[name] = normalize_card_name(spelling)
+        cards.setdefault(card_keys[name], spelling)
+    LOGGER.info("🚚 Migrating %s card names to cards", len(cards))
+    if cards:
+        connection.execute(
+            insert(Card),
+            [{"normalized_name": key, "name": name} for key, name in cards.items()],
+        )
+    card_ids = dict(
+        connection.execute(select(Card.normalized_name, Card.id)).tuples().all()
+    )
+
+    connection.execute(
+        text("ALTER TABLE card_loans ADD COLUMN card_id INTEGER REFERENCES cards (id)")
+    )
+    if card_keys:
+        connection.execute(
+            update(legacy_loans)
+            .where(legacy_loans.c.card == bindparam("legacy_card"))
+            .values(card_id=bindparam("migrated_card_id")),
+            [
+                {"legacy_card": name, "migrated_card_id": card_ids[key]}
+                for name, key in card_keys.items()
+            ],
+        )
+    # The old indexes cover the card column, which can't be dropped while
+    # they exist; _create_missing_indexes recreates them on card_id
+    for index in inspector.get_indexes("card_loans"):
+        if "card" in index["column_names"]:
+            connection.execute(text(f"DROP INDEX {index['name']}"))
+    connection.execute(text("ALTER TABLE card_loans DROP COLUMN card"))
+    # SQLite can't add NOT NULL to an existing column
+    if connection.dialect.name == "postgresql":
+        connection.execute(
+            text("ALTER TABLE card_loans ALTER COLUMN card_id SET NOT NULL")
+        )
 
 
 def init_db() -> bool:
@@ -14,29 +362,28 @@ def init_db() -> bool:
     Initialize the database, creating tables only if they don't exist.
     Returns True if successful, False if there was an error.
     """
-    inspector = inspect(engine)
     models = register_models()
     print(f"registering {len(models)}")
 
     try:
-        # Get all table names from your models
-        model_tables = Base.metadata.tables.keys()
-        existing_tables = inspector.get_table_names()
-        LOGGER.info(f"Existing tables: {existing_tables}")
-        LOGGER.info(f"Model tables: {model_tables}")
-
-        # Check which tables need to be created
-        tables_to_create = set(model_tables) - set(existing_tables)
-
-        if tables_to_create:
-            LOGGER.info(f"🏗️ Creating missing tables: {tables_to_create}")
-            Base.metadata.create_all(bind=engine)
-            LOGGER.info("✨ Tables created successfully!")
-        else:
-            LOGGER.info("👍 All tables already exist!")
+        with engine.begin() as connection:
+            _create_missing_tables(connection)
+        return True
+
+    except Exception as e:
+        LOGGER.error("💥 Database initialization failed: %s", e)
+        return False
+
 
+async def init_db_async(async_engine: AsyncEngine) -> bool:
+    """Async counterpart of `init_db`, used when DB_ENGINE_MODE=async."""
+    register_models()
+
+    try:
+        async with async_engine.begin() as connection:
+            await connection.run_sync(_create_missing_tables)
         return True
 
     except Exception as e:
-        LOGGER.error(f"💥 Database initialization failed: {e!s}")
+        LOGGER.error("💥 Database initialization failed: %s", e)
         return False
@@ -0,0 +1,140 @@
+"""
+Reads decklist files attached to /loan and /return into the
+`<quantity> <cardname>` lines parse_cardlist takes.
+
+Supported formats are MTGO text exports (`.txt`, with an optional sideboard
+after a blank line or `SB:` prefixes), Arena exports saved as `.txt` (section
+headers and set codes such as `4 Lightning Bolt (M10) 146`) and MTGO `.dek`
+XML. Files are parsed incrementally as they download, so the raw file is
+never buffered whole.
+"""
+
+import codecs
+import re
+from pathlib import PurePath
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+import aiohttp
+import discord
+
+from magic512bot.errors import DecklistError
+
+DECKLIST_SUFFIXES = frozenset({".txt", ".dek"})
+# A 540-card cube list is ~15 KB as text and ~60 KB as .dek
+MAX_DECKLIST_BYTES = 256 * 1024
+DOWNLOAD_CHUNK_BYTES = 16 * 1024
+
+# Lines naming a section of an Arena export rather than a card
+SECTION_HEADERS = frozenset(
+    {"about", "commander", "companion", "deck", "maybeboard", "sideboard"}
+)
+# "4 Lightning Bolt", "4x Lightning Bolt" or "4 Lightning Bolt (M10) 146"
+_CARD_LINE = re.compile(
+    r"(?P<quantity>\d+)x?\s+(?P<name>.+?)(?:\s+\([A-Za-z0-9]+\)(?:\s+\S+)?)?"
+)
+_SIDEBOARD_PREFIX = re.compile(r"SB:\s*", re.IGNORECASE)
+
+
+class DecklistParser:
+    """
+    Parses a decklist file fed to it in chunks, returning the card lines
+    completed by each chunk.
+    """
+
+    def __init__(self, filename: str) -> None:
+        suffix = PurePath(filename).suffix.lower()
+        if suffix not in DECKLIST_SUFFIXES:
+            raise DecklistError(
+                f"`{filename}` isn't a decklist; attach an MTGO or Arena "
+                "`.txt` export or an MTGO `.dek` file"
+            )
+        self.filename = filename
+        self.is_dek = suffix == ".dek"
+        self.size = 0
+        # .txt state: the decoded text after the last complete line, and
+        # whether the lines are in an Arena "About" section
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._pending = ""
+        self._in_about = False
+        # .dek state; expat refuses entity expansion attacks on its own
+        self._xml = XMLPullParser(events=("end",))
+
+    def check_size(self, size: int) -> None:
+        if size > MAX_DECKLIST_BYTES:
+            raise DecklistError(
+                f"`{self.filename}` is larger than "
+                f"{MAX_DECKLIST_BYTES // 1024} KB; split it into smaller lists"
+            )
+
+    def feed(self, data: bytes) -> list[str]:
+        self.size += len(data)
+        self.check_size(self.size)
+        if self.is_dek:
+            return self._feed_dek(data)
+        return self._feed_text(self._decoder.decode(data))
+
+    def close(self) -> list[str]:
+        if self.is_dek:
+            return self._feed_dek(b"", final=True)
+        return self._feed_text(self._decoder.decode(b"", final=True), final=True)
+
+    def _feed_text(self, text: str, final: bool = False) -> list[str]:
+        *lines, self._pending = (self._pending + text).split("\n")
+        if final:
+            lines.append(self._pending)
+        card_lines = []
+        for raw_line in lines:
+            line = raw_line.strip()
+            if not line:
+                self._in_about = False
+                continue
+            if line.casefold() in SECTION_HEADERS:
+                self._in_about = line.casefold() == "about"
+                continue
+            if self._in_about:
+                # e.g. "Name Mono Red Aggro"
+                continue
+            line = _SIDEBOARD_PREFIX.sub("", line, count=1)
+            if match := _CARD_LINE.fullmatch(line):
+                card_lines.append(f"{match['quantity']} {match['name']}")
+            else:
+                # Left for parse_cardlist to report
+                card_lines.append(line)
+        return card_lines
+
+    def _feed_dek(self, data: bytes, final: bool = False) -> list[str]:
+        try:
+            if final:
+                self._xml.close()
+            else:
+                self._xml.feed(data)
+        except ParseError as e:
+            raise DecklistError(
+                f"`{self.filename}` isn't a valid MTGO `.dek` file ({e})"
+            ) from e
+        card_lines = []
+        for _, element in self._xml.read_events():
+            if element.tag == "Cards":
+                card_lines.append(f"{element.get('Quantity')} {element.get('Name')}")
+                element.clear()
+        return card_lines
+
+
+async def read_decklist(attachment: discord.Attachment) -> list[str]:
+    """
+    Downloads a decklist attachment in chunks, parsing each as it arrives.
+
+    Raises DecklistError if it isn't a supported decklist file or is too large.
+    """
+    parser = DecklistParser(attachment.filename)
+    # Discord reports the size, so oversized files aren't downloaded at all
+    parser.check_size(attachment.size)
+    card_list: list[str] = []
+    async with (
+        aiohttp.ClientSession() as session,
+        session.get(attachment.url, raise_for_status=True) as response,
+    ):
+        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_BYTES):
+            card_list.extend(parser.feed(chunk))
+    card_list.extend(parser.close())
+    return card_list
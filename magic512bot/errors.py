@@ -12,19 +12,42 @@ class CardListInputError(Error):
         message -- explanation of the error
     """
 
-    def __init__(self, line_errors):
+    def __init__(self, line_errors, unknown_cards=None):
         self.line_errors = line_errors
+        # unknown card name -> "did you mean" suggestions
+        self.unknown_cards = unknown_cards or {}
 
     def __str__(self):
-        message = "error parsing provided CardList\n\n \
-            Please ensure all lines follow the format of `<integer> <cardname>`.\
-                \n\n The following lines raised errors:\n```"
-        for line in "\n".join(self.line_errors):
-            message += line
-        message += "```"
+        message = "error parsing provided CardList\n\n"
+        if self.line_errors:
+            message += "Please ensure all lines follow the format of "
+            message += "`<integer> <cardname>`.\n\n"
+            message += "The following lines raised errors:\n```"
+            message += "\n".join(self.line_errors)
+            message += "```"
+        if self.unknown_cards:
+            message += "\nThe following cards weren't recognized:\n```"
+            for card_name, suggestions in self.unknown_cards.items():
+                message += f"{card_name}\n"
+                if suggestions:
+                    message += f"  did you mean: {', '.join(suggestions)}?\n"
+            message += "```"
         return message
 
 
+class DecklistError(Error):
+    """
+    Exception raised when a decklist attachment can't be read, e.g. it isn't
+    a supported file type or is too large.
+    """
+
+    def __init__(self, message):
+        self.message = message
+
+    def __str__(self):
+        return f"error reading decklist\n\n{self.message}"
+
+
 class CardNotFoundError(Error):
     """
     Exception raised when unable to find cards in database to return.
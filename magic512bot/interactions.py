@@ -0,0 +1,191 @@
+import asyncio
+import functools
+import time
+from collections.abc import Callable, Coroutine
+from typing import Any, Concatenate
+
+import discord
+from discord import app_commands
+from discord.http import HTTPClient
+
+from magic512bot.config import LOGGER, bind_log_context
+from magic512bot.metrics import (
+    ACK_SECONDS,
+    CURRENT_COMMAND,
+    CommandTimer,
+    add_rest_time,
+    start_command,
+)
+
+# Discord fails interactions that aren't acknowledged within 3 seconds, so
+# warn well before that
+SLOW_ACK_SECONDS = 2.0
+
+# Handlers running after their interaction was deferred. Tasks are only
+# weakly referenced by the event loop, so they are kept here until done.
+BACKGROUND_TASKS: set[asyncio.Task[None]] = set()
+
+type Handler[S, **P] = Callable[
+    Concatenate[S, discord.Interaction, P], Coroutine[Any, Any, None]
+]
+
+
+def command_name(interaction: discord.Interaction) -> str:
+    if interaction.command is not None:
+        return interaction.command.qualified_name
+    return "unknown"
+
+
+def bind_interaction(interaction: discord.Interaction, name: str) -> None:
+    """Tags log records from the current task with the interaction's details."""
+    bind_log_context(
+        interaction_id=interaction.id, command=name, guild_id=interaction.guild_id
+    )
+
+
+def record_ack(interaction: discord.Interaction, name: str | None = None) -> None:
+    """Records how long after its creation an interaction was acknowledged."""
+    name = name or command_name(interaction)
+    elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    # Clock skew against Discord can make this slightly negative
+    elapsed = max(0.0, elapsed)
+    ACK_SECONDS.labels(name).observe(elapsed)
+    if elapsed >= SLOW_ACK_SECONDS:
+        LOGGER.warning("Slow acknowledgement for %s: %.2fs", name, elapsed)
+
+
+def deferred[S, **P](
+    *, thinking: bool = True, name: str | None = None
+) -> Callable[[Handler[S, P]], Handler[S, P]]:
+    """
+    Defers an interaction as soon as its handler is called, then runs the
+    handler in a background task.
+
+    Wraps handler methods taking `(self, interaction, ...)`: app commands,
+    modal `on_submit` and item callbacks. The handler must reply with
+    `interaction.followup.send`, which can be called any number of times.
+
+    The defer is ephemeral. After a "thinking" defer Discord keeps the first
+    followup as ephemeral as the defer was, so errors, including the generic
+    one sent when the handler raises, are only shown to the user. Replies
+    meant for the channel are sent with `send_public`. Component callbacks
+    should use thinking=False, which shows nothing and leaves each
+    followup's visibility up to its `ephemeral` flag.
+
+    `name` labels the ack latency metric when the interaction isn't an app
+    command (modals and components).
+    """
+
+    def decorator(func: Handler[S, P]) -> Handler[S, P]:
+        @functools.wraps(func)
+        async def wrapper(
+            self: S, interaction: discord.Interaction, *args: P.args, **kwargs: P.kwargs
+        ) -> None:
+            label = name or command_name(interaction)
+            # Modals and components don't go through the command tree's hook
+            timer = CURRENT_COMMAND.get()
+            if timer is None or timer.finished:
+                timer = start_command(label, interaction.created_at)
+                bind_interaction(interaction, label)
+            timer.deferred = True
+            await interaction.response.defer(ephemeral=True, thinking=thinking)
+            record_ack(interaction, label)
+            handler = func(self, interaction, *args, **kwargs)
+            task = asyncio.create_task(
+                _run_handler(handler, interaction, label, timer),
+                name=f"interaction:{label}",
+            )
+            BACKGROUND_TASKS.add(task)
+            task.add_done_callback(BACKGROUND_TASKS.discard)
+
+        return wrapper
+
+    return decorator
+
+
+async def send_public(
+    interaction: discord.Interaction, *args: Any, **kwargs: Any
+) -> None:
+    """
+    Sends a public followup to an interaction `deferred` with thinking.
+
+    A followup would replace the ephemeral "thinking" message and stay
+    ephemeral, so that message is resolved first and the reply is sent as a
+    second followup. Takes the same arguments as `followup.send`.
+    """
+    await interaction.edit_original_response(content="✅ Done!")
+    await interaction.followup.send(*args, **kwargs)
+
+
+async def _run_handler(
+    handler: Coroutine[Any, Any, None],
+    interaction: discord.Interaction,
+    name: str,
+    timer: CommandTimer,
+) -> None:
+    failed = False
+    try:
+        await handler
+    except Exception as e:
+        failed = True
+        LOGGER.error("Error handling %s: %s", name, e, exc_info=True)
+        try:
+            await interaction.followup.send(
+                "❌ Oops! Something went wrong. Please try again later.",
+                ephemeral=True,
+            )
+        except discord.HTTPException:
+            pass  # The interaction token may have expired
+    finally:
+        timer.finish(failed=failed)
+
+
+async def wait_for_background_tasks() -> None:
+    """Waits for deferred handlers that are still running, e.g. on shutdown."""
+    # Finished tasks leave the set in a done callback, which only runs once
+    # the loop gets control, so only wait on the ones still running
+    while pending := [task for task in BACKGROUND_TASKS if not task.done()]:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """
+    Command tree that times every app command. Commands that reply directly
+    are finished by the bot's `on_app_command_completion`, and deferred ones
+    when their background task ends.
+    """
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.type is discord.InteractionType.application_command:
+            name = command_name(interaction)
+            start_command(name, interaction.created_at)
+            bind_interaction(interaction, name)
+        return True
+
+    async def on_error(
+        self, interaction: discord.Interaction, error: app_commands.AppCommandError
+    ) -> None:
+        if (timer := CURRENT_COMMAND.get()) is not None:
+            timer.finish(failed=True)
+        await super().on_error(interaction, error)
+
+
+def instrument_http(http: HTTPClient) -> None:
+    """
+    Adds the time spent in Discord REST requests to the current command.
+
+    Interaction responses and followups are sent through webhooks rather than
+    `HTTPClient.request`, so they aren't included; the defer is measured by
+    the ack latency instead.
+    """
+    request = http.request
+
+    @functools.wraps(request)
+    async def timed_request(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return await request(*args, **kwargs)
+        finally:
+            add_rest_time(time.perf_counter() - start)
+
+    http.request = timed_request  # type: ignore[method-assign]
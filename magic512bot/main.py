@@ -1,66 +1,237 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+
 import discord
+from aiohttp import web
+from discord import app_commands
 from discord.ext import commands
 
-from magic512bot.config import BOT_TOKEN, LOGGER, TEST_GUILD_ID
-from magic512bot.database import SessionLocal, init_db
+from magic512bot.config import (
+    BOT_TOKEN,
+    COG_LOAD_CONCURRENT,
+    FORCE_COMMAND_SYNC,
+    LOGGER,
+    METRICS_HOST,
+    METRICS_PORT,
+    TEST_GUILD_ID,
+)
+from magic512bot.database import (
+    AsyncDatabase,
+    Database,
+    create_database,
+    init_db,
+    init_db_async,
+)
+from magic512bot.interactions import (
+    InstrumentedCommandTree,
+    instrument_http,
+    wait_for_background_tasks,
+)
+from magic512bot.metrics import (
+    ACK_SECONDS,
+    CURRENT_COMMAND,
+    LEADERBOARD_CACHE_HITS,
+    LEADERBOARD_CACHE_MISSES,
+    LOOP_LAG,
+    ROLE_MIRROR_CHANGES,
+    ROLE_MIRROR_WRITES,
+    monitor_event_loop,
+    start_metrics_server,
+)
+from magic512bot.services.command_sync import (
+    get_command_tree_hash,
+    set_command_tree_hash,
+)
+
+# None of these depend on another, so their setups can run concurrently
+COG_MODULES = ("cogs.card_lender", "cogs.role_request", "cogs.nomination")
+
+
+@dataclass(frozen=True)
+class CogLoadTiming:
+    """How long loading one cog took, in seconds."""
+
+    module: str
+    # Executing the cog module (including its first-time imports) and
+    # constructing the cog
+    import_seconds: float
+    # Wall time registering the cog with the bot (add_cog, including cog_load)
+    setup_seconds: float
 
 
 class Magic512Bot(commands.Bot):
+    db: Database | AsyncDatabase
+
     def __init__(self, command_prefix: str, intents: discord.Intents) -> None:
-        super().__init__(command_prefix=command_prefix, intents=intents)
+        super().__init__(
+            command_prefix=command_prefix,
+            intents=intents,
+            tree_cls=InstrumentedCommandTree,
+        )
+        self.loop_monitor: asyncio.Task[None] | None = None
+        self.metrics_runner: web.AppRunner | None = None
+        # module name -> load timing, filled in by load_cogs
+        self.cog_timings: dict[str, CogLoadTiming] = {}
+        # module name -> time spent in add_cog for its cogs
+        self._cog_setup_seconds: dict[str, float] = {}
 
     # Syncs guild commands to specified guild
     async def setup_hook(self) -> None:
         LOGGER.info("Starting setup_hook")
 
-        init_db()
-        self.db = SessionLocal
+        self.db = create_database()
+        if isinstance(self.db, AsyncDatabase):
+            await init_db_async(self.db.engine)
+        else:
+            init_db()
+        self.loop_monitor = asyncio.create_task(monitor_event_loop())
+        instrument_http(self.http)
+        if METRICS_PORT:
+            self.metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
 
         # Other setup code...
         await self.load_cogs()
         await self.sync_commands()
 
-    async def load_cogs(self) -> None:
-        LOGGER.info("Loading cogs")
-        cog_modules = ["cogs.card_lender", "cogs.role_request", "cogs.nomination"]
+    async def close(self) -> None:
+        if self.loop_monitor is not None:
+            self.loop_monitor.cancel()
+            LOGGER.info(LOOP_LAG.summary())
+        for counter in (
+            LEADERBOARD_CACHE_HITS,
+            LEADERBOARD_CACHE_MISSES,
+            ROLE_MIRROR_CHANGES,
+            ROLE_MIRROR_WRITES,
+        ):
+            LOGGER.info(counter.summary())
+        for histogram in ACK_SECONDS.histograms.values():
+            LOGGER.info(histogram.summary())
+        # Let deferred handlers send their followups before disconnecting
+        await wait_for_background_tasks()
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+        await super().close()
+        if hasattr(self, "db"):
+            await self.db.close()
+
+    async def on_app_command_completion(
+        self, interaction: discord.Interaction, command: app_commands.Command
+    ) -> None:
+        # Deferred handlers finish their timer when their background task ends
+        if (timer := CURRENT_COMMAND.get()) is not None and not timer.deferred:
+            timer.finish()
+
+    async def add_cog(
+        self,
+        cog: commands.Cog,
+        /,
+        *,
+        override: bool = False,
+        guild: discord.abc.Snowflake | None = discord.utils.MISSING,
+        guilds: Sequence[discord.abc.Snowflake] = discord.utils.MISSING,
+    ) -> None:
+        start = time.perf_counter()
+        try:
+            await super().add_cog(cog, override=override, guild=guild, guilds=guilds)
+        finally:
+            module = type(cog).__module__
+            self._cog_setup_seconds[module] = (
+                self._cog_setup_seconds.get(module, 0.0) + time.perf_counter() - start
+            )
 
-        for module in cog_modules:
-            try:
-                LOGGER.info(f"Loading extension: {module}")
-                await self.load_extension(f"magic512bot.{module}")
-                LOGGER.info(f"Loaded cog: {module}")
-            except (commands.ExtensionError, Exception) as e:
-                LOGGER.error(f"Failed to load cog {module}")
-                LOGGER.error(f"Error: {e!s}")
+    async def load_cogs(
+        self,
+        modules: Sequence[str] = COG_MODULES,
+        concurrent: bool = COG_LOAD_CONCURRENT,
+    ) -> None:
+        LOGGER.info("Loading cogs (%s)", "concurrently" if concurrent else "serially")
+        start = time.perf_counter()
+
+        if concurrent:
+            # Imports still run one at a time, since they hold the GIL, but any
+            # setup waiting on I/O lets the other cogs make progress
+            await asyncio.gather(*(self.load_cog(module) for module in modules))
+        else:
+            for module in modules:
+                await self.load_cog(module)
+
+        LOGGER.info(
+            "Loaded %s of %s cogs in %.1f ms",
+            sum(module in self.cog_timings for module in modules),
+            len(modules),
+            (time.perf_counter() - start) * 1000,
+        )
+
+    async def load_cog(self, module: str) -> None:
+        """Loads one cog extension, recording its import and setup time."""
+        name = f"magic512bot.{module}"
+        start = time.perf_counter()
+        try:
+            await self.load_extension(name)
+        except (commands.ExtensionError, Exception) as e:
+            LOGGER.error("Failed to load cog %s", module)
+            LOGGER.error("Error: %s", e)
+            return
+
+        # load_extension imports the module then calls its setup(), which adds
+        # the cog; whatever wasn't spent in add_cog was spent importing
+        total = time.perf_counter() - start
+        setup_seconds = self._cog_setup_seconds.get(name, 0.0)
+        timing = CogLoadTiming(module, total - setup_seconds, setup_seconds)
+        self.cog_timings[module] = timing
+        LOGGER.info(
+            "Loaded cog %s (import %.1f ms, setup %.1f ms)",
+            module,
+            timing.import_seconds * 1000,
+            timing.setup_seconds * 1000,
+        )
 
     async def sync_commands(self) -> None:
-        LOGGER.info("Syncing commands")
         # For syncing to a specific guild (faster for testing)
         test_guild = discord.Object(id=TEST_GUILD_ID)
         self.tree.copy_global_to(guild=test_guild)
-        if TEST_GUILD_ID:
-            LOGGER.info(f"{[cmd.name for cmd in self.tree.get_commands()]}")
-            synced = await self.tree.sync(guild=test_guild)
-            LOGGER.info(f"Synced commands to guild {TEST_GUILD_ID}")
-            LOGGER.info(f"synced {len(synced)} commands to guild")
-        else:
-            # For syncing globally (can take up to an hour to propagate)
-            await self.tree.sync()
-            LOGGER.info("Synced commands globally")
+        # Syncing globally can take up to an hour to propagate
+        guild = test_guild if TEST_GUILD_ID else None
+        scope = (
+            f"{self.application_id}:guild:{TEST_GUILD_ID}"
+            if guild
+            else f"{self.application_id}:global"
+        )
+
+        # Syncing is a slow, rate limited request, so skip it when the
+        # commands haven't changed since the last successful sync
+        tree_hash = command_tree_hash(self.tree, guild)
+        last_hash = await self.db.run(get_command_tree_hash, scope)
+        if tree_hash == last_hash and not FORCE_COMMAND_SYNC:
+            LOGGER.info("Commands unchanged since last sync to %s, skipping", scope)
+            return
+
+        LOGGER.info(
+            "Syncing commands to %s: %s",
+            scope,
+            [cmd.name for cmd in self.tree.get_commands(guild=guild)],
+        )
+        synced = await self.tree.sync(guild=guild)
+        await self.db.run(set_command_tree_hash, scope, tree_hash)
+        LOGGER.info("Synced %s commands to %s", len(synced), scope)
 
     async def on_ready(self) -> None:
-        LOGGER.info(f"{self.user} has connected!")
+        LOGGER.info("%s has connected!", self.user)
 
         # Add diagnostic logging for intents and member caching
-        LOGGER.info(f"Bot intents enabled: {self.intents}")
-        LOGGER.info(f"Member intent enabled: {self.intents.members}")
+        LOGGER.info("Bot intents enabled: %s", self.intents)
+        LOGGER.info("Member intent enabled: %s", self.intents.members)
 
         # Log guild member information
         for guild in self.guilds:
-            LOGGER.info(f"Guild {guild.name} (ID: {guild.id}):")
-            LOGGER.info(f"  Total member count: {guild.member_count}")
-            LOGGER.info(f"  Cached member count: {len(guild.members)}")
-            LOGGER.info(f"  Bot's top role: {guild.me.top_role}")
+            LOGGER.info("Guild %s (ID: %s):", guild.name, guild.id)
+            LOGGER.info("  Total member count: %s", guild.member_count)
+            LOGGER.info("  Cached member count: %s", len(guild.members))
+            LOGGER.info("  Bot's top role: %s", guild.me.top_role)
 
     async def send_error_message(self, error_message: str) -> bool:
         """
@@ -84,7 +255,7 @@ class Magic512Bot(commands.Bot):
             channel = self.get_channel(MODERATOR_CHANNEL_ID)
             if not channel or not isinstance(channel, discord.TextChannel):
                 LOGGER.error(
-                    f"Could not find moderator channel with ID {MODERATOR_CHANNEL_ID}"
+                    "Could not find moderator channel with ID %s", MODERATOR_CHANNEL_ID
                 )
                 return False
 
@@ -101,13 +272,27 @@ class Magic512Bot(commands.Bot):
 
             # Use bot.loop to schedule the message sending
             self.loop.create_task(channel.send(embed=embed))
-            LOGGER.info(f"Error message sent to moderator channel: {error_message}")
+            LOGGER.info("Error message sent to moderator channel: %s", error_message)
             return True
         except Exception as e:
-            LOGGER.error(f"Failed to send error to moderator channel: {e}")
+            LOGGER.error("Failed to send error to moderator channel: %s", e)
             return False
 
 
+def command_tree_hash(
+    tree: app_commands.CommandTree, guild: discord.abc.Snowflake | None = None
+) -> str:
+    """
+    Hashes the commands `tree.sync(guild=guild)` would send to Discord,
+    independent of the order they were added in.
+    """
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda command: (command["type"], command["name"]),
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
 async def main() -> None:
     # Create bot instance
     intents = discord.Intents.none()  # Start with no intents
@@ -124,8 +309,6 @@ async def main() -> None:
 
 
 if __name__ == "__main__":
-    import asyncio
-
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
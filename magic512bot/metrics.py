@@ -0,0 +1,352 @@
+import asyncio
+import bisect
+import logging
+import math
+import threading
+from contextvars import ContextVar
+from datetime import UTC, datetime
+
+from aiohttp import web
+
+# Imported by magic512bot.config to count dropped log records, so this module
+# can't import LOGGER from there
+LOGGER = logging.getLogger("magic512bot")
+
+# Upper bounds (seconds) used for latency histograms
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _label_text(labels: dict[str, str]) -> str:
+    """Formats labels the way the Prometheus text format expects them."""
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{key}="{_escape_label(value)}"' for key, value in labels.items()
+    )
+    return f"{{{pairs}}}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram.
+
+    Observations are in seconds. Safe to observe from worker threads.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        labels: dict[str, str] | None = None,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.labels = labels or {}
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Returns the upper bound of the bucket holding the q-th quantile."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts, strict=False):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def summary(self) -> str:
+        name = f"{self.name}{_label_text(self.labels)}"
+        if self.count == 0:
+            return f"{name}: no observations"
+        return (
+            f"{name}: n={self.count} "
+            f"mean={self.sum / self.count * 1000:.1f}ms "
+            f"p50<={self.percentile(0.5) * 1000:.0f}ms "
+            f"p99<={self.percentile(0.99) * 1000:.0f}ms "
+            f"max={self.max * 1000:.1f}ms"
+        )
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            counts = list(self.counts)
+            count, total = self.count, self.sum
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip((*self.buckets, math.inf), counts, strict=True):
+            cumulative += bucket_count
+            le = "+Inf" if bound == math.inf else str(bound)
+            labels = _label_text({**self.labels, "le": le})
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        lines.append(f"{self.name}_sum{_label_text(self.labels)} {total}")
+        lines.append(f"{self.name}_count{_label_text(self.labels)} {count}")
+        return lines
+
+
+class HistogramFamily:
+    """Histograms for one metric, one per label value (e.g. per command)."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label: str,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.label = label
+        self.buckets = buckets
+        self.histograms: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, value: str) -> Histogram:
+        with self._lock:
+            if value not in self.histograms:
+                self.histograms[value] = Histogram(
+                    self.name, self.description, self.buckets, {self.label: value}
+                )
+            return self.histograms[value]
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+        return [line for _, histogram in histograms for line in histogram.samples()]
+
+
+class Counter:
+    """Monotonic counter. Safe to increment from worker threads."""
+
+    kind = "counter"
+
+    def __init__(
+        self, name: str, description: str, labels: dict[str, str] | None = None
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.labels = labels or {}
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def summary(self) -> str:
+        return f"{self.name}{_label_text(self.labels)}: {self.value}"
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_label_text(self.labels)} {self.value}"]
+
+
+class CounterFamily:
+    """Counters for one metric, one per label value."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, label: str) -> None:
+        self.name = name
+        self.description = description
+        self.label = label
+        self.counters: dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, value: str) -> Counter:
+        with self._lock:
+            if value not in self.counters:
+                self.counters[value] = Counter(
+                    self.name, self.description, {self.label: value}
+                )
+            return self.counters[value]
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            counters = sorted(self.counters.items())
+        return [line for _, counter in counters for line in counter.samples()]
+
+
+type Metric = Histogram | HistogramFamily | Counter | CounterFamily
+
+
+LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Time the event loop was blocked past a scheduled wakeup"
+)
+DB_CALL_SECONDS = Histogram(
+    "db_call_seconds", "Wall time of service calls run through the DB executor"
+)
+LEADERBOARD_CACHE_HITS = Counter(
+    "leaderboard_cache_hits_total", "/leaderboard calls served from the cached text"
+)
+LEADERBOARD_CACHE_MISSES = Counter(
+    "leaderboard_cache_misses_total", "/leaderboard calls that re-rendered the text"
+)
+ACK_SECONDS = HistogramFamily(
+    "interaction_ack_seconds",
+    "Time from an interaction being created to the bot acknowledging it",
+    "command",
+)
+ROLE_MIRROR_CHANGES = Counter(
+    "role_mirror_changes_total", "Member sweat role changes queued for the database"
+)
+ROLE_MIRROR_WRITES = Counter(
+    "role_mirror_members_written_total", "Members written by sweat role mirror flushes"
+)
+COMMAND_CALLS = CounterFamily(
+    "command_calls_total", "Commands, modal submissions and buttons handled", "command"
+)
+COMMAND_ERRORS = CounterFamily(
+    "command_errors_total", "Handled commands that failed with an error", "command"
+)
+COMMAND_SECONDS = HistogramFamily(
+    "command_seconds",
+    "Time from an interaction being created to its handler finishing",
+    "command",
+)
+COMMAND_DB_SECONDS = HistogramFamily(
+    "command_db_seconds", "Time a command spent waiting on the database", "command"
+)
+COMMAND_REST_SECONDS = HistogramFamily(
+    "command_rest_seconds", "Time a command spent in Discord REST requests", "command"
+)
+LOG_RECORDS_DROPPED = CounterFamily(
+    "log_records_dropped_total",
+    "Log records dropped because the logging queue was full",
+    "level",
+)
+
+# Exposed on /metrics, in this order
+EXPORTED_METRICS: tuple[Metric, ...] = (
+    COMMAND_CALLS,
+    COMMAND_ERRORS,
+    ACK_SECONDS,
+    COMMAND_SECONDS,
+    COMMAND_DB_SECONDS,
+    COMMAND_REST_SECONDS,
+    DB_CALL_SECONDS,
+    LOOP_LAG,
+    LEADERBOARD_CACHE_HITS,
+    LEADERBOARD_CACHE_MISSES,
+    ROLE_MIRROR_CHANGES,
+    ROLE_MIRROR_WRITES,
+    LOG_RECORDS_DROPPED,
+)
+
+
+class CommandTimer:
+    """
+    Tracks one interaction from creation until its handler finishes, adding
+    up the time spent on the database and on Discord REST requests.
+    """
+
+    def __init__(self, name: str, created_at: datetime) -> None:
+        self.name = name
+        self.created_at = created_at
+        self.db_seconds = 0.0
+        self.rest_seconds = 0.0
+        # Set when the handler continues in a background task after replying
+        self.deferred = False
+        self.finished = False
+
+    def finish(self, failed: bool = False) -> None:
+        """Records the command's metrics. Later calls do nothing."""
+        if self.finished:
+            return
+        self.finished = True
+        elapsed = max(0.0, (datetime.now(UTC) - self.created_at).total_seconds())
+        COMMAND_CALLS.labels(self.name).inc()
+        if failed:
+            COMMAND_ERRORS.labels(self.name).inc()
+        COMMAND_SECONDS.labels(self.name).observe(elapsed)
+        COMMAND_DB_SECONDS.labels(self.name).observe(self.db_seconds)
+        COMMAND_REST_SECONDS.labels(self.name).observe(self.rest_seconds)
+
+
+# The command being handled by the current task. Tasks started by a handler
+# copy the context, so they add to the same timer.
+CURRENT_COMMAND: ContextVar[CommandTimer | None] = ContextVar(
+    "current_command", default=None
+)
+
+
+def start_command(name: str, created_at: datetime) -> CommandTimer:
+    timer = CommandTimer(name, created_at)
+    CURRENT_COMMAND.set(timer)
+    return timer
+
+
+def add_db_time(seconds: float) -> None:
+    if (timer := CURRENT_COMMAND.get()) is not None:
+        timer.db_seconds += seconds
+
+
+def add_rest_time(seconds: float) -> None:
+    if (timer := CURRENT_COMMAND.get()) is not None:
+        timer.rest_seconds += seconds
+
+
+def render_metrics(metrics: tuple[Metric, ...] = EXPORTED_METRICS) -> str:
+    """Renders metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+async def _metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(
+        body=render_metrics().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Serves `render_metrics` on http://host:port/metrics."""
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    LOGGER.info("📈 Serving metrics on http://%s:%s/metrics", host, port)
+    return runner
+
+
+async def monitor_event_loop(
+    histogram: Histogram = LOOP_LAG, interval: float = 0.25, report_every: int = 2400
+) -> None:
+    """
+    Samples event loop lag forever: sleeps for `interval` and records how late
+    the wakeup was. Logs a summary every `report_every` samples.
+    """
+    loop = asyncio.get_running_loop()
+    samples = 0
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        histogram.observe(max(0.0, loop.time() - start - interval))
+        samples += 1
+        if samples % report_every == 0:
+            LOGGER.info(histogram.summary())
@@ -1,8 +1,20 @@
+from .card import Card
 from .cardloan import CardLoan
+from .command_sync import CommandSync
 from .nomination import Nomination
+from .role_request import RoleRequest
 from .task_run import TaskRun
-from .user import User
+from .user import User, UserSweatRole
 
 
 def register_models() -> list:
-    return [User, CardLoan, Nomination, TaskRun]
+    return [
+        User,
+        UserSweatRole,
+        Card,
+        CardLoan,
+        Nomination,
+        TaskRun,
+        RoleRequest,
+        CommandSync,
+    ]
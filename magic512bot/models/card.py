@@ -0,0 +1,18 @@
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class Card(Base):
+    """One card name, stored once and referenced by id from card_loans."""
+
+    __tablename__ = "cards"
+
+    id: Mapped[int] = mapped_column(Integer(), primary_key=True)
+    # normalize_card_name of the name, so spellings of a card share one row
+    normalized_name: Mapped[str] = mapped_column(
+        String(150), nullable=False, unique=True
+    )
+    # the catalog's spelling, or the first one loaned when there's no catalog
+    name: Mapped[str] = mapped_column(String(150), nullable=False)
@@ -1,16 +1,39 @@
 import datetime
 
-from sqlalchemy import BigInteger, DateTime, Integer, String
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
+from .card import Card
 
 
 class CardLoan(Base):
     __tablename__ = "card_loans"
+    __table_args__ = (
+        # get_cardloans, bulk_return_cardloans and get_loan_totals filter on a
+        # prefix of this; tagged returns use all of it, in created_at order
+        Index(
+            "ix_card_loans_lender_borrower_tag_card",
+            "lender",
+            "borrower",
+            "order_tag",
+            "card_id",
+            "created_at",
+        ),
+        # untagged returns look up one card across all of a borrower's tags
+        Index(
+            "ix_card_loans_lender_borrower_card",
+            "lender",
+            "borrower",
+            "card_id",
+            "created_at",
+        ),
+    )
+
     id: Mapped[int] = mapped_column(Integer(), nullable=False, primary_key=True)
-    # for now, just have cards as names
-    card: Mapped[str] = mapped_column(String(100), nullable=False)
+    card_id: Mapped[int] = mapped_column(ForeignKey("cards.id"), nullable=False)
+    # loaded with the loan, since listing loans always shows the card's name
+    card: Mapped[Card] = relationship(lazy="joined")
     lender: Mapped[int] = mapped_column(
         BigInteger(), nullable=False
     )  # discord user id of lender
@@ -22,3 +45,7 @@ class CardLoan(Base):
     created_at: Mapped[datetime.datetime] = mapped_column(DateTime(), nullable=False)
     # order tag, if not specified defaults to ""
     order_tag: Mapped[str] = mapped_column(String(100), nullable=False)
+
+    @property
+    def card_name(self) -> str:
+        return self.card.name
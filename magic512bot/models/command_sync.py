@@ -0,0 +1,18 @@
+import datetime
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class CommandSync(Base):
+    """Hash of the command tree last synced to Discord, per sync scope."""
+
+    __tablename__ = "command_syncs"
+
+    # e.g. "<application id>:guild:<guild id>" or "<application id>:global"
+    scope: Mapped[str] = mapped_column(String(100), primary_key=True)
+    # sha256 hex digest of the serialized commands
+    tree_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    synced_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False)
@@ -0,0 +1,31 @@
+import datetime
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+PENDING = "pending"
+APPROVED = "approved"
+DENIED = "denied"
+
+
+class RoleRequest(Base):
+    """A /role-request awaiting or resolved by moderator review."""
+
+    __tablename__ = "role_requests"
+    __table_args__ = (Index("ix_role_requests_user_role", "user_id", "role_id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    guild_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    role_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # Embed field values are capped at 1024 characters
+    reason: Mapped[str] = mapped_column(String(1024), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default=PENDING)
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False)
+    # discord user id of the moderator who approved or denied the request
+    resolved_by: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    resolved_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime, nullable=True
+    )
@@ -1,6 +1,5 @@
-from sqlalchemy import BigInteger, String
+from sqlalchemy import BigInteger, ForeignKey, Index, String
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy_utils import JSONType  # type: ignore[import-untyped]
 
 from .base import Base
 
@@ -12,4 +11,18 @@ class User(Base):
         BigInteger, primary_key=True, autoincrement=False
     )  # discord user id
     user_name: Mapped[str] = mapped_column(String(100), nullable=False)
-    sweat_roles: Mapped[list[str]] = mapped_column(JSONType, nullable=False)
+
+
+class UserSweatRole(Base):
+    """One sweat role held by a user."""
+
+    __tablename__ = "user_sweat_roles"
+    __table_args__ = (
+        # "who holds role X"; the primary key already covers per-user lookups
+        Index("ix_user_sweat_roles_role_name", "role_name"),
+    )
+
+    user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    role_name: Mapped[str] = mapped_column(String(100), primary_key=True)
@@ -0,0 +1,13 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from magic512bot.models.base import Base
+
+
+def dialect_insert(
+    session: Session, model: type[Base]
+) -> postgresql.Insert | sqlite.Insert:
+    """INSERT for the session's backend, which both support ON CONFLICT on."""
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
@@ -0,0 +1,20 @@
+import datetime
+
+from sqlalchemy.orm import Session
+
+from magic512bot.models.command_sync import CommandSync
+
+
+def get_command_tree_hash(session: Session, scope: str) -> str | None:
+    """Gets the hash of the commands last synced to `scope`, if any."""
+    sync = session.get(CommandSync, scope)
+    return sync.tree_hash if sync else None
+
+
+def set_command_tree_hash(session: Session, scope: str, tree_hash: str) -> None:
+    """Records that the commands hashing to `tree_hash` were synced to `scope`."""
+    session.merge(
+        CommandSync(
+            scope=scope, tree_hash=tree_hash, synced_at=datetime.datetime.now()
+        )
+    )
@@ -34,7 +34,7 @@ def add_nomination(session: Session, user_id: int, format: str) -> None:
             nomination = Nomination(user_id=user_id, format=format)
             session.add(nomination)
     except Exception as e:
-        LOGGER.error(f"Error adding nomination for user {user_id}: {e!s}")
+        LOGGER.error("Error adding nomination for user %s: %s", user_id, e)
         raise
 
 
@@ -45,7 +45,7 @@ def get_all_nominations(session: Session) -> list[Nomination]:
         result = session.execute(query).scalars().all()
         return list(result)
     except Exception as e:
-        LOGGER.error(f"Error retrieving nominations: {e!s}")
+        LOGGER.error("Error retrieving nominations: %s", e)
         return []
 
 
@@ -69,7 +69,7 @@ def get_user_nominations(session: Session, user_id: int) -> list[Nomination]:
         result = session.execute(query).scalars().all()
         return list(result)
     except Exception as e:
-        LOGGER.error(f"Error retrieving nominations for user {user_id}: {e!s}")
+        LOGGER.error("Error retrieving nominations for user %s: %s", user_id, e)
         return []
 
 
@@ -84,8 +84,8 @@ def clear_all_nominations(session: Session) -> int:
     try:
         stmt = delete(Nomination)
         result = session.execute(stmt)
-        LOGGER.info(f"Cleared {result.rowcount} nominations")
+        LOGGER.info("Cleared %s nominations", result.rowcount)
         return result.rowcount
     except Exception as e:
-        LOGGER.error(f"Error clearing nominations: {e!s}")
+        LOGGER.error("Error clearing nominations: %s", e)
         return 0
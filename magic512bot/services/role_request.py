@@ -0,0 +1,144 @@
+import datetime
+from collections.abc import Iterable
+from typing import Any, cast
+
+from sqlalchemy import CursorResult, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from magic512bot.models.role_request import PENDING, RoleRequest
+from magic512bot.models.user import User, UserSweatRole
+from magic512bot.services import dialect_insert
+
+
+def create_role_request(
+    session: Session, guild_id: int, user_id: int, role_id: int, reason: str
+) -> int:
+    """
+    Stores a new pending role request.
+
+    Returns int, the request id to encode in the review buttons.
+    """
+    request = RoleRequest(
+        guild_id=guild_id,
+        user_id=user_id,
+        role_id=role_id,
+        reason=reason,
+        status=PENDING,
+        created_at=datetime.datetime.now(),
+    )
+    session.add(request)
+    session.flush()
+    return request.id
+
+
+def get_role_request(session: Session, request_id: int) -> RoleRequest | None:
+    """Gets a role request by id, or None if it doesn't exist."""
+    return session.get(RoleRequest, request_id)
+
+
+def resolve_role_request(
+    session: Session, request_id: int, status: str, moderator_id: int
+) -> RoleRequest | None:
+    """
+    Moves a pending request to `status`.
+
+    The status check is part of the UPDATE, so when two moderators click at
+    the same time only one of them claims the request. Returns the request if
+    this call resolved it, or None if it was missing or already resolved.
+    """
+    result = cast(
+        CursorResult[Any],
+        session.execute(
+            update(RoleRequest)
+            .where(RoleRequest.id == request_id, RoleRequest.status == PENDING)
+            .values(
+                status=status,
+                resolved_by=moderator_id,
+                resolved_at=datetime.datetime.now(),
+            )
+            .execution_options(synchronize_session=False)
+        ),
+    )
+    if result.rowcount == 0:
+        return None
+    return session.get(RoleRequest, request_id, populate_existing=True)
+
+
+def reopen_role_request(session: Session, request_id: int) -> None:
+    """Puts a request back to pending, e.g. when applying an approval failed."""
+    session.execute(
+        update(RoleRequest)
+        .where(RoleRequest.id == request_id)
+        .values(status=PENDING, resolved_by=None, resolved_at=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def upsert_user_sweat_roles(
+    session: Session, members: Iterable[tuple[int, str, Iterable[str]]]
+) -> int:
+    """
+    Snapshots (user id, display name, sweat role names) for a batch of members.
+
+    Users are written with one multi-row INSERT ... ON CONFLICT DO UPDATE, and
+    their roles replaced with one DELETE and one multi-row INSERT, so a batch
+    costs three round trips however many members it holds.
+
+    Returns int, the number of user and role rows written.
+    """
+    users = {
+        user_id: (user_name, set(role_names))
+        for user_id, user_name, role_names in members
+    }
+    if not users:
+        return 0
+
+    upsert = dialect_insert(session, User).values(
+        [{"id": user_id, "user_name": name} for user_id, (name, _) in users.items()]
+    )
+    session.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[User.id], set_={"user_name": upsert.excluded.user_name}
+        )
+    )
+    session.execute(delete(UserSweatRole).where(UserSweatRole.user_id.in_(users)))
+    role_rows = [
+        {"user_id": user_id, "role_name": role_name}
+        for user_id, (_, role_names) in users.items()
+        for role_name in role_names
+    ]
+    if role_rows:
+        session.execute(insert(UserSweatRole).values(role_rows))
+    return len(users) + len(role_rows)
+
+
+def get_top_sweat_users(
+    session: Session, limit: int = 10
+) -> list[tuple[int, str, int]]:
+    """
+    Returns (user id, user name, sweat role count) for the `limit` users
+    holding the most sweat roles, counted in the database.
+    """
+    role_count = func.count(UserSweatRole.role_name)
+    statement = (
+        select(User.id, User.user_name, role_count)
+        .join(UserSweatRole, UserSweatRole.user_id == User.id)
+        .group_by(User.id, User.user_name)
+        .order_by(role_count.desc(), User.user_name)
+        .limit(limit)
+    )
+    return [
+        (user_id, user_name, int(count))
+        for user_id, user_name, count in session.execute(statement)
+    ]
+
+
+def get_sweat_role_holders(session: Session, role_name: str) -> list[User]:
+    """Returns the users holding the sweat role `role_name`, by name."""
+    statement = (
+        select(User)
+        .join(UserSweatRole, UserSweatRole.user_id == User.id)
+        .where(UserSweatRole.role_name == role_name)
+        .order_by(User.user_name)
+    )
+    return list(session.scalars(statement))
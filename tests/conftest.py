@@ -18,6 +18,9 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 # Mock environment variables before importing any app modules
 os.environ["DB_CONNECTION_STRING"] = "sqlite:///:memory:"
 os.environ["BOT_TOKEN"] = "test_token"
+# Tests use made-up card names, so run without a card catalog unless a test
+# passes one in
+os.environ["CARD_CATALOG_PATH"] = os.path.join(os.path.dirname(__file__), "no-catalog")
 
 from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine
@@ -68,6 +71,13 @@ async def mock_bot() -> MagicMock:
     """Create a simple mock bot."""
     bot = MagicMock()
     bot.wait_until_ready = AsyncMock()
+
+    async def run_in_session(func: Any, *args: Any, **kwargs: Any) -> Any:
+        """Run service calls inline against whatever bot.db.begin() yields."""
+        with bot.db.begin() as session:
+            return func(session, *args, **kwargs)
+
+    bot.db.run = AsyncMock(side_effect=run_in_session)
     return bot
 
 
@@ -111,12 +121,16 @@ class InteractionMock(MagicMock):
         response = MagicMock()
         response.send_message = AsyncMock()
         response.send_modal = AsyncMock()
+        response.defer = AsyncMock()
         self.response = response
+        self.command = None
+        self.created_at = discord.utils.utcnow()
 
         # Mock the followup
         followup = MagicMock()
         followup.send = AsyncMock()
         self.followup = followup
+        self.edit_original_response = AsyncMock()
 
         # Create a proper Member mock for the user
         user = MagicMock(spec=discord.Member)
@@ -218,13 +232,13 @@ def setup_task_debugging() -> None:
 
     def task_factory(loop: asyncio.AbstractEventLoop, coro: Any) -> asyncio.Task:
         task = asyncio.Task(coro, loop=loop)
-        logger.debug(f"Created task: {task.get_name()}")
+        logger.debug("Created task: %s", task.get_name())
 
         def done_callback(task: asyncio.Task) -> None:
             try:
                 task.result()
             except Exception as e:
-                logger.error(f"Task {task.get_name()} failed: {e}")
+                logger.error("Task %s failed: %s", task.get_name(), e)
 
         task.add_done_callback(done_callback)
         return task
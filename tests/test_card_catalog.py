@@ -0,0 +1,94 @@
+import pickle
+from pathlib import Path
+
+from magic512bot.card_catalog import (
+    CardCatalog,
+    load_card_catalog,
+    normalize_card_name,
+)
+
+
+def test_normalize_card_name():
+    """Test that spellings of the same card normalize to the same key."""
+    assert normalize_card_name("  Sheoldred,   the APOCALYPSE ") == (
+        "sheoldred the apocalypse"
+    )
+    assert normalize_card_name("Jace, Vryn\u2019s Prodigy") == (
+        normalize_card_name("jace vryns prodigy")
+    )
+    assert normalize_card_name("Will-o'-the-Wisp") == "will o the wisp"
+    assert normalize_card_name("Jötun Grunt") == normalize_card_name("Jotun Grunt")
+    assert normalize_card_name("Fire//Ice") == normalize_card_name("Fire // Ice")
+    assert normalize_card_name("Fire / Ice") == "fire // ice"
+
+
+def test_catalog_from_scryfall():
+    """Test canonical names for single, split and double-faced cards."""
+    catalog = CardCatalog.from_scryfall(
+        [
+            {"name": "Sheoldred, the Apocalypse", "layout": "normal"},
+            {
+                "name": "Fire // Ice",
+                "layout": "split",
+                "card_faces": [{"name": "Fire"}, {"name": "Ice"}],
+            },
+            {
+                "name": "Delver of Secrets // Insectile Aberration",
+                "layout": "transform",
+                "card_faces": [
+                    {"name": "Delver of Secrets"},
+                    {"name": "Insectile Aberration"},
+                ],
+            },
+            {"name": "Goblin", "layout": "token"},
+        ]
+    )
+
+    assert catalog.canonical_name("sheoldred, the apocalypse") == (
+        "Sheoldred, the Apocalypse"
+    )
+    assert catalog.canonical_name("fire//ice") == "Fire // Ice"
+    assert catalog.canonical_name("Delver of Secrets") == "Delver of Secrets"
+    assert catalog.canonical_name("delver of secrets // insectile aberration") == (
+        "Delver of Secrets"
+    )
+    assert catalog.canonical_name("Sheoldred the Apocalypse") == (
+        "Sheoldred, the Apocalypse"
+    )
+    assert catalog.canonical_name("Goblin") is None
+
+
+def test_catalog_suggest():
+    """Test that misspellings suggest the closest names first."""
+    catalog = CardCatalog.from_names(
+        [
+            "Sheoldred, the Apocalypse",
+            "Sheoldred, Whispering One",
+            "Sheoldred's Edict",
+            "Ketria Triome",
+            "Raugrin Triome",
+            "Lightning Bolt",
+        ]
+    )
+
+    assert catalog.suggest("Sheoldred the Apocalyspe")[0] == (
+        "Sheoldred, the Apocalypse"
+    )
+    assert catalog.suggest("ketria triom") == ["Ketria Triome"]
+    assert catalog.suggest("Triome", limit=2) == ["Ketria Triome", "Raugrin Triome"]
+    assert catalog.suggest("Counterspell") == []
+
+
+def test_catalog_save_and_load(tmp_path: Path):
+    """Test that a saved catalog loads back, and stale or missing ones don't."""
+    path = tmp_path / "catalog.pickle"
+    CardCatalog.from_names(["Ketria Triome"]).save(path)
+
+    catalog = load_card_catalog(str(path))
+    assert catalog is not None
+    assert catalog.canonical_name("KETRIA TRIOME") == "Ketria Triome"
+
+    stale = tmp_path / "stale.pickle"
+    stale.write_bytes(pickle.dumps({"version": 0, "names": {}}))
+    assert load_card_catalog(str(stale)) is None
+    assert load_card_catalog(str(tmp_path / "missing.pickle")) is None
@@ -1,13 +1,15 @@
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 from magic512bot.cogs.card_lender import (
+    MAX_MESSAGE_LENGTH,
     CardLender,
     InsertCardLoansModal,
     ReturnCardLoansModal,
 )
-from magic512bot.errors import CardNotFoundError
+from magic512bot.errors import CardNotFoundError, DecklistError
+from magic512bot.interactions import wait_for_background_tasks
 
 
 @pytest.mark.asyncio
@@ -59,12 +61,13 @@ async def test_bulk_return_cards_handler(mock_bot, mock_interaction, mock_member
         await cog.bulk_return_cards_handler.callback(
             cog, mock_interaction, mock_member, "test_tag"
         )
+        await wait_for_background_tasks()
 
         # Verify that the response was sent
-        mock_interaction.response.send_message.assert_called_once()
+        mock_interaction.followup.send.assert_called_once()
 
         # Verify the message contains the correct information
-        message = mock_interaction.response.send_message.call_args[0][0]
+        message = mock_interaction.followup.send.call_args[0][0]
         assert "returned **5**" in message
         assert mock_member.mention in message
 
@@ -76,8 +79,8 @@ async def test_list_loans_handler(mock_bot, mock_interaction, mock_member):
 
     # Create mock card loans
     mock_loans = [
-        MagicMock(quantity=2, card="Test Card 1", order_tag="test_tag"),
-        MagicMock(quantity=3, card="Test Card 2", order_tag="test_tag"),
+        MagicMock(quantity=2, card_name="Test Card 1", order_tag="test_tag"),
+        MagicMock(quantity=3, card_name="Test Card 2", order_tag="test_tag"),
     ]
 
     # Mock the get_cardloans function
@@ -91,12 +94,13 @@ async def test_list_loans_handler(mock_bot, mock_interaction, mock_member):
             await cog.list_loans_handler.callback(
                 cog, mock_interaction, mock_member, "test_tag"
             )
+            await wait_for_background_tasks()
 
             # Verify that the response was sent
-            mock_interaction.response.send_message.assert_called_once()
+            mock_interaction.followup.send.assert_called_once()
 
             # Verify the message contains the correct information
-            message = mock_interaction.response.send_message.call_args[0][0]
+            message = mock_interaction.followup.send.call_args[0][0]
             assert "**5**" in message  # Sum of quantities
             assert mock_member.mention in message
             assert "Formatted Output" in message
@@ -107,8 +111,8 @@ async def test_list_all_loans_handler(mock_bot, mock_interaction):
     """Test the list_all_loans_handler command."""
     cog = CardLender(mock_bot)
 
-    # Mock the bulk_get_cardloans function
-    with patch("magic512bot.cogs.card_lender.bulk_get_cardloans", return_value=[]):
+    # Mock the get_loan_totals function
+    with patch("magic512bot.cogs.card_lender.get_loan_totals", return_value=[]):
         # Mock the format_bulk_loanlist_output function
         with patch(
             "magic512bot.cogs.card_lender.format_bulk_loanlist_output",
@@ -116,24 +120,26 @@ async def test_list_all_loans_handler(mock_bot, mock_interaction):
         ):
             # Access the callback directly
             await cog.list_all_loans_handler.callback(cog, mock_interaction)
+            await wait_for_background_tasks()
 
             # Verify that the response was sent
-            mock_interaction.response.send_message.assert_called_once()
+            mock_interaction.followup.send.assert_called_once()
 
             # Verify the message contains the correct information
-            message = mock_interaction.response.send_message.call_args[0][0]
+            message = mock_interaction.followup.send.call_args[0][0]
             assert "Bulk Formatted Output" in message
 
 
 @pytest.mark.asyncio
-async def test_insert_card_loans_modal_on_submit(mock_interaction, db_session):
+async def test_insert_card_loans_modal_on_submit(
+    mock_bot, mock_interaction, db_session
+):
     """Test the on_submit method of InsertCardLoansModal."""
-    # Create a mock sessionmaker that returns our test session
-    mock_sessionmaker = MagicMock()
-    mock_sessionmaker.begin.return_value.__enter__.return_value = db_session
+    # Make the bot's database hand out our test session
+    mock_bot.db.begin.return_value.__enter__.return_value = db_session
 
     # Create a modal instance
-    modal = InsertCardLoansModal(mock_sessionmaker, mock_interaction.user, "test_tag")
+    modal = InsertCardLoansModal(mock_bot.db, mock_interaction.user, "test_tag")
     modal.loanlist = MagicMock()
     modal.loanlist.value = "2 Test Card"
 
@@ -141,24 +147,30 @@ async def test_insert_card_loans_modal_on_submit(mock_interaction, db_session):
     with patch("magic512bot.cogs.card_lender.insert_cardloans", return_value=2):
         # Call the on_submit method
         await modal.on_submit(mock_interaction)
+        await wait_for_background_tasks()
 
         # Verify that the response was sent
-        mock_interaction.response.send_message.assert_called_once()
+        mock_interaction.followup.send.assert_called_once()
 
         # Verify the message contains the correct information
-        message = mock_interaction.response.send_message.call_args[0][0]
+        message = mock_interaction.followup.send.call_args[0][0]
         assert "loaned **2**" in message
 
+        # Posted publicly, after the ephemeral "thinking" message is resolved
+        mock_interaction.edit_original_response.assert_awaited_once()
+        assert "ephemeral" not in mock_interaction.followup.send.call_args[1]
+
 
 @pytest.mark.asyncio
-async def test_return_card_loans_modal_on_submit(mock_interaction, db_session):
+async def test_return_card_loans_modal_on_submit(
+    mock_bot, mock_interaction, db_session
+):
     """Test the on_submit method of ReturnCardLoansModal."""
-    # Create a mock sessionmaker that returns our test session
-    mock_sessionmaker = MagicMock()
-    mock_sessionmaker.begin.return_value.__enter__.return_value = db_session
+    # Make the bot's database hand out our test session
+    mock_bot.db.begin.return_value.__enter__.return_value = db_session
 
     # Create a modal instance
-    modal = ReturnCardLoansModal(mock_sessionmaker, mock_interaction.user, "test_tag")
+    modal = ReturnCardLoansModal(mock_bot.db, mock_interaction.user, "test_tag")
     modal.loanlist = MagicMock()
     modal.loanlist.value = "2 Test Card"
 
@@ -166,24 +178,26 @@ async def test_return_card_loans_modal_on_submit(mock_interaction, db_session):
     with patch("magic512bot.cogs.card_lender.return_cardloans", return_value=2):
         # Call the on_submit method
         await modal.on_submit(mock_interaction)
+        await wait_for_background_tasks()
 
         # Verify that the response was sent
-        mock_interaction.response.send_message.assert_called_once()
+        mock_interaction.followup.send.assert_called_once()
 
         # Verify the message contains the correct information
-        message = mock_interaction.response.send_message.call_args[0][0]
+        message = mock_interaction.followup.send.call_args[0][0]
         assert "returned **2**" in message
 
 
 @pytest.mark.asyncio
-async def test_return_card_loans_modal_on_submit_error(mock_interaction, db_session):
+async def test_return_card_loans_modal_on_submit_error(
+    mock_bot, mock_interaction, db_session
+):
     """Test the on_submit method of ReturnCardLoansModal when an error occurs."""
-    # Create a mock sessionmaker that returns our test session
-    mock_sessionmaker = MagicMock()
-    mock_sessionmaker.begin.return_value.__enter__.return_value = db_session
+    # Make the bot's database hand out our test session
+    mock_bot.db.begin.return_value.__enter__.return_value = db_session
 
     # Create a modal instance
-    modal = ReturnCardLoansModal(mock_sessionmaker, mock_interaction.user, "test_tag")
+    modal = ReturnCardLoansModal(mock_bot.db, mock_interaction.user, "test_tag")
     modal.loanlist = MagicMock()
     modal.loanlist.value = "2 Test Card"
 
@@ -194,6 +208,82 @@ async def test_return_card_loans_modal_on_submit_error(mock_interaction, db_sess
     ):
         # Call the on_submit method
         await modal.on_submit(mock_interaction)
+        await wait_for_background_tasks()
+
+        # Verify that the error response was sent, only to the lender
+        mock_interaction.followup.send.assert_called_once()
+        mock_interaction.response.defer.assert_awaited_once_with(
+            ephemeral=True, thinking=True
+        )
+        mock_interaction.edit_original_response.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_loan_handler_with_decklist(
+    mock_bot, mock_interaction, mock_member, db_session
+):
+    """Test that an attached decklist is loaned in one command, without a modal."""
+    mock_bot.db.begin.return_value.__enter__.return_value = db_session
+    cog = CardLender(mock_bot)
+    cube = [f"1 Test Card {i}" for i in range(540)]
+
+    with patch(
+        "magic512bot.cogs.card_lender.read_decklist", AsyncMock(return_value=cube)
+    ):
+        await cog.loan_handler.callback(
+            cog, mock_interaction, mock_member, "cube", MagicMock()
+        )
+        await wait_for_background_tasks()
+
+    mock_interaction.response.send_modal.assert_not_called()
+    mock_interaction.response.defer.assert_called_once()
+    message = mock_interaction.followup.send.call_args[0][0]
+    assert "loaned **540**" in message
+
+
+@pytest.mark.asyncio
+async def test_loan_handler_with_long_invalid_decklist(
+    mock_bot, mock_interaction, mock_member, db_session
+):
+    """Test that an error report too long for one message is attached instead."""
+    mock_bot.db.begin.return_value.__enter__.return_value = db_session
+    cog = CardLender(mock_bot)
+    typos = [f"one Test Card {i}" for i in range(300)]
+
+    with patch(
+        "magic512bot.cogs.card_lender.read_decklist", AsyncMock(return_value=typos)
+    ):
+        await cog.loan_handler.callback(
+            cog, mock_interaction, mock_member, "cube", MagicMock()
+        )
+        await wait_for_background_tasks()
+
+    mock_interaction.followup.send.assert_called_once()
+    args, kwargs = mock_interaction.followup.send.call_args
+    assert len(args[0]) <= MAX_MESSAGE_LENGTH
+    assert kwargs["ephemeral"]
+    report = kwargs["file"].fp.read().decode()
+    assert "one Test Card 0" in report
+    assert "one Test Card 299" in report
+
+
+@pytest.mark.asyncio
+async def test_return_cards_handler_with_unreadable_decklist(
+    mock_bot, mock_interaction, mock_member
+):
+    """Test that a decklist that can't be read is reported to the user."""
+    cog = CardLender(mock_bot)
+
+    with patch(
+        "magic512bot.cogs.card_lender.read_decklist",
+        AsyncMock(side_effect=DecklistError("`deck.png` isn't a decklist")),
+    ):
+        await cog.return_cards_handler.callback(
+            cog, mock_interaction, mock_member, "", MagicMock()
+        )
+        await wait_for_background_tasks()
 
-        # Verify that the error response was sent
-        mock_interaction.response.send_message.assert_called_once()
+    mock_bot.db.run.assert_not_called()
+    message = mock_interaction.followup.send.call_args[0][0]
+    assert "deck.png" in message
+    assert mock_interaction.followup.send.call_args[1]["ephemeral"]
@@ -2,22 +2,30 @@ import datetime
 from unittest.mock import MagicMock, patch
 
 import pytest
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
+from magic512bot.card_catalog import CardCatalog
 from magic512bot.errors import CardListInputError, CardNotFoundError
+from magic512bot.models.card import Card
 from magic512bot.models.cardloan import CardLoan
 from magic512bot.services.card_lender import (
-    bulk_get_cardloans,
     bulk_return_cardloans,
     format_bulk_loanlist_output,
     format_loanlist_output,
+    get_card_ids,
     get_cardloans,
+    get_loan_totals,
     insert_cardloans,
     parse_cardlist,
     return_cardloans,
 )
 
 
+def _card_id(session: Session, name: str) -> int:
+    return get_card_ids(session, [name])[name]
+
+
 def test_parse_cardlist_valid():
     """Test parsing a valid card list."""
     card_list = ["2 Test Card 1", "3 Test Card 2"]
@@ -43,6 +51,34 @@ def test_parse_cardlist_invalid_quantity():
         parse_cardlist(card_list)
 
 
+def test_parse_cardlist_canonicalizes_names():
+    """Test that card names are checked against the catalog and respelled."""
+    catalog = CardCatalog.from_names(["Sheoldred, the Apocalypse", "Fire // Ice"])
+    card_list = ["1 sheoldred, the apocalypse", "2 Sheoldred, the Apocalypse", "1 Fire/Ice"]
+
+    assert parse_cardlist(card_list, catalog) == {
+        "Sheoldred, the Apocalypse": 3,
+        "Fire // Ice": 1,
+    }
+
+
+def test_parse_cardlist_unknown_card():
+    """Test that cards missing from the catalog are reported with suggestions."""
+    catalog = CardCatalog.from_names(["Sheoldred, the Apocalypse", "Ketria Triome"])
+
+    with pytest.raises(CardListInputError) as exc_info:
+        parse_cardlist(
+            ["1 Sheoldred, the Apocalypse", "2 Sheoldred Apocalypse", "1 Zzyzx"],
+            catalog,
+        )
+
+    assert exc_info.value.unknown_cards == {
+        "Sheoldred Apocalypse": ["Sheoldred, the Apocalypse"],
+        "Zzyzx": [],
+    }
+    assert "did you mean: Sheoldred, the Apocalypse?" in str(exc_info.value)
+
+
 def test_insert_cardloans(db_session: Session):
     """Test inserting card loans."""
     card_list = ["2 Test Card 1", "3 Test Card 2"]
@@ -64,7 +100,7 @@ def test_insert_cardloans(db_session: Session):
     assert len(loans) == 2
 
     # Check the first loan
-    assert loans[0].card == "Test Card 1"
+    assert loans[0].card_name == "Test Card 1"
     assert loans[0].quantity == 2
     assert loans[0].lender == lender_id
     assert loans[0].borrower == borrower_id
@@ -72,15 +108,88 @@ def test_insert_cardloans(db_session: Session):
     assert loans[0].order_tag == tag
 
     # Check the second loan
-    assert loans[1].card == "Test Card 2"
+    assert loans[1].card_name == "Test Card 2"
     assert loans[1].quantity == 3
 
 
+def test_insert_cardloans_batches_rows(db_session: Session):
+    """Test that a cube-sized list is loaned with one INSERT into card_loans."""
+    statements = []
+    event.listen(
+        db_session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    card_list = [f"1 Test Card {i}" for i in range(540)]
+    assert insert_cardloans(db_session, card_list, 12345, 67890, "TestBorrower") == 540
+
+    assert sum(stmt.startswith("INSERT INTO card_loans") for stmt in statements) == 1
+    assert db_session.query(CardLoan).count() == 540
+
+
+def test_insert_cardloans_merge(db_session: Session):
+    """Test that merging adds to the latest loan with the same card and tag."""
+    insert_cardloans(db_session, ["1 Test Card 1"], 12345, 67890, "TestBorrower")
+    insert_cardloans(db_session, ["2 Test Card 1"], 12345, 67890, "TestBorrower")
+    insert_cardloans(
+        db_session, ["1 Test Card 1"], 12345, 67890, "TestBorrower", "other_tag"
+    )
+
+    result = insert_cardloans(
+        db_session,
+        ["3 Test Card 1", "4 Test Card 2"],
+        12345,
+        67890,
+        "TestBorrower",
+        merge=True,
+    )
+
+    assert result == 7
+    loans = db_session.query(CardLoan).order_by(CardLoan.id).all()
+    assert [(loan.card_name, loan.quantity, loan.order_tag) for loan in loans] == [
+        ("Test Card 1", 1, ""),
+        ("Test Card 1", 5, ""),
+        ("Test Card 1", 1, "other_tag"),
+        ("Test Card 2", 4, ""),
+    ]
+
+
+def test_get_card_ids_matches_spellings(db_session: Session):
+    """Test that spellings of one card share a single cards row."""
+    ids = get_card_ids(db_session, ["Jace, Vryn's Prodigy", "Test Card 1"])
+    assert get_card_ids(db_session, ["JACE VRYNS PRODIGY"]) == {
+        "JACE VRYNS PRODIGY": ids["Jace, Vryn's Prodigy"]
+    }
+    assert db_session.query(Card).count() == 2
+
+
+def test_return_cardloans_matches_spellings(db_session: Session):
+    """Test that cards are returned whichever way their names were spelled."""
+    insert_cardloans(
+        db_session,
+        ["2 Sheoldred, the Apocalypse", "1 sheoldred the apocalypse"],
+        12345,
+        67890,
+        "TestBorrower",
+    )
+    loan = db_session.query(CardLoan).one()
+    assert (loan.card_name, loan.quantity) == ("Sheoldred, the Apocalypse", 3)
+
+    assert (
+        return_cardloans(
+            db_session, ["3 SHEOLDRED,  THE APOCALYPSE"], 12345, 67890, ""
+        )
+        == 3
+    )
+    assert db_session.query(CardLoan).count() == 0
+
+
 def test_get_cardloans(db_session: Session):
     """Test getting card loans."""
     # Create some test loans
     loan1 = CardLoan(
-        card="Test Card 1",
+        card_id=_card_id(db_session, "Test Card 1"),
         quantity=2,
         lender=12345,
         borrower=67890,
@@ -89,7 +198,7 @@ def test_get_cardloans(db_session: Session):
         created_at=datetime.datetime.now(),
     )
     loan2 = CardLoan(
-        card="Test Card 2",
+        card_id=_card_id(db_session, "Test Card 2"),
         quantity=3,
         lender=12345,
         borrower=67890,
@@ -105,15 +214,15 @@ def test_get_cardloans(db_session: Session):
 
     # Verify the result
     assert len(result) == 2
-    assert result[0].card == "Test Card 1"
-    assert result[1].card == "Test Card 2"
+    assert result[0].card_name == "Test Card 1"
+    assert result[1].card_name == "Test Card 2"
 
 
 def test_return_cardloans(db_session: Session):
     """Test returning card loans."""
     # Create some test loans
     loan1 = CardLoan(
-        card="Test Card 1",
+        card_id=_card_id(db_session, "Test Card 1"),
         quantity=2,
         lender=12345,
         borrower=67890,
@@ -122,7 +231,7 @@ def test_return_cardloans(db_session: Session):
         created_at=datetime.datetime.now(),
     )
     loan2 = CardLoan(
-        card="Test Card 2",
+        card_id=_card_id(db_session, "Test Card 2"),
         quantity=3,
         lender=12345,
         borrower=67890,
@@ -145,11 +254,11 @@ def test_return_cardloans(db_session: Session):
     assert len(loans) == 2
 
     # Check the first loan (partially returned)
-    assert loans[0].card == "Test Card 1"
+    assert loans[0].card_name == "Test Card 1"
     assert loans[0].quantity == 1
 
     # Check the second loan (partially returned)
-    assert loans[1].card == "Test Card 2"
+    assert loans[1].card_name == "Test Card 2"
     assert loans[1].quantity == 1
 
 
@@ -157,7 +266,7 @@ def test_return_cardloans_not_found(db_session: Session):
     """Test returning card loans that don't exist."""
     # Create some test loans
     loan = CardLoan(
-        card="Test Card 1",
+        card_id=_card_id(db_session, "Test Card 1"),
         quantity=1,
         lender=12345,
         borrower=67890,
@@ -175,85 +284,91 @@ def test_return_cardloans_not_found(db_session: Session):
         return_cardloans(db_session, card_list, 12345, 67890, "test_tag")
 
 
-def test_bulk_return_cardloans(db_session: Session):
-    """Test bulk returning card loans."""
-    # Create some test loans
-    loan1 = CardLoan(
-        card="Test Card 1",
-        quantity=2,
-        lender=12345,
-        borrower=67890,
-        borrower_name="TestBorrower",
-        order_tag="test_tag",
-        created_at=datetime.datetime.now(),
+def _add_tagged_loans(db_session: Session) -> None:
+    db_session.add_all(
+        [
+            CardLoan(
+                card_id=_card_id(db_session, card),
+                quantity=quantity,
+                lender=12345,
+                borrower=borrower,
+                borrower_name="TestBorrower",
+                order_tag=tag,
+                created_at=datetime.datetime.now(),
+            )
+            for card, quantity, borrower, tag in [
+                ("Test Card 1", 2, 67890, "test_tag"),
+                ("Test Card 2", 3, 67890, "test_tag"),
+                ("Test Card 3", 4, 67890, "other_tag"),
+                ("Test Card 4", 1, 54321, "test_tag"),
+            ]
+        ]
     )
-    loan2 = CardLoan(
-        card="Test Card 2",
-        quantity=3,
-        lender=12345,
-        borrower=67890,
-        borrower_name="TestBorrower",
-        order_tag="test_tag",
-        created_at=datetime.datetime.now(),
-    )
-    db_session.add_all([loan1, loan2])
     db_session.commit()
 
-    # Mock the delete statement execution
-    with patch("sqlalchemy.orm.Session.execute") as mock_execute:
-        mock_execute.return_value.fetchall.return_value = [loan1, loan2]
 
-        # Bulk return the loans
-        result = bulk_return_cardloans(db_session, 12345, 67890, "test_tag")
+def test_bulk_return_cardloans(db_session: Session):
+    """Test bulk returning card loans with a tag."""
+    _add_tagged_loans(db_session)
 
-        # Verify the result
-        assert result == 2  # Number of rows affected
+    result = bulk_return_cardloans(db_session, 12345, 67890, "test_tag")
 
+    # Counts cards, not rows, and leaves other tags and borrowers alone
+    assert result == 5
+    remaining = db_session.query(CardLoan).order_by(CardLoan.card_id).all()
+    assert [loan.card_name for loan in remaining] == ["Test Card 3", "Test Card 4"]
 
-def test_bulk_get_cardloans(db_session: Session):
-    """Test bulk getting card loans."""
-    # Create some test loans
-    loan1 = CardLoan(
-        card="Test Card 1",
-        quantity=2,
-        lender=12345,
-        borrower=67890,
-        borrower_name="TestBorrower",
-        order_tag="test_tag",
-        created_at=datetime.datetime.now(),
-    )
-    loan2 = CardLoan(
-        card="Test Card 2",
-        quantity=3,
-        lender=12345,
-        borrower=54321,
-        borrower_name="OtherBorrower",
-        order_tag="other_tag",
-        created_at=datetime.datetime.now(),
-    )
-    db_session.add_all([loan1, loan2])
-    db_session.commit()
 
-    # Get all loans for the lender
-    result = bulk_get_cardloans(db_session, 12345)
+def test_bulk_return_cardloans_without_tag(db_session: Session):
+    """Test bulk returning every card loaned to a borrower."""
+    _add_tagged_loans(db_session)
+
+    assert bulk_return_cardloans(db_session, 12345, 67890) == 9
+    assert [loan.card_name for loan in db_session.query(CardLoan).all()] == ["Test Card 4"]
+
+
+def test_bulk_return_cardloans_without_returning_support(
+    db_session: Session, monkeypatch: pytest.MonkeyPatch
+):
+    """Test the SUM + DELETE path for backends lacking DELETE ... RETURNING."""
+    _add_tagged_loans(db_session)
+    monkeypatch.setattr(db_session.get_bind().dialect, "delete_returning", False)
+
+    assert bulk_return_cardloans(db_session, 12345, 67890, "test_tag") == 5
+    assert bulk_return_cardloans(db_session, 12345, 67890, "test_tag") == 0
+    assert db_session.query(CardLoan).count() == 2
 
-    # Verify the result
-    assert len(result) == 2
-    assert result[0].card == "Test Card 1"
-    assert result[1].card == "Test Card 2"
+
+def test_bulk_return_cardloans_with_delete_returning(
+    db_session: Session, monkeypatch: pytest.MonkeyPatch
+):
+    """Test the DELETE ... RETURNING path used on backends other than SQLite."""
+    _add_tagged_loans(db_session)
+    monkeypatch.setattr(db_session.get_bind().dialect, "name", "postgresql")
+    statements = []
+    event.listen(
+        db_session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    assert bulk_return_cardloans(db_session, 12345, 67890, "test_tag") == 5
+    assert len(statements) == 1
+    assert "RETURNING" in statements[0]
+    assert db_session.query(CardLoan).count() == 2
 
 
 def test_format_loanlist_output():
     """Test formatting loan list output."""
     # Create some mock loans
     loan1 = MagicMock()
-    loan1.card = "Test Card 1"
+    loan1.card_name = "Test Card 1"
     loan1.quantity = 2
     loan1.order_tag = "test_tag"
     loan1.created_at = datetime.datetime(2023, 1, 1)
 
     loan2 = MagicMock()
-    loan2.card = "Test Card 2"
+    loan2.card_name = "Test Card 2"
     loan2.quantity = 3
     loan2.order_tag = "test_tag"
     loan2.created_at = datetime.datetime(2023, 1, 2)
@@ -268,23 +383,140 @@ def test_format_loanlist_output():
 
 def test_format_bulk_loanlist_output():
     """Test formatting bulk loan list output."""
-    # Create some mock loans
-    loan1 = MagicMock()
-    loan1.borrower_name = "TestBorrower"
-    loan1.order_tag = "test_tag"
-    loan1.quantity = 2
-
-    loan2 = MagicMock()
-    loan2.borrower_name = "OtherBorrower"
-    loan2.order_tag = "other_tag"
-    loan2.quantity = 3
+    loan_totals = [("OtherBorrower", "", 3), ("TestBorrower", "test_tag", 2)]
 
     # Mock table2ascii to avoid column width issues
-    with patch("magic512bot.services.card_lender.table2ascii") as mock_table2ascii:
+    with patch("table2ascii.table2ascii") as mock_table2ascii:
         mock_table2ascii.return_value = "Mocked Table Output"
 
         # Format the output
-        result = format_bulk_loanlist_output([loan1, loan2])
+        result = format_bulk_loanlist_output(loan_totals)
 
         # Verify the result
         assert result == "Mocked Table Output"
+        assert mock_table2ascii.call_args[1]["body"] == [
+            ["OtherBorrower", "<empty>", "3"],
+            ["TestBorrower", "test_tag", "2"],
+        ]
+
+
+def test_get_loan_totals(db_session: Session):
+    """Test aggregating loans per borrower and tag in the database."""
+    db_session.add_all(
+        [
+            CardLoan(
+                card_id=_card_id(db_session, card),
+                quantity=quantity,
+                lender=lender,
+                borrower=borrower,
+                borrower_name=borrower_name,
+                order_tag=tag,
+                created_at=datetime.datetime.now(),
+            )
+            for card, quantity, lender, borrower, borrower_name, tag in [
+                ("Test Card 1", 2, 12345, 67890, "TestBorrower", "test_tag"),
+                ("Test Card 2", 3, 12345, 67890, "TestBorrower", "test_tag"),
+                ("Test Card 3", 1, 12345, 67890, "TestBorrower", ""),
+                ("Test Card 1", 4, 12345, 54321, "OtherBorrower", "test_tag"),
+                ("Test Card 1", 9, 99999, 67890, "TestBorrower", "test_tag"),
+            ]
+        ]
+    )
+    db_session.commit()
+
+    assert get_loan_totals(db_session, 12345) == [
+        ("TestBorrower", "", 1),
+        ("OtherBorrower", "test_tag", 4),
+        ("TestBorrower", "test_tag", 5),
+    ]
+
+
+def test_return_cardloans_fifo_across_loans(db_session: Session):
+    """Test that returns consume the oldest loans first with one SELECT."""
+    base = datetime.datetime(2024, 1, 1)
+    db_session.add_all(
+        [
+            CardLoan(
+                card_id=_card_id(db_session, card),
+                quantity=quantity,
+                lender=12345,
+                borrower=67890,
+                borrower_name="TestBorrower",
+                order_tag="",
+                created_at=base + datetime.timedelta(days=day),
+            )
+            for card, quantity, day in [
+                ("Test Card 1", 2, 2),
+                ("Test Card 1", 1, 0),
+                ("Test Card 1", 3, 1),
+                ("Test Card 2", 4, 0),
+            ]
+        ]
+    )
+    db_session.commit()
+
+    statements = []
+    event.listen(
+        db_session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    result = return_cardloans(
+        db_session, ["5 Test Card 1", "4 Test Card 2"], 12345, 67890, ""
+    )
+
+    assert result == 9
+    assert sum(stmt.startswith("SELECT") for stmt in statements) == 1
+    remaining = db_session.query(CardLoan).order_by(CardLoan.created_at).all()
+    # day 0 and day 1 loans are used up, one card is left from day 2
+    assert [(loan.card_name, loan.quantity) for loan in remaining] == [("Test Card 1", 1)]
+
+
+def test_return_cardloans_fifo_ties_broken_by_id(db_session: Session):
+    """Test that loans created at the same time are returned in insert order."""
+    created_at = datetime.datetime(2024, 1, 1)
+    card_id = _card_id(db_session, "Test Card 1")
+    db_session.add_all(
+        [
+            CardLoan(
+                card_id=card_id,
+                quantity=quantity,
+                lender=12345,
+                borrower=67890,
+                borrower_name="TestBorrower",
+                order_tag=tag,
+                created_at=created_at,
+            )
+            for quantity, tag in [(2, "first"), (2, "second")]
+        ]
+    )
+    db_session.commit()
+
+    assert return_cardloans(db_session, ["3 Test Card 1"], 12345, 67890, "") == 3
+
+    remaining = db_session.query(CardLoan).one()
+    assert (remaining.order_tag, remaining.quantity) == ("second", 1)
+
+
+def test_return_cardloans_not_found_changes_nothing(db_session: Session):
+    """Test that a failed return leaves every loan untouched."""
+    db_session.add(
+        CardLoan(
+            card_id=_card_id(db_session, "Test Card 1"),
+            quantity=2,
+            lender=12345,
+            borrower=67890,
+            borrower_name="TestBorrower",
+            order_tag="",
+            created_at=datetime.datetime.now(),
+        )
+    )
+    db_session.commit()
+
+    with pytest.raises(CardNotFoundError) as exc_info:
+        return_cardloans(
+            db_session, ["1 Test Card 1", "3 Test Card 2"], 12345, 67890, ""
+        )
+
+    assert exc_info.value.card_errors == [("Test Card 2", 3)]
+    assert db_session.query(CardLoan).one().quantity == 2
@@ -0,0 +1,45 @@
+import sys
+from collections.abc import AsyncIterator
+from unittest.mock import MagicMock, patch
+
+import discord
+import pytest
+import pytest_asyncio
+
+from magic512bot.main import COG_MODULES, Magic512Bot
+
+
+@pytest_asyncio.fixture
+async def bot(mock_bot: MagicMock) -> AsyncIterator[Magic512Bot]:
+    """A bot whose extensions are unloaded afterwards."""
+    bot = Magic512Bot(command_prefix="!", intents=discord.Intents.none())
+    bot.db = mock_bot.db
+    # load_extension re-executes cog modules and unload_extension removes them,
+    # so restore the modules other tests imported
+    with patch.dict(sys.modules):
+        yield bot
+        for extension in list(bot.extensions):
+            await bot.unload_extension(extension)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("concurrent", [True, False])
+async def test_load_cogs_records_timings(bot: Magic512Bot, concurrent: bool) -> None:
+    """Test that each cog is loaded with its import and setup time recorded."""
+    await bot.load_cogs(concurrent=concurrent)
+
+    assert set(bot.cog_timings) == set(COG_MODULES)
+    assert {cog.__module__ for cog in bot.cogs.values()} == {
+        f"magic512bot.{module}" for module in COG_MODULES
+    }
+    for timing in bot.cog_timings.values():
+        assert timing.import_seconds >= 0
+        assert timing.setup_seconds > 0
+
+
+@pytest.mark.asyncio
+async def test_load_cogs_continues_past_failures(bot: Magic512Bot) -> None:
+    """Test that a cog failing to load doesn't stop the others loading."""
+    await bot.load_cogs(("cogs.missing", "cogs.card_lender"))
+
+    assert list(bot.cog_timings) == ["cogs.card_lender"]
@@ -0,0 +1,73 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+from discord import app_commands
+from sqlalchemy.orm import Session
+
+from magic512bot.main import Magic512Bot, command_tree_hash
+from magic512bot.services.command_sync import (
+    get_command_tree_hash,
+    set_command_tree_hash,
+)
+
+
+async def _ping(interaction: discord.Interaction) -> None:
+    pass
+
+
+def _command(name: str, description: str = "A command") -> app_commands.Command:
+    return app_commands.Command(name=name, description=description, callback=_ping)
+
+
+def _tree(*commands: app_commands.Command) -> app_commands.CommandTree:
+    client = MagicMock()
+    client._connection._command_tree = None
+    tree = app_commands.CommandTree(client)
+    for command in commands:
+        tree.add_command(command)
+    return tree
+
+
+def test_command_tree_hash_round_trip(db_session: Session) -> None:
+    """Test storing and replacing the hash last synced to a scope."""
+    assert get_command_tree_hash(db_session, "1:global") is None
+
+    set_command_tree_hash(db_session, "1:global", "a" * 64)
+    set_command_tree_hash(db_session, "1:global", "b" * 64)
+    set_command_tree_hash(db_session, "1:guild:2", "c" * 64)
+    db_session.commit()
+
+    assert get_command_tree_hash(db_session, "1:global") == "b" * 64
+    assert get_command_tree_hash(db_session, "1:guild:2") == "c" * 64
+
+
+def test_command_tree_hash_ignores_order() -> None:
+    """Test that the hash depends on the commands, not the order they were added."""
+    in_order = _tree(_command("loan"), _command("return"))
+    reversed_order = _tree(_command("return"), _command("loan"))
+    changed = _tree(_command("loan", "Loan a card"), _command("return"))
+
+    assert command_tree_hash(in_order) == command_tree_hash(reversed_order)
+    assert command_tree_hash(in_order) != command_tree_hash(changed)
+
+
+@pytest.mark.asyncio
+async def test_sync_commands_skips_unchanged_tree(
+    mock_bot: MagicMock, db_session: Session
+) -> None:
+    """Test that commands are only synced again once the tree changes."""
+    mock_bot.db.begin.return_value.__enter__.return_value = db_session
+    bot = Magic512Bot(command_prefix="!", intents=discord.Intents.none())
+    bot.db = mock_bot.db
+    bot._connection.application_id = 42
+    bot.tree.add_command(_command("loan"))
+    bot.tree.sync = AsyncMock(return_value=[])  # type: ignore[method-assign]
+
+    await bot.sync_commands()
+    await bot.sync_commands()
+    assert bot.tree.sync.await_count == 1
+
+    bot.tree.add_command(_command("return"))
+    await bot.sync_commands()
+    assert bot.tree.sync.await_count == 2
@@ -0,0 +1,109 @@
+import contextvars
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler
+from unittest.mock import MagicMock
+
+import pytest
+
+from magic512bot.config import (
+    LOG_CONTEXT,
+    LOGGER,
+    DroppingQueueHandler,
+    JsonFormatter,
+    LogContextFilter,
+    bind_log_context,
+)
+from magic512bot.database import Database
+from magic512bot.metrics import LOG_RECORDS_DROPPED
+
+
+def test_logger_only_enqueues_records():
+    """Test that the bot logger does no I/O itself, leaving it to the listener."""
+    assert [type(handler) for handler in LOGGER.handlers] == [DroppingQueueHandler]
+
+
+def test_dropping_queue_handler_counts_dropped_records():
+    """Test that records past the queue's capacity are dropped and counted."""
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_queue)
+    logger = logging.getLogger("magic512bot.tests.dropping")
+    logger.propagate = False
+    logger.addHandler(handler)
+    dropped_before = LOG_RECORDS_DROPPED.labels("WARNING").value
+
+    try:
+        for i in range(5):
+            logger.warning("record %d", i)
+    finally:
+        logger.removeHandler(handler)
+
+    assert isinstance(handler, QueueHandler)
+    assert [log_queue.get_nowait().getMessage() for _ in range(2)] == [
+        "record 0",
+        "record 1",
+    ]
+    assert LOG_RECORDS_DROPPED.labels("WARNING").value - dropped_before == 3
+
+
+def _capture_records() -> tuple[queue.Queue[logging.LogRecord], logging.Logger]:
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue()
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(LogContextFilter())
+    logger = logging.getLogger("magic512bot.tests.context")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [handler]
+    return log_queue, logger
+
+
+def test_json_formatter_includes_log_context():
+    """Test that records carry the log context bound when they were logged."""
+    log_queue, logger = _capture_records()
+
+    def handle() -> None:
+        bind_log_context(interaction_id=111, command="loan", guild_id=222)
+        try:
+            raise ValueError("bad card list")
+        except ValueError:
+            logger.exception("Loaned %d cards", 4)
+
+    contextvars.copy_context().run(handle)
+    logger.info("outside any interaction")
+
+    entry = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+    assert entry["message"] == "Loaned 4 cards"
+    assert entry["level"] == "ERROR"
+    assert (entry["interaction_id"], entry["command"], entry["guild_id"]) == (
+        111,
+        "loan",
+        222,
+    )
+    assert "ValueError: bad card list" in entry["exception"]
+    assert "command" not in json.loads(JsonFormatter().format(log_queue.get_nowait()))
+
+
+def test_disabled_levels_skip_formatting():
+    """Test that arguments for disabled levels are never formatted."""
+    log_queue, logger = _capture_records()
+    argument = MagicMock()
+
+    logger.debug("expensive %s", argument)
+
+    argument.__str__.assert_not_called()
+    assert log_queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_database_run_carries_log_context():
+    """Test that service calls on the DB worker thread see the caller's context."""
+    seen = []
+    db = Database(MagicMock())
+    db._run_in_transaction = lambda func: func(None)  # type: ignore[method-assign]
+    bind_log_context(command="nominate")
+
+    await db.run(lambda session: seen.append(LOG_CONTEXT.get()))
+    await db.close()
+
+    assert seen == [{"command": "nominate"}]
@@ -1,9 +1,37 @@
+import asyncio
+import logging
+import threading
+from unittest.mock import patch
+
 import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
 
+from magic512bot.card_catalog import CardCatalog
+from magic512bot.database import (
+    AsyncDatabase,
+    Database,
+    engine_options,
+    init_db,
+    init_db_async,
+    install_slow_query_log,
+    to_async_url,
+)
 from magic512bot.models import register_models
 from magic512bot.models.base import Base
+from magic512bot.models.card import Card
 from magic512bot.models.cardloan import CardLoan
-from magic512bot.models.user import User
+from magic512bot.models.nomination import Nomination
+from magic512bot.models.user import User, UserSweatRole
+from magic512bot.services.nomination import (
+    add_nomination,
+    get_all_nominations,
+)
+from magic512bot.services.task_run import (
+    get_active_poll_id,
+    set_poll,
+)
 
 
 def test_register_models():
@@ -24,12 +52,14 @@ def test_base_metadata():
 @pytest.mark.parametrize(
     "model,expected_columns",
     [
-        (User, ["id", "user_name", "sweat_roles"]),
+        (User, ["id", "user_name"]),
+        (UserSweatRole, ["user_id", "role_name"]),
+        (Card, ["id", "normalized_name", "name"]),
         (
             CardLoan,
             [
                 "id",
-                "card",
+                "card_id",
                 "lender",
                 "borrower",
                 "borrower_name",
@@ -48,3 +78,222 @@ def test_model_columns(model, expected_columns):
     # Verify all expected columns are present
     for column in expected_columns:
         assert column in columns
+
+
+@pytest.mark.asyncio
+async def test_database_run_commits_off_loop(tmp_path):
+    """Test that Database.run executes in a worker thread and commits."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'bot.db'}")
+    Base.metadata.create_all(engine)
+    db = Database(sessionmaker(bind=engine, expire_on_commit=False), max_workers=1)
+
+    def current_thread(session):
+        return threading.current_thread().name
+
+    try:
+        assert (await db.run(current_thread)).startswith("magic512bot-db")
+        await db.run(add_nomination, user_id=12345, format="Modern")
+        nominations = await db.run(get_all_nominations)
+        assert [nom.format for nom in nominations] == ["Modern"]
+
+        def failing_insert(session):
+            session.add(Nomination(user_id=1, format="Pauper"))
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await db.run(failing_insert)
+        assert len(await db.run(get_all_nominations)) == 1
+    finally:
+        await db.close()
+        engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_database_close_waits_off_loop():
+    """Test that close waits for in-flight work without blocking the loop."""
+    db = Database(sessionmaker(), max_workers=1)
+    release = threading.Event()
+    in_flight = db.executor.submit(release.wait)
+    # Releases the worker even if close blocked the loop, failing the test
+    # rather than hanging it
+    timer = threading.Timer(1.0, release.set)
+    timer.start()
+
+    closing = asyncio.create_task(db.close())
+    await asyncio.sleep(0.05)
+    assert not closing.done()
+
+    release.set()
+    await closing
+    assert in_flight.done()
+    timer.cancel()
+
+
+@pytest.mark.parametrize(
+    "connection_string,expected",
+    [
+        ("sqlite:///data/bot.db", "sqlite+aiosqlite:///data/bot.db"),
+        ("postgresql://bot:pw@db/bot", "postgresql+asyncpg://bot:***@db/bot"),
+    ],
+)
+def test_to_async_url(connection_string, expected):
+    """Test that sync connection strings map onto asyncio drivers."""
+    assert str(to_async_url(connection_string)) == expected
+
+
+@pytest.mark.asyncio
+async def test_async_database_runs_services(tmp_path):
+    """Test that AsyncDatabase runs the sync service functions."""
+    # Installed with the "async" extra
+    pytest.importorskip("aiosqlite")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}")
+    db = AsyncDatabase(async_engine)
+
+    try:
+        assert await init_db_async(async_engine)
+        await db.run(add_nomination, user_id=12345, format="Modern")
+        await db.run(set_poll, 777)
+
+        nominations = await db.run(get_all_nominations)
+        assert [nom.format for nom in nominations] == ["Modern"]
+        assert await db.run(get_active_poll_id) == 777
+    finally:
+        await db.close()
+
+
+def test_engine_options_skip_pool_sizing_for_sqlite():
+    """Test that pool sizing is only passed to pooled server backends."""
+    sqlite_options = engine_options("sqlite:///data/bot.db")
+    postgres_options = engine_options("postgresql://bot@db/bot")
+
+    assert "pool_size" not in sqlite_options
+    assert "pool_size" in postgres_options
+    assert "max_overflow" in postgres_options
+    assert sqlite_options["echo"] is False
+
+
+def test_slow_query_log_only_logs_slow_statements(caplog):
+    """Test that only statements over the threshold are logged."""
+    fast_engine = create_engine("sqlite:///:memory:")
+    slow_engine = create_engine("sqlite:///:memory:")
+    install_slow_query_log(fast_engine, threshold_ms=60_000)
+    install_slow_query_log(slow_engine, threshold_ms=1e-9)
+
+    with caplog.at_level(logging.WARNING, logger="magic512bot"):
+        with fast_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        assert "Slow query" not in caplog.text
+
+        with slow_engine.connect() as conn:
+            conn.execute(text("SELECT 2"))
+        assert "Slow query" in caplog.text
+        assert "SELECT 2" in caplog.text
+
+
+def test_init_db_creates_missing_indexes(engine, tables):
+    """Test that init_db adds model indexes to an existing card_loans table."""
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_card_loans_lender_borrower_card"))
+
+    with patch("magic512bot.database.engine", engine):
+        assert init_db()
+
+    index_names = {index["name"] for index in inspect(engine).get_indexes("card_loans")}
+    assert index_names >= {
+        "ix_card_loans_lender_borrower_tag_card",
+        "ix_card_loans_lender_borrower_card",
+    }
+
+
+def test_init_db_migrates_sweat_roles_json(engine):
+    """Test that init_db moves users.sweat_roles into user_sweat_roles."""
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE users (id BIGINT PRIMARY KEY, "
+                "user_name VARCHAR(100) NOT NULL, sweat_roles TEXT NOT NULL)"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO users VALUES "
+                """(1, 'Alpha', '["Modern Sweat", "Legacy Sweat"]'), (2, 'Beta', '[]')"""
+            )
+        )
+
+    with patch("magic512bot.database.engine", engine):
+        assert init_db()
+        # Running again finds nothing left to migrate
+        assert init_db()
+
+    columns = {column["name"] for column in inspect(engine).get_columns("users")}
+    assert "sweat_roles" not in columns
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT user_id, role_name FROM user_sweat_roles ORDER BY role_name")
+        ).all()
+    assert rows == [(1, "Legacy Sweat"), (1, "Modern Sweat")]
+
+
+def test_init_db_migrates_card_names(engine):
+    """Test that init_db moves card_loans.card names into the cards table."""
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE card_loans (id INTEGER PRIMARY KEY, "
+                "card VARCHAR(100) NOT NULL, lender BIGINT NOT NULL, "
+                "borrower BIGINT NOT NULL, borrower_name VARCHAR(100) NOT NULL, "
+                "quantity INTEGER NOT NULL, created_at DATETIME NOT NULL, "
+                "order_tag VARCHAR(100) NOT NULL)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX ix_card_loans_lender_borrower_card "
+                "ON card_loans (lender, borrower, card, created_at)"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO card_loans VALUES "
+                "(1, 'sheoldred, the apocalypse', 1, 2, 'B', 1, '2024-01-01', ''), "
+                "(2, 'Sheoldred the Apocalypse', 1, 2, 'B', 2, '2024-01-02', ''), "
+                "(3, 'Some  Proxy', 1, 2, 'B', 3, '2024-01-03', '')"
+            )
+        )
+
+    catalog = CardCatalog.from_names(["Sheoldred, the Apocalypse"])
+    with (
+        patch("magic512bot.database.engine", engine),
+        patch("magic512bot.database.load_card_catalog", return_value=catalog),
+    ):
+        assert init_db()
+        # Running again finds nothing left to migrate
+        assert init_db()
+
+    columns = {column["name"] for column in inspect(engine).get_columns("card_loans")}
+    assert "card" not in columns
+    index_columns = {
+        index["name"]: index["column_names"]
+        for index in inspect(engine).get_indexes("card_loans")
+    }
+    assert index_columns["ix_card_loans_lender_borrower_card"] == [
+        "lender",
+        "borrower",
+        "card_id",
+        "created_at",
+    ]
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT card_loans.id, cards.name FROM card_loans "
+                "JOIN cards ON cards.id = card_loans.card_id ORDER BY card_loans.id"
+            )
+        ).all()
+        card_count = conn.execute(text("SELECT count(*) FROM cards")).scalar()
+    assert rows == [
+        (1, "Sheoldred, the Apocalypse"),
+        (2, "Sheoldred, the Apocalypse"),
+        (3, "Some Proxy"),
+    ]
+    assert card_count == 2
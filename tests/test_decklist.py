@@ -0,0 +1,76 @@
+import pytest
+
+from magic512bot.decklist import MAX_DECKLIST_BYTES, DecklistParser
+from magic512bot.errors import DecklistError
+
+
+def parse(filename: str, data: bytes, chunk_size: int = 7) -> list[str]:
+    """Feeds `data` in small chunks, as it would arrive from a download."""
+    parser = DecklistParser(filename)
+    lines = []
+    for start in range(0, len(data), chunk_size):
+        lines.extend(parser.feed(data[start : start + chunk_size]))
+    lines.extend(parser.close())
+    return lines
+
+
+def test_parse_mtgo_text():
+    """Test an MTGO export with a byte order mark and a sideboard."""
+    data = (
+        "\ufeff4 Lightning Bolt\r\n4 Jötun Grunt\r\n\r\n2 Fire // Ice\r\nSB: 1 Pyroblast"
+    ).encode()
+
+    assert parse("deck.txt", data) == [
+        "4 Lightning Bolt",
+        "4 Jötun Grunt",
+        "2 Fire // Ice",
+        "1 Pyroblast",
+    ]
+
+
+def test_parse_arena_export():
+    """Test that Arena section headers and set codes are dropped."""
+    data = (
+        b"About\nName Mono Red\n\nDeck\n4 Lightning Bolt (M10) 146\n"
+        b"3x Fire // Ice (MH2) 290\n\nSideboard\n1 Pyroblast (ICE) 212\n"
+    )
+
+    assert parse("arena.TXT", data) == [
+        "4 Lightning Bolt",
+        "3 Fire // Ice",
+        "1 Pyroblast",
+    ]
+
+
+def test_parse_mtgo_dek():
+    """Test that .dek card entries, main deck and sideboard, become lines."""
+    data = (
+        b'<?xml version="1.0" encoding="utf-8"?>\n<Deck>\n'
+        b'  <Cards CatID="1" Quantity="4" Sideboard="false" Name="Lightning Bolt" />\n'
+        b'  <Cards CatID="2" Quantity="1" Sideboard="true" Name="Pyroblast" />\n'
+        b"</Deck>\n"
+    )
+
+    assert parse("deck.dek", data) == ["4 Lightning Bolt", "1 Pyroblast"]
+
+
+def test_unparseable_lines_are_left_for_parse_cardlist():
+    """Test that lines that aren't cards pass through to be reported."""
+    assert parse("deck.txt", b"Lightning Bolt\n4 Ketria Triome") == [
+        "Lightning Bolt",
+        "4 Ketria Triome",
+    ]
+
+
+@pytest.mark.parametrize(
+    "filename,data",
+    [
+        ("deck.png", b""),
+        ("deck.dek", b"<Deck><Cards Name="),
+        ("deck.txt", b"1 Island\n" * (MAX_DECKLIST_BYTES // 9 + 1)),
+    ],
+)
+def test_unreadable_decklists(filename: str, data: bytes):
+    """Test unsupported, malformed and oversized files are rejected."""
+    with pytest.raises(DecklistError):
+        parse(filename, data, chunk_size=4096)
@@ -0,0 +1,150 @@
+import asyncio
+import contextvars
+import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+
+from magic512bot.database import Database
+from magic512bot.interactions import (
+    InstrumentedCommandTree,
+    deferred,
+    instrument_http,
+    wait_for_background_tasks,
+)
+from magic512bot.metrics import (
+    COMMAND_CALLS,
+    COMMAND_DB_SECONDS,
+    COMMAND_ERRORS,
+    COMMAND_REST_SECONDS,
+    COMMAND_SECONDS,
+    CURRENT_COMMAND,
+    Counter,
+    Histogram,
+    HistogramFamily,
+    add_db_time,
+    render_metrics,
+    start_command,
+)
+
+
+def test_render_metrics_histogram_family() -> None:
+    family = HistogramFamily("test_seconds", "Test latency", "command", (0.1, 1.0))
+    family.labels("loan").observe(0.05)
+    family.labels("loan").observe(0.5)
+    family.labels('say "hi"').observe(2.0)
+
+    text = render_metrics((family,))
+
+    assert text.splitlines() == [
+        "# HELP test_seconds Test latency",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{command="loan",le="0.1"} 1',
+        'test_seconds_bucket{command="loan",le="1.0"} 2',
+        'test_seconds_bucket{command="loan",le="+Inf"} 2',
+        'test_seconds_sum{command="loan"} 0.55',
+        'test_seconds_count{command="loan"} 2',
+        'test_seconds_bucket{command="say \\"hi\\"",le="0.1"} 0',
+        'test_seconds_bucket{command="say \\"hi\\"",le="1.0"} 0',
+        'test_seconds_bucket{command="say \\"hi\\"",le="+Inf"} 1',
+        'test_seconds_sum{command="say \\"hi\\""} 2.0',
+        'test_seconds_count{command="say \\"hi\\""} 1',
+    ]
+
+
+def test_render_metrics_counter_and_summary() -> None:
+    counter = Counter("test_total", "Things counted")
+    counter.inc(3)
+    histogram = Histogram("test_lag_seconds", "Lag", labels={"command": "nominate"})
+
+    assert render_metrics((counter,)) == (
+        "# HELP test_total Things counted\n# TYPE test_total counter\ntest_total 3\n"
+    )
+    assert histogram.summary() == (
+        'test_lag_seconds{command="nominate"}: no observations'
+    )
+
+
+def test_command_timer_records_once() -> None:
+    def handle() -> None:
+        created_at = discord.utils.utcnow() - datetime.timedelta(seconds=0.2)
+        timer = start_command("timer-test", created_at)
+        add_db_time(0.03)
+        add_db_time(0.02)
+
+        timer.finish(failed=True)
+        timer.finish()
+        assert CURRENT_COMMAND.get() is timer
+
+    # Keeps the timer out of the context later tests run in
+    contextvars.copy_context().run(handle)
+
+    assert CURRENT_COMMAND.get() is None
+    assert COMMAND_CALLS.labels("timer-test").value == 1
+    assert COMMAND_ERRORS.labels("timer-test").value == 1
+    assert COMMAND_DB_SECONDS.labels("timer-test").sum == pytest.approx(0.05)
+    assert COMMAND_SECONDS.labels("timer-test").sum >= 0.2
+
+
+@pytest.mark.asyncio
+async def test_deferred_handler_records_db_and_rest_time(mock_interaction) -> None:
+    db = Database(MagicMock())
+    db._run_in_transaction = MagicMock(return_value=None)  # type: ignore[method-assign]
+    http = MagicMock()
+    http.request = AsyncMock()
+    instrument_http(http)
+
+    class Handler:
+        @deferred(name="deferred-test")
+        async def handle(self, interaction: discord.Interaction) -> None:
+            await db.run(MagicMock())
+            await http.request("route")
+            await interaction.followup.send("done")
+
+    # Each interaction is handled in its own task, as discord.py does
+    await asyncio.create_task(Handler().handle(mock_interaction))
+    assert COMMAND_CALLS.labels("deferred-test").value == 0
+    await wait_for_background_tasks()
+
+    mock_interaction.followup.send.assert_awaited_once_with("done")
+    assert COMMAND_CALLS.labels("deferred-test").value == 1
+    assert COMMAND_ERRORS.labels("deferred-test").value == 0
+    assert COMMAND_DB_SECONDS.labels("deferred-test").count == 1
+    assert COMMAND_REST_SECONDS.labels("deferred-test").count == 1
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_deferred_handler_counts_errors(mock_interaction) -> None:
+    class Handler:
+        @deferred(name="failing-test")
+        async def handle(self, interaction: discord.Interaction) -> None:
+            raise RuntimeError("boom")
+
+    await asyncio.create_task(Handler().handle(mock_interaction))
+    await wait_for_background_tasks()
+
+    assert COMMAND_ERRORS.labels("failing-test").value == 1
+    assert "Oops" in mock_interaction.followup.send.await_args.args[0]
+    # The first followup takes the defer's visibility, so that must be private
+    mock_interaction.response.defer.assert_awaited_once_with(
+        ephemeral=True, thinking=True
+    )
+
+
+@pytest.mark.asyncio
+async def test_command_tree_starts_timer_for_app_commands(mock_interaction) -> None:
+    client = MagicMock()
+    client._connection._command_tree = None
+    tree = InstrumentedCommandTree(client)
+    mock_interaction.type = discord.InteractionType.application_command
+    mock_interaction.command = MagicMock(qualified_name="tree-test")
+
+    async def check() -> None:
+        assert await tree.interaction_check(mock_interaction)
+        timer = CURRENT_COMMAND.get()
+        assert timer is not None
+        assert timer.name == "tree-test"
+
+    await asyncio.create_task(check())
@@ -14,6 +14,7 @@ from magic512bot.cogs.nomination import (
     is_nomination_period_active,
 )
 from magic512bot.config import TIMEZONE
+from magic512bot.interactions import wait_for_background_tasks
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.DEBUG)
@@ -47,7 +48,10 @@ def mock_interaction() -> MagicMock:
     """Create a mock discord interaction."""
     interaction = MagicMock(spec=discord.Interaction)
     interaction.response = AsyncMock()
-    interaction.response.send_message = AsyncMock()
+    interaction.followup = MagicMock()
+    interaction.followup.send = AsyncMock()
+    interaction.command = None
+    interaction.created_at = discord.utils.utcnow()
     interaction.user = MagicMock(spec=discord.Member)
     interaction.user.id = 12345
     interaction.user.display_name = "TestUser"
@@ -197,13 +201,14 @@ async def test_nominate_command(
                 nominate_command.callback,
             )
             await callback(nomination_cog, mock_interaction, format_name)
+            await wait_for_background_tasks()
 
             # Verify response
-            mock_interaction.response.send_message.assert_called_once()
-            message = mock_interaction.response.send_message.call_args[0][0]
+            mock_interaction.followup.send.assert_called_once()
+            message = mock_interaction.followup.send.call_args[0][0]
             assert expected_message in message
             assert (
-                mock_interaction.response.send_message.call_args[1]["ephemeral"] is True
+                mock_interaction.followup.send.call_args[1]["ephemeral"] is True
             )
 
             # Verify nomination was added only on success
@@ -244,9 +249,10 @@ async def test_nominate_command_error(
             nominate_command.callback,
         )
         await callback(cog, mock_interaction, "Modern")
+        await wait_for_background_tasks()
 
-        mock_interaction.response.send_message.assert_called_once()
-        message = mock_interaction.response.send_message.call_args[0][0]
+        mock_interaction.followup.send.assert_called_once()
+        message = mock_interaction.followup.send.call_args[0][0]
         assert "❌" in message
         assert "Test error" in message
 
@@ -261,7 +267,9 @@ async def test_nominate_command_exception(
     # Create a proper mock for the interaction
     mock_interaction = MagicMock(spec=discord.Interaction)
     mock_interaction.response = AsyncMock()
-    mock_interaction.response.send_message = AsyncMock()
+    mock_interaction.followup.send = AsyncMock()
+    mock_interaction.command = None
+    mock_interaction.created_at = discord.utils.utcnow()
     mock_interaction.user = MagicMock(spec=discord.Member)
     mock_interaction.user.id = 12345
 
@@ -287,9 +295,10 @@ async def test_nominate_command_exception(
             nominate_command.callback,
         )
         await callback(cog, mock_interaction, "Modern")
+        await wait_for_background_tasks()
 
-        mock_interaction.response.send_message.assert_called_once()
-        message = mock_interaction.response.send_message.call_args[0][0]
+        mock_interaction.followup.send.assert_called_once()
+        message = mock_interaction.followup.send.call_args[0][0]
         assert "❌" in message
         assert "error" in message.lower()
 
@@ -304,7 +313,9 @@ async def test_nominate_command_format_too_long(
     # Create a proper mock for the interaction
     mock_interaction = MagicMock(spec=discord.Interaction)
     mock_interaction.response = AsyncMock()
-    mock_interaction.response.send_message = AsyncMock()
+    mock_interaction.followup.send = AsyncMock()
+    mock_interaction.command = None
+    mock_interaction.created_at = discord.utils.utcnow()
     mock_interaction.user = MagicMock(spec=discord.Member)
     mock_interaction.user.id = 12345
 
@@ -325,8 +336,9 @@ async def test_nominate_command_format_too_long(
             Callable[[Any, discord.Interaction, str], Any], nominate_command.callback
         )
         await callback(cog, mock_interaction, long_format)
-        mock_interaction.response.send_message.assert_called_once()
-        message = mock_interaction.response.send_message.call_args[0][0]
+        await wait_for_background_tasks()
+        mock_interaction.followup.send.assert_called_once()
+        message = mock_interaction.followup.send.call_args[0][0]
         assert "too long" in message
 
 
@@ -342,7 +354,9 @@ async def test_nominate_command_success_with_channel_message(
     # Create a proper mock for the interaction
     mock_interaction = MagicMock(spec=discord.Interaction)
     mock_interaction.response = AsyncMock()
-    mock_interaction.response.send_message = AsyncMock()
+    mock_interaction.followup.send = AsyncMock()
+    mock_interaction.command = None
+    mock_interaction.created_at = discord.utils.utcnow()
     mock_interaction.user = MagicMock(spec=discord.Member)
     mock_interaction.user.id = 12345
     mock_interaction.user.display_name = "TestUser"
@@ -369,15 +383,16 @@ async def test_nominate_command_success_with_channel_message(
             nominate_command.callback,
         )
         await callback(cog, mock_interaction, "Modern")
+        await wait_for_background_tasks()
 
         mock_add.assert_called_once()
         assert mock_add.call_args[1]["user_id"] == mock_interaction.user.id
         assert mock_add.call_args[1]["format"] == "Modern"
 
-        mock_interaction.response.send_message.assert_called_once()
-        user_message = mock_interaction.response.send_message.call_args[0][0]
+        mock_interaction.followup.send.assert_called_once()
+        user_message = mock_interaction.followup.send.call_args[0][0]
         assert "Your nomination for **Modern**" in user_message
-        assert mock_interaction.response.send_message.call_args[1]["ephemeral"] is True
+        assert mock_interaction.followup.send.call_args[1]["ephemeral"] is True
 
         mock_bot.get_channel.assert_called_once()
         mock_channel.send.assert_called_once()
@@ -398,7 +413,9 @@ async def test_nominate_command_success_channel_not_found(
     # Create a proper mock for the interaction
     mock_interaction = MagicMock(spec=discord.Interaction)
     mock_interaction.response = AsyncMock()
-    mock_interaction.response.send_message = AsyncMock()
+    mock_interaction.followup.send = AsyncMock()
+    mock_interaction.command = None
+    mock_interaction.created_at = discord.utils.utcnow()
     mock_interaction.user = MagicMock(spec=discord.Member)
     mock_interaction.user.id = 12345
 
@@ -422,10 +439,11 @@ async def test_nominate_command_success_channel_not_found(
             nominate_command.callback,
         )
         await callback(cog, mock_interaction, "Modern")
+        await wait_for_background_tasks()
 
         mock_add.assert_called_once()
-        mock_interaction.response.send_message.assert_called_once()
-        user_message = mock_interaction.response.send_message.call_args[0][0]
+        mock_interaction.followup.send.assert_called_once()
+        user_message = mock_interaction.followup.send.call_args[0][0]
         assert "Your nomination for **Modern**" in user_message
         mock_bot.get_channel.assert_called_once()
 
@@ -623,13 +641,15 @@ async def test_check_missed_tasks(
             with patch.object(
                 cog, "create_poll", new_callable=AsyncMock
             ) as mock_create_poll:
-                logger.debug(f"Test time: {test_time}")
+                logger.debug("Test time: %s", test_time)
                 logger.debug(
-                    f"Expected date: {expected_date} (type: {type(expected_date)})"
+                    "Expected date: %s (type: %s)", expected_date, type(expected_date)
                 )
                 current_date = datetime.now().date()
                 logger.debug(
-                    f"Current frozen date: {current_date} (type: {type(current_date)})"
+                    "Current frozen date: %s (type: %s)",
+                    current_date,
+                    type(current_date),
                 )
 
                 with (
@@ -914,9 +934,8 @@ async def test_check_missed_tasks_basic(nomination_cog: Nomination) -> None:
 
 
 @pytest.fixture
-def nomination_cog_with_mocks() -> dict[str, Any]:
+def nomination_cog_with_mocks(mock_bot: MagicMock) -> dict[str, Any]:
     """Create a Nomination cog with all necessary mocks."""
-    mock_bot = MagicMock()
     mock_session = MagicMock()
     mock_bot.db.begin.return_value.__enter__.return_value = mock_session
 
@@ -945,8 +964,9 @@ async def test_nominate_command_not_nomination_week(
             nominate_command.callback,
         )
         await callback(nomination_cog, mock_interaction, "Modern")
+        await wait_for_background_tasks()
 
-        mock_interaction.response.send_message.assert_called_once()
-        message = mock_interaction.response.send_message.call_args[0][0]
+        mock_interaction.followup.send.assert_called_once()
+        message = mock_interaction.followup.send.call_args[0][0]
         assert "Nominations are not open this week" in message
-        assert mock_interaction.response.send_message.call_args[1]["ephemeral"] is True
+        assert mock_interaction.followup.send.call_args[1]["ephemeral"] is True
@@ -1,3 +1,4 @@
+import asyncio
 from collections.abc import Callable
 from typing import Any, cast
 from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch
@@ -5,12 +6,32 @@ from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch
 import discord
 import pytest
 from discord import app_commands
+from sqlalchemy.orm import Session
 
+from magic512bot.cogs.constants import Role
+from magic512bot.cogs.role_mutations import RoleMutationQueue, plan_role_grant
 from magic512bot.cogs.role_request import (
     RoleRequest,
+    RoleRequestButton,
     Roles,
+    SweatLeaderboard,
+    SweatRoleMirror,
 )
 from magic512bot.config import LOGGER
+from magic512bot.interactions import wait_for_background_tasks
+from magic512bot.metrics import LEADERBOARD_CACHE_HITS, LEADERBOARD_CACHE_MISSES
+from magic512bot.models.role_request import (
+    APPROVED,
+    DENIED,
+    PENDING,
+    RoleRequest as RoleRequestModel,
+)
+from magic512bot.services.role_request import (
+    create_role_request,
+    get_sweat_role_holders,
+    get_top_sweat_users,
+    upsert_user_sweat_roles,
+)
 
 
 @pytest.mark.asyncio
@@ -55,11 +76,12 @@ async def test_give_monarch(
                     give_monarch_command.callback,
                 )
                 await callback(cog, mock_interaction, mock_member)
+                await wait_for_background_tasks()
 
                 # Verify the expected actions were taken
                 mock_remove_roles = cast(AsyncMock, mock_user.remove_roles)
                 mock_add_roles = cast(AsyncMock, mock_member.add_roles)
-                mock_send = cast(AsyncMock, mock_interaction.response.send_message)
+                mock_send = cast(AsyncMock, mock_interaction.followup.send)
 
                 assert mock_remove_roles.await_count == 1
                 assert mock_add_roles.await_count == 1
@@ -87,9 +109,11 @@ async def test_role_autocomplete(
 async def test_request_role(
     mock_bot: MagicMock,
     mock_interaction: discord.Interaction,
+    db_session: Session,
 ) -> None:
     """Test the request_role command."""
     LOGGER.info("Starting request_role test")
+    mock_bot.db.begin.return_value.__enter__.return_value = db_session
     cog = RoleRequest(mock_bot)
 
     # Setup with proper types
@@ -97,20 +121,21 @@ async def test_request_role(
     mock_role.name = "Standard Sweat"
     mock_role.id = 1333297150192259112
     mock_role.mention = "<@&1333297150192259112>"
-    LOGGER.debug(f"Created mock role: {mock_role.name} ({mock_role.id})")
+    LOGGER.debug("Created mock role: %s (%s)", mock_role.name, mock_role.id)
 
     mock_user = MagicMock(spec=discord.Member)
     mock_user.id = 12345
     type(mock_user).roles = PropertyMock(return_value=[])
     mock_user.mention = "<@12345>"
     mock_interaction.user = cast(discord.Member, mock_user)
-    LOGGER.debug(f"Created mock user: {mock_user.mention}")
+    LOGGER.debug("Created mock user: %s", mock_user.mention)
 
     mock_channel = AsyncMock(spec=discord.TextChannel)
     mock_channel.send = AsyncMock()
     LOGGER.debug("Created mock channel")
 
     guild_mock: Any = mock_interaction.guild
+    guild_mock.id = 999
     with patch.object(
         type(guild_mock),
         "roles",
@@ -134,10 +159,24 @@ async def test_request_role(
             "Standard Sweat",  # Pass role name
             "I want to participate in Standard events",  # Pass reason
         )
+        await wait_for_background_tasks()
 
         # Verify interactions
-        mock_interaction.response.send_message.assert_called_once()
+        mock_interaction.followup.send.assert_called_once()
         mock_channel.send.assert_awaited_once()
+
+        # The request is stored, and the buttons carry its id
+        request = db_session.query(RoleRequestModel).one()
+        assert request.user_id == 12345
+        assert request.role_id == mock_role.id
+        assert request.status == PENDING
+        view = mock_channel.send.await_args.kwargs["view"]
+        assert [item.custom_id for item in view.children] == [
+            f"role-request:approve:{request.id}",
+            f"role-request:deny:{request.id}",
+        ]
+        # Routed through the dynamic item, so not kept in the view store
+        assert view.is_finished()
         LOGGER.info("Test completed successfully")
 
 
@@ -189,9 +228,10 @@ async def test_sweat_leaderboard(
             sweat_leaderboard_command.callback,
         )
         await callback(cog, mock_interaction)
+        await wait_for_background_tasks()
 
         # Verify the response
-        mock_send = cast(AsyncMock, mock_interaction.response.send_message)
+        mock_send = cast(AsyncMock, mock_interaction.followup.send)
         assert mock_send.await_count == 1
 
         # Get the embed from the call arguments
@@ -234,9 +274,10 @@ async def test_sweat_leaderboard_no_roles(
             sweat_leaderboard_command.callback,
         )
         await callback(cog, mock_interaction)
+        await wait_for_background_tasks()
 
         # Verify the response
-        mock_send = cast(AsyncMock, mock_interaction.response.send_message)
+        mock_send = cast(AsyncMock, mock_interaction.followup.send)
         assert mock_send.await_count == 1
 
         # Get the embed from the call arguments
@@ -247,6 +288,391 @@ async def test_sweat_leaderboard_no_roles(
         assert "No sweat roles found!" in embed.description
 
 
+def _role(name: str) -> MagicMock:
+    role = MagicMock(spec=discord.Role)
+    role.name = name
+    return role
+
+
+def _sweat_member(name: str, *role_names: str) -> MagicMock:
+    member = MagicMock(spec=discord.Member)
+    member.id = hash(name)
+    member.display_name = name
+    member.bot = False
+    member.roles = [_role(role_name) for role_name in role_names]
+    return member
+
+
+def test_sweat_leaderboard_index_updates() -> None:
+    """Test that the leaderboard index follows role changes and departures."""
+    alpha = _sweat_member("Alpha", "Modern Sweat", "Legacy Sweat")
+    beta = _sweat_member("Beta", "Modern Sweat")
+    charlie = _sweat_member("Charlie", "Not a sweat role")
+    leaderboard = SweatLeaderboard.from_members([alpha, beta, charlie])
+    assert leaderboard.ranked() == [(2, ["Alpha"]), (1, ["Beta"])]
+
+    # Beta earns a second sweat role
+    beta.roles = [*beta.roles, _role("Pioneer Sweat")]
+    leaderboard.update(beta)
+    assert leaderboard.ranked() == [(2, ["Alpha", "Beta"])]
+
+    leaderboard.remove(alpha)
+    leaderboard.remove(charlie)
+    assert leaderboard.ranked() == [(2, ["Beta"])]
+    assert leaderboard.counts == {beta.id: 2}
+
+
+def test_sweat_leaderboard_render_cache() -> None:
+    """Test that the rendered text is reused until something visible changes."""
+    alpha = _sweat_member("Alpha", "Modern Sweat")
+    beta = _sweat_member("Beta", "Not a sweat role")
+    leaderboard = SweatLeaderboard.from_members([alpha, beta])
+    hits, misses = LEADERBOARD_CACHE_HITS.value, LEADERBOARD_CACHE_MISSES.value
+
+    assert leaderboard.render() == "**1 role**: **Alpha**"
+    assert leaderboard.render() == "**1 role**: **Alpha**"
+    assert LEADERBOARD_CACHE_HITS.value - hits == 1
+    assert LEADERBOARD_CACHE_MISSES.value - misses == 1
+
+    # Changes that don't show up on the leaderboard keep the cache
+    beta.display_name = "Bravo"
+    leaderboard.update(beta)
+    alpha.roles = [*alpha.roles, _role("Not a sweat role")]
+    leaderboard.update(alpha)
+    leaderboard.render()
+    assert LEADERBOARD_CACHE_MISSES.value - misses == 1
+
+    # A tracked member's display name does
+    alpha.display_name = "Aardvark"
+    leaderboard.update(alpha)
+    assert leaderboard.render() == "**1 role**: **Aardvark**"
+    assert LEADERBOARD_CACHE_MISSES.value - misses == 2
+
+    # As does a change in sweat roles
+    beta.roles = [_role("Legacy Sweat")]
+    leaderboard.update(beta)
+    assert leaderboard.render() == "**1 role**: **Aardvark**, **Bravo**"
+    assert LEADERBOARD_CACHE_MISSES.value - misses == 3
+
+
+@pytest.mark.asyncio
+async def test_sweat_leaderboard_maintained_from_events(
+    mock_interaction: discord.Interaction,
+) -> None:
+    """Test that /leaderboard reads the index instead of rescanning members."""
+    mock_bot = MagicMock()
+    cog = RoleRequest(mock_bot)
+    alpha = _sweat_member("Alpha", "Modern Sweat")
+    beta = _sweat_member("Beta", "Modern Sweat", "Legacy Sweat")
+
+    guild_mock = cast(discord.Guild, mock_interaction.guild)
+    alpha.guild = beta.guild = guild_mock
+    mock_bot.guilds = [guild_mock]
+    with patch.object(
+        type(guild_mock), "members", new_callable=PropertyMock
+    ) as mock_members_prop:
+        mock_members_prop.return_value = [alpha, beta]
+        await cog.on_ready()
+
+        before = _sweat_member("Beta", "Modern Sweat", "Legacy Sweat")
+        beta.roles = beta.roles[:1]
+        await cog.on_member_update(before, beta)
+        await cog.on_member_remove(alpha)
+
+        callback = cast(
+            Callable[[Any, discord.Interaction], Any],
+            cast(app_commands.Command, cog.sweat_leaderboard).callback,
+        )
+        await callback(cog, mock_interaction)
+        await wait_for_background_tasks()
+
+        assert mock_members_prop.call_count == 1
+
+    embed = cast(AsyncMock, mock_interaction.followup.send).await_args.kwargs[
+        "embed"
+    ]
+    assert embed.description == "**1 role**: **Beta**"
+
+
+@pytest.mark.asyncio
+async def test_sweat_stats(
+    mock_bot: MagicMock,
+    mock_interaction: discord.Interaction,
+    db_session: Session,
+) -> None:
+    """Test that /sweat-stats reads the mirrored roles, not the member cache."""
+    mock_bot.db.begin.return_value.__enter__.return_value = db_session
+    upsert_user_sweat_roles(
+        db_session,
+        [
+            (1, "Alpha", ["Modern Sweat", "Legacy Sweat"]),
+            (2, "Beta", ["Modern Sweat"]),
+            (3, "Charlie", []),
+        ],
+    )
+    cog = RoleRequest(mock_bot)
+    callback = cast(
+        Callable[..., Any],
+        cast(app_commands.Command, cog.sweat_stats).callback,
+    )
+    guild_mock = cast(discord.Guild, mock_interaction.guild)
+    mock_send = cast(AsyncMock, mock_interaction.followup.send)
+    with patch.object(
+        type(guild_mock), "members", new_callable=PropertyMock
+    ) as mock_members_prop:
+        await callback(cog, mock_interaction)
+        await callback(cog, mock_interaction, "Legacy Sweat")
+        await callback(cog, mock_interaction, "Not a sweat role")
+        await wait_for_background_tasks()
+        mock_members_prop.assert_not_called()
+
+    top, holders, invalid = mock_send.await_args_list
+    assert top.kwargs["embed"].description == "**Alpha**: 2 roles\n**Beta**: 1 role"
+    assert holders.kwargs["embed"].title == "💦 Legacy Sweat (1)"
+    assert holders.kwargs["embed"].description == "**Alpha**"
+    assert invalid.args[0] == "`Not a sweat role` isn't a sweat role."
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_db(
+    mock_bot: MagicMock,
+    mock_interaction: discord.Interaction,
+    db_session: Session,
+) -> None:
+    """Test that /bootstrap-db snapshots members in batches with progress."""
+    mock_bot.db.begin.return_value.__enter__.return_value = db_session
+    cog = RoleRequest(mock_bot)
+    members = [
+        _sweat_member(f"Member {i}", "Modern Sweat", "Not a sweat role")
+        for i in range(5)
+    ]
+    members[0].bot = True
+
+    guild_mock = cast(discord.Guild, mock_interaction.guild)
+    with (
+        patch.object(type(guild_mock), "members", new_callable=PropertyMock) as prop,
+        patch("magic512bot.cogs.role_request.BOOTSTRAP_BATCH_SIZE", 2),
+        patch("magic512bot.cogs.role_request.BOOTSTRAP_PROGRESS_EVERY", 1),
+    ):
+        prop.return_value = members
+        callback = cast(
+            Callable[[Any, discord.Interaction], Any],
+            cast(app_commands.Command, cog.bootstrap_db).callback,
+        )
+        await callback(cog, mock_interaction)
+        await wait_for_background_tasks()
+
+    assert mock_bot.db.run.await_count == 2
+    followups = [
+        call.args[0]
+        for call in cast(AsyncMock, mock_interaction.followup.send).await_args_list
+    ]
+    assert followups[0] == "Starting role synchronization. This may take a while..."
+    assert followups[1] == "Synced 2/4 members..."
+    assert followups[-1].startswith(
+        "Role synchronization complete! Synced 4 members, 8 rows"
+    )
+    assert "rows/s" in followups[-1]
+    assert len(get_sweat_role_holders(db_session, "Modern Sweat")) == 4
+
+
+@pytest.mark.asyncio
+async def test_role_mirror_coalesces_member_updates(
+    mock_bot: MagicMock,
+    mock_interaction: discord.Interaction,
+    db_session: Session,
+) -> None:
+    """Test that a burst of member updates becomes one batched write."""
+    mock_bot.db.begin.return_value.__enter__.return_value = db_session
+    cog = RoleRequest(mock_bot)
+    guild_mock = cast(discord.Guild, mock_interaction.guild)
+
+    alpha_before = _sweat_member("Alpha", "Not a sweat role")
+    alpha = _sweat_member("Alpha", "Modern Sweat")
+    alpha_later = _sweat_member("Alpha", "Modern Sweat", "Legacy Sweat")
+    beta_before = _sweat_member("Beta", "Modern Sweat")
+    beta_renamed = _sweat_member("Beta", "Modern Sweat")
+    beta_renamed.display_name = "Bravo"
+    charlie_before = _sweat_member("Charlie")
+    charlie = _sweat_member("Charlie", "Not a sweat role")
+    for member in (alpha, alpha_later, beta_renamed, charlie):
+        member.guild = guild_mock
+
+    await cog.on_member_update(alpha_before, alpha)
+    await cog.on_member_update(alpha, alpha_later)
+    await cog.on_member_update(beta_before, beta_renamed)
+    # Changes that don't touch sweat roles aren't mirrored
+    await cog.on_member_update(charlie_before, charlie)
+    assert set(cog.role_mirror.pending) == {alpha.id, beta_renamed.id}
+    mock_bot.db.run.assert_not_awaited()
+
+    await cog.flush_role_mirror()
+
+    mock_bot.db.run.assert_awaited_once()
+    assert cog.role_mirror.pending == {}
+    assert get_top_sweat_users(db_session) == [
+        (alpha.id, "Alpha", 2),
+        (beta_renamed.id, "Bravo", 1),
+    ]
+
+    # Leaving the server clears a member's roles
+    await cog.on_member_remove(alpha_later)
+    await cog.flush_role_mirror()
+    assert get_top_sweat_users(db_session) == [(beta_renamed.id, "Bravo", 1)]
+
+
+@pytest.mark.asyncio
+async def test_role_mirror_keeps_changes_when_flush_fails(mock_bot: MagicMock) -> None:
+    """Test that a failed flush is retried without losing newer changes."""
+    mirror = SweatRoleMirror(mock_bot.db)
+    alpha = _sweat_member("Alpha", "Modern Sweat")
+    mirror.record(alpha, ["Modern Sweat"])
+    mock_bot.db.run.side_effect = RuntimeError("database is down")
+
+    with pytest.raises(RuntimeError):
+        await mirror.flush()
+    mirror.record(alpha, ["Legacy Sweat", "Modern Sweat"])
+
+    assert mirror.pending == {
+        alpha.id: (alpha.id, "Alpha", ["Legacy Sweat", "Modern Sweat"])
+    }
+
+
+def _guild_role(role: Role) -> MagicMock:
+    guild_role = _role(role.name)
+    guild_role.id = role.role_id
+    guild_role.is_default.return_value = False
+    return guild_role
+
+
+def _milestone_guild() -> MagicMock:
+    guild = MagicMock(spec=discord.Guild)
+    milestones = {
+        role.role_id: _guild_role(role)
+        for role in (Roles.SWEAT_KNIGHT, Roles.SWEAT_LORD, Roles.OMNI_SWEAT)
+    }
+    guild.get_role.side_effect = milestones.get
+    return guild
+
+
+def test_plan_role_grant_promotes_milestone() -> None:
+    """Test that reaching a threshold swaps the milestone in the same plan."""
+    everyone = _role("@everyone")
+    everyone.is_default.return_value = True
+    member = MagicMock(spec=discord.Member)
+    member.roles = [
+        everyone,
+        _guild_role(Roles.SWEAT_KNIGHT),
+        *(
+            _guild_role(role)
+            for role in (
+                Roles.STANDARD_SWEAT,
+                Roles.PIONEER_SWEAT,
+                Roles.MODERN_SWEAT,
+                Roles.LEGACY_SWEAT,
+            )
+        ),
+    ]
+
+    plan = plan_role_grant(member, _milestone_guild(), _guild_role(Roles.CUBE_SWEAT))
+
+    assert plan.milestone == Roles.SWEAT_LORD
+    assert sorted(role.name for role in plan.roles) == sorted(
+        [
+            Roles.STANDARD_SWEAT.name,
+            Roles.PIONEER_SWEAT.name,
+            Roles.MODERN_SWEAT.name,
+            Roles.LEGACY_SWEAT.name,
+            Roles.CUBE_SWEAT.name,
+            Roles.SWEAT_LORD.name,
+        ]
+    )
+
+
+def test_plan_role_grant_keeps_held_milestone() -> None:
+    """Test that a grant below the next threshold leaves milestones alone."""
+    member = MagicMock(spec=discord.Member)
+    member.roles = [
+        _guild_role(role)
+        for role in (
+            Roles.SWEAT_KNIGHT,
+            Roles.STANDARD_SWEAT,
+            Roles.PIONEER_SWEAT,
+            Roles.MODERN_SWEAT,
+        )
+    ]
+
+    plan = plan_role_grant(member, _milestone_guild(), _guild_role(Roles.PRO_TOUR))
+
+    assert plan.milestone is None
+    assert len(plan.roles) == 5
+    assert Roles.SWEAT_KNIGHT.name in {role.name for role in plan.roles}
+
+
+@pytest.mark.asyncio
+async def test_role_mutation_queue_serializes_per_guild() -> None:
+    """Test that role edits in the same guild never overlap."""
+    in_flight: dict[int, int] = {1: 0, 2: 0}
+    most_in_flight: dict[int, int] = {1: 0, 2: 0}
+
+    def make_member(guild_id: int) -> MagicMock:
+        member = MagicMock(spec=discord.Member)
+        member.roles = []
+        member.guild = _milestone_guild()
+        member.guild.id = guild_id
+
+        async def edit(**kwargs: Any) -> None:
+            in_flight[guild_id] += 1
+            most_in_flight[guild_id] = max(most_in_flight[guild_id], in_flight[guild_id])
+            await asyncio.sleep(0.01)
+            in_flight[guild_id] -= 1
+
+        member.edit = edit
+        return member
+
+    queue = RoleMutationQueue()
+    role = _guild_role(Roles.STANDARD_SWEAT)
+    await asyncio.gather(
+        *(queue.grant(make_member(guild_id), role) for guild_id in (1, 1, 1, 2, 2))
+    )
+
+    assert most_in_flight == {1: 1, 2: 1}
+
+
+@pytest.mark.asyncio
+async def test_role_mutation_queue_plans_from_edited_member() -> None:
+    """Test that back-to-back grants for one member don't drop the first."""
+    cached = MagicMock(spec=discord.Member)
+    cached.id = 67890
+    cached.roles = []
+    cached.guild = _milestone_guild()
+    cached.guild.id = 1
+    edits: list[list[str]] = []
+
+    async def edit(roles: list[discord.Role], **kwargs: Any) -> discord.Member:
+        # Like discord.py: the cached member keeps its old roles
+        await asyncio.sleep(0.01)
+        edits.append(sorted(role.name for role in roles))
+        edited = MagicMock(spec=discord.Member)
+        edited.roles = roles
+        return edited
+
+    cached.edit = edit
+    queue = RoleMutationQueue()
+    await asyncio.gather(
+        queue.grant(cached, _guild_role(Roles.STANDARD_SWEAT)),
+        queue.grant(cached, _guild_role(Roles.MODERN_SWEAT)),
+    )
+
+    assert edits == [
+        [Roles.STANDARD_SWEAT.name],
+        sorted([Roles.STANDARD_SWEAT.name, Roles.MODERN_SWEAT.name]),
+    ]
+    # Nothing is kept once the member's queued grants are done
+    assert not queue._edited
+    assert not queue._queued
+
+
 class MemberMock(MagicMock):
     """Custom mock class for Discord Member."""
 
@@ -266,3 +692,128 @@ class MemberMock(MagicMock):
     def roles(self, value: list[discord.Role]) -> None:
         """Set the roles list."""
         self._roles = value
+
+
+def _setup_review(
+    mock_bot: MagicMock,
+    mock_interaction: discord.Interaction,
+    db_session: Session,
+) -> tuple[int, MemberMock, MagicMock]:
+    """Stores a pending request and points the interaction's guild at it."""
+    mock_bot.db.begin.return_value.__enter__.return_value = db_session
+    request_id = create_role_request(
+        db_session,
+        guild_id=999,
+        user_id=67890,
+        role_id=Roles.STANDARD_SWEAT.role_id,
+        reason="Top 8 at RCQ",
+    )
+
+    role = MagicMock(spec=discord.Role)
+    role.id = Roles.STANDARD_SWEAT.role_id
+    role.name = Roles.STANDARD_SWEAT.name
+    member = MemberMock(spec=discord.Member)
+    member.display_name = "Requester"
+    member.mention = "<@67890>"
+    member.get_role = MagicMock(return_value=None)
+    member.edit = AsyncMock()
+    member.guild = mock_interaction.guild
+    general_channel = MagicMock(spec=discord.TextChannel)
+    general_channel.send = AsyncMock()
+
+    interaction: Any = mock_interaction
+    interaction.client = mock_bot
+    interaction.message.edit = AsyncMock()
+    interaction.guild.get_role = MagicMock(return_value=role)
+    interaction.guild.get_member = MagicMock(return_value=member)
+    interaction.guild.get_channel = MagicMock(return_value=general_channel)
+    return request_id, member, general_channel
+
+
+@pytest.mark.asyncio
+async def test_role_request_button_parses_custom_id() -> None:
+    """Test that a button is rebuilt from its custom_id after a restart."""
+    button = RoleRequestButton("deny", 42)
+    match = button.template.fullmatch(button.custom_id)
+    assert match is not None
+
+    rebuilt = await RoleRequestButton.from_custom_id(MagicMock(), button.item, match)
+    assert rebuilt.action == "deny"
+    assert rebuilt.request_id == 42
+
+
+@pytest.mark.asyncio
+async def test_approve_role_request(
+    mock_bot: MagicMock,
+    mock_interaction: discord.Interaction,
+    db_session: Session,
+) -> None:
+    """Test approving a stored request, then clicking approve again."""
+    request_id, member, general_channel = _setup_review(
+        mock_bot, mock_interaction, db_session
+    )
+    button = RoleRequestButton("approve", request_id)
+
+    await button.callback(mock_interaction)
+    await wait_for_background_tasks()
+
+    # One REST call applies the role
+    member.edit.assert_awaited_once()
+    assert [role.name for role in member.edit.await_args.kwargs["roles"]] == [
+        Roles.STANDARD_SWEAT.name
+    ]
+    member.add_roles.assert_not_awaited()
+    general_channel.send.assert_awaited_once()
+    request = db_session.get(RoleRequestModel, request_id)
+    assert request is not None
+    assert request.status == APPROVED
+    assert request.resolved_by == mock_interaction.user.id
+    edit = cast(AsyncMock, cast(Any, mock_interaction).message.edit)
+    view = edit.await_args.kwargs["view"]
+    assert all(item.item.disabled for item in view.children)
+
+    # A second click, e.g. from another moderator, does nothing
+    await button.callback(mock_interaction)
+    await wait_for_background_tasks()
+    member.edit.assert_awaited_once()
+    last_message = cast(AsyncMock, mock_interaction.followup.send).await_args
+    assert "already been handled" in last_message.args[0]
+
+
+@pytest.mark.asyncio
+async def test_approve_role_request_reopens_on_failure(
+    mock_bot: MagicMock,
+    mock_interaction: discord.Interaction,
+    db_session: Session,
+) -> None:
+    """Test that a request stays pending if the role can't be added."""
+    request_id, member, _ = _setup_review(mock_bot, mock_interaction, db_session)
+    member.edit.side_effect = discord.HTTPException(MagicMock(), "forbidden")
+
+    await RoleRequestButton("approve", request_id).callback(mock_interaction)
+    await wait_for_background_tasks()
+
+    request = db_session.get(RoleRequestModel, request_id, populate_existing=True)
+    assert request is not None
+    assert request.status == PENDING
+    assert request.resolved_by is None
+
+
+@pytest.mark.asyncio
+async def test_deny_role_request(
+    mock_bot: MagicMock,
+    mock_interaction: discord.Interaction,
+    db_session: Session,
+) -> None:
+    """Test denying a stored request."""
+    request_id, member, _ = _setup_review(mock_bot, mock_interaction, db_session)
+
+    await RoleRequestButton("deny", request_id).callback(mock_interaction)
+    await wait_for_background_tasks()
+
+    member.edit.assert_not_awaited()
+    member.send.assert_awaited_once()
+    request = db_session.get(RoleRequestModel, request_id)
+    assert request is not None
+    assert request.status == DENIED
+    cast(AsyncMock, cast(Any, mock_interaction).message.edit).assert_awaited_once()
@@ -0,0 +1,127 @@
+from sqlalchemy.orm import Session
+
+from magic512bot.models.role_request import APPROVED, DENIED, PENDING
+from magic512bot.models.user import User
+from magic512bot.services.role_request import (
+    create_role_request,
+    get_role_request,
+    get_sweat_role_holders,
+    get_top_sweat_users,
+    reopen_role_request,
+    resolve_role_request,
+    upsert_user_sweat_roles,
+)
+
+
+def test_create_role_request(db_session: Session) -> None:
+    """Test that a new request is stored as pending."""
+    request_id = create_role_request(
+        db_session, guild_id=1, user_id=2, role_id=3, reason="Won a PTQ"
+    )
+    db_session.commit()
+
+    request = get_role_request(db_session, request_id)
+    assert request is not None
+    assert (request.user_id, request.role_id, request.reason) == (2, 3, "Won a PTQ")
+    assert request.status == PENDING
+    assert request.resolved_by is None
+
+
+def test_get_role_request_missing(db_session: Session) -> None:
+    """Test looking up a request that doesn't exist."""
+    assert get_role_request(db_session, 404) is None
+
+
+def test_resolve_role_request_only_once(db_session: Session) -> None:
+    """Test that only the first resolution of a request wins."""
+    request_id = create_role_request(
+        db_session, guild_id=1, user_id=2, role_id=3, reason="Won a PTQ"
+    )
+
+    request = resolve_role_request(db_session, request_id, APPROVED, moderator_id=9)
+    assert request is not None
+    assert request.status == APPROVED
+    assert request.resolved_by == 9
+    assert request.resolved_at is not None
+
+    assert resolve_role_request(db_session, request_id, DENIED, moderator_id=8) is None
+    request = get_role_request(db_session, request_id)
+    assert request is not None
+    assert request.status == APPROVED
+
+
+def test_reopen_role_request(db_session: Session) -> None:
+    """Test that a reopened request can be resolved again."""
+    request_id = create_role_request(
+        db_session, guild_id=1, user_id=2, role_id=3, reason="Won a PTQ"
+    )
+    resolve_role_request(db_session, request_id, APPROVED, moderator_id=9)
+
+    reopen_role_request(db_session, request_id)
+
+    request = resolve_role_request(db_session, request_id, DENIED, moderator_id=8)
+    assert request is not None
+    assert request.status == DENIED
+    assert request.resolved_by == 8
+
+
+def _add_sweat_users(db_session: Session) -> None:
+    upsert_user_sweat_roles(
+        db_session,
+        [
+            (1, "Alpha", ["Modern Sweat"]),
+            (2, "Beta", ["Modern Sweat", "Legacy Sweat"]),
+            (3, "Charlie", ["Legacy Sweat", "Cube Sweat"]),
+            (4, "Delta", []),
+        ],
+    )
+
+
+def test_get_top_sweat_users(db_session: Session) -> None:
+    """Test ranking users by sweat role count, ties broken by name."""
+    _add_sweat_users(db_session)
+
+    assert get_top_sweat_users(db_session, limit=2) == [
+        (2, "Beta", 2),
+        (3, "Charlie", 2),
+    ]
+    assert get_top_sweat_users(db_session) == [
+        (2, "Beta", 2),
+        (3, "Charlie", 2),
+        (1, "Alpha", 1),
+    ]
+
+
+def test_get_sweat_role_holders(db_session: Session) -> None:
+    """Test listing the users that hold a role."""
+    _add_sweat_users(db_session)
+
+    holders = get_sweat_role_holders(db_session, "Legacy Sweat")
+    assert [user.user_name for user in holders] == ["Beta", "Charlie"]
+    assert get_sweat_role_holders(db_session, "Vintage Sweat") == []
+
+
+def test_upsert_user_sweat_roles(db_session: Session) -> None:
+    """Test that a snapshot batch adds, renames and replaces in place."""
+    upsert_user_sweat_roles(
+        db_session, [(1, "Alpha", ["Modern Sweat", "Legacy Sweat"])]
+    )
+
+    rows = upsert_user_sweat_roles(
+        db_session,
+        [
+            (1, "Alfa", ["Modern Sweat"]),
+            (2, "Beta", ["Cube Sweat", "Pioneer Sweat"]),
+            (3, "Charlie", []),
+        ],
+    )
+    db_session.expire_all()
+
+    assert rows == 6
+    assert [(user.id, user.user_name) for user in db_session.query(User)] == [
+        (1, "Alfa"),
+        (2, "Beta"),
+        (3, "Charlie"),
+    ]
+    assert get_top_sweat_users(db_session) == [(2, "Beta", 2), (1, "Alfa", 1)]
+    assert upsert_user_sweat_roles(db_session, []) == 0